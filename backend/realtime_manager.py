@@ -0,0 +1,234 @@
+"""
+WebSocket connection manager with revisioned news deltas
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import orjson
+from fastapi import WebSocket
+
+from backend.services.observability import BROADCAST_SECONDS, WEBSOCKET_SEND_SECONDS
+
+OUTBOUND_QUEUE_SIZE = int(os.getenv("WS_OUTBOUND_QUEUE_SIZE", "64"))
+SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+# What to do when a client's outbound queue is full:
+# "drop_oldest", "drop_newest" or "disconnect"
+SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")
+
+# Close code sent to clients disconnected for falling behind ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+BROADCAST_CHANNEL = "ai-news:broadcast"
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    return orjson.dumps(message, default=str).decode("utf-8")
+
+
+class ClientConnection:
+    """One connected socket with its bounded outbound queue and sender task"""
+
+    def __init__(self, websocket: WebSocket, manager: "RealtimeManager", queue_size: int):
+        self.websocket = websocket
+        self.manager = manager
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._sender())
+
+    def stop(self):
+        if self.task and self.task is not asyncio.current_task():
+            self.task.cancel()
+
+    def enqueue(self, data: str) -> bool:
+        """Queue an encoded message; returns False if the client must be dropped"""
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        self.manager.dropped_messages += 1
+        policy = self.manager.slow_consumer_policy
+        if policy == "disconnect":
+            return False
+        if policy == "drop_oldest":
+            self.queue.get_nowait()
+            self.queue.put_nowait(data)
+        return True
+
+    async def _sender(self):
+        while True:
+            data = await self.queue.get()
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(data), self.manager.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.manager.send_failures += 1
+                self.manager.disconnect(self.websocket)
+                return
+            self.manager.record_send(time.perf_counter() - start)
+
+
+class RealtimeManager:
+    """Tracks connected clients and broadcasts JSON messages to them.
+
+    Exposes the same broadcast methods as WebSocketManager plus
+    ``broadcast_news_delta`` for the change feed. Clients send
+    ``{"type": "sync", "revision": N}`` after connecting and receive only the
+    changes after revision N.
+
+    Every broadcast is encoded once and the same string is queued for every
+    connection. Each connection drains its own bounded queue, so a slow client
+    only loses its own messages (or its connection, depending on the policy)
+    instead of stalling everyone else.
+
+    With a pub/sub bus attached, broadcasts are published once and every
+    worker subscribed to the channel fans them out to its own sockets.
+    """
+
+    def __init__(self, queue_size: int = OUTBOUND_QUEUE_SIZE, send_timeout: float = SEND_TIMEOUT,
+                 slow_consumer_policy: str = SLOW_CONSUMER_POLICY):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.slow_consumer_policy = slow_consumer_policy
+        self.connections: Dict[WebSocket, ClientConnection] = {}
+        self.messages_broadcast = 0
+        self.messages_sent = 0
+        self.dropped_messages = 0
+        self.send_failures = 0
+        self.slow_disconnects = 0
+        self._send_latencies: deque = deque(maxlen=2048)
+        self.bus = None
+        self.channel = BROADCAST_CHANNEL
+
+    async def attach_bus(self, bus, channel: str = BROADCAST_CHANNEL):
+        self.bus = bus
+        self.channel = channel
+        await bus.subscribe(channel, self._on_bus_message)
+
+    async def _on_bus_message(self, data: str):
+        self._fanout(data)
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.connections)
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        connection = ClientConnection(websocket, self, self.queue_size)
+        self.connections[websocket] = connection
+        connection.start()
+
+    def disconnect(self, websocket: WebSocket):
+        connection = self.connections.pop(websocket, None)
+        if connection:
+            connection.stop()
+
+    def get_connection_count(self) -> int:
+        return len(self.connections)
+
+    def record_send(self, seconds: float):
+        self.messages_sent += 1
+        self._send_latencies.append(seconds)
+        WEBSOCKET_SEND_SECONDS.observe(seconds)
+
+    def _drop_slow_consumer(self, connection: ClientConnection):
+        self.slow_disconnects += 1
+        self.disconnect(connection.websocket)
+        asyncio.create_task(self._close(connection.websocket))
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
+
+    async def send(self, websocket: WebSocket, message: Dict[str, Any]):
+        connection = self.connections.get(websocket)
+        if connection and not connection.enqueue(encode_message(message)):
+            self._drop_slow_consumer(connection)
+
+    async def broadcast(self, message: Dict[str, Any]):
+        start = time.perf_counter()
+        data = encode_message(message)
+        self.messages_broadcast += 1
+        if self.bus is not None:
+            await self.bus.publish(self.channel, data)
+        else:
+            self._fanout(data)
+        BROADCAST_SECONDS.labels(message.get('type', 'unknown')).observe(time.perf_counter() - start)
+
+    def _fanout(self, data: str):
+        for connection in list(self.connections.values()):
+            if not connection.enqueue(data):
+                self._drop_slow_consumer(connection)
+
+    async def broadcast_news_update(self, articles: List[Dict]):
+        await self.broadcast({
+            'type': 'news_update',
+            'data': articles,
+            'count': len(articles),
+            'timestamp': datetime.now().isoformat()
+        })
+
+    async def broadcast_news_delta(self, delta: Dict[str, Any]):
+        await self.broadcast(news_delta_message(delta))
+
+    async def broadcast_article_stream(self, stage: str, **payload):
+        """Progress of one article while it is enriched: metadata, summary or complete"""
+        await self.broadcast({
+            'type': 'article_stream',
+            'stage': stage,
+            **payload,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    async def broadcast_trending_update(self, topics: List[Dict]):
+        await self.broadcast({
+            'type': 'trending_update',
+            'data': topics,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    async def broadcast_system_status(self, status: Dict[str, Any]):
+        await self.broadcast({
+            'type': 'system_status',
+            'data': status,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    def get_stats(self) -> Dict[str, Any]:
+        depths = [connection.queue.qsize() for connection in self.connections.values()]
+        latencies = sorted(self._send_latencies)
+        return {
+            'connections': len(self.connections),
+            'queue_depth_total': sum(depths),
+            'queue_depth_max': max(depths) if depths else 0,
+            'messages_broadcast': self.messages_broadcast,
+            'messages_sent': self.messages_sent,
+            'dropped_messages': self.dropped_messages,
+            'send_failures': self.send_failures,
+            'slow_consumer_disconnects': self.slow_disconnects,
+            'send_latency_ms': {
+                'mean': round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+                'p95': round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 3) if latencies else 0.0,
+                'max': round(1000 * latencies[-1], 3) if latencies else 0.0
+            }
+        }
+
+
+def news_delta_message(delta: Dict[str, Any]) -> Dict[str, Any]:
+    return {'type': 'news_delta', **delta, 'timestamp': datetime.now().isoformat()}
+
+
+def delta_is_empty(delta: Dict[str, Any]) -> bool:
+    return not (delta['reset'] or delta['added'] or delta['updated'] or delta['removed'])
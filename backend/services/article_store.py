@@ -0,0 +1,696 @@
+"""
+Persistent article storage on SQLite (SQLAlchemy async + aiosqlite)
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import DateTime, Index, Integer, JSON, String, Text, and_, delete, func, or_, select, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, undefer
+
+ARTICLE_DB_URL = os.getenv("ARTICLE_DB_URL", "sqlite+aiosqlite:///data/news.db")
+ARTICLE_RETENTION_DAYS = int(os.getenv("ARTICLE_RETENTION_DAYS", "30"))
+
+ARTICLE_FIELDS = (
+    'id', 'title', 'content', 'summary', 'category', 'sentiment',
+    'keywords', 'source', 'url', 'published', 'processed_at', 'revision', 'related'
+)
+# Fields carried by change-feed deltas; bodies are fetched on demand
+DELTA_FIELDS = tuple(field for field in ARTICLE_FIELDS if field != 'content')
+# Changes that alter what clients display; re-enriching identical content is a no-op
+TRACKED_FIELDS = (
+    'title', 'content', 'summary', 'category', 'sentiment', 'keywords', 'source', 'published', 'related'
+)
+
+# Deltas larger than this are replaced by a fresh snapshot of the latest articles
+MAX_DELTA_CHANGES = int(os.getenv("MAX_DELTA_CHANGES", "500"))
+SNAPSHOT_SIZE = int(os.getenv("SNAPSHOT_SIZE", "50"))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Article(Base):
+    __tablename__ = "articles"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    url: Mapped[str] = mapped_column(String(2048), unique=True, nullable=False)
+    title: Mapped[str] = mapped_column(Text, nullable=False)
+    # Bodies are only loaded for detail requests (see get_article)
+    content: Mapped[str] = mapped_column(Text, default="", deferred=True)
+    summary: Mapped[str] = mapped_column(Text, default="")
+    category: Mapped[str] = mapped_column(String(64), default="General")
+    sentiment: Mapped[str] = mapped_column(String(16), default="Neutral")
+    keywords: Mapped[List[str]] = mapped_column(JSON, default=list)
+    source: Mapped[str] = mapped_column(String(255), default="")
+    published: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    processed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    revision: Mapped[int] = mapped_column(Integer, default=0, index=True)
+    # Other sources covering the same story: [{source, url, title, published}]
+    related: Mapped[List[Dict[str, str]]] = mapped_column(JSON, default=list)
+
+    __table_args__ = (
+        Index("ix_articles_published", "published"),
+        Index("ix_articles_category_published", "category", "published"),
+        Index("ix_articles_source_published", "source", "published"),
+        Index("ix_articles_sentiment_published", "sentiment", "published"),
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return _serialize_row({field: getattr(self, field) for field in ARTICLE_FIELDS})
+
+
+def _serialize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    data = dict(row)
+    for field in ('published', 'processed_at'):
+        if isinstance(data.get(field), datetime):
+            data[field] = data[field].isoformat()
+    for field in ('keywords', 'related'):
+        if field in data:
+            data[field] = data[field] or []
+    return data
+
+
+@dataclass(slots=True)
+class ArticleRecord:
+    """Compact in-memory article, normally without its body
+
+    Category, sentiment, source and keywords repeat across thousands of
+    articles, so they are interned and every record shares one copy.
+    Keywords and related coverage are tuples. ``content`` is only set when
+    the caller asked the store for it.
+    """
+    id: int
+    url: str
+    title: str
+    summary: str
+    category: str
+    sentiment: str
+    keywords: Tuple[str, ...]
+    source: str
+    published: datetime
+    processed_at: datetime
+    revision: int
+    related: Tuple[Dict[str, str], ...]
+    content: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row) -> "ArticleRecord":
+        """Build from a result mapping of article columns"""
+        return cls(
+            id=row['id'],
+            url=row['url'],
+            title=row['title'],
+            summary=row['summary'] or "",
+            category=sys.intern(row['category'] or 'General'),
+            sentiment=sys.intern(row['sentiment'] or 'Neutral'),
+            keywords=tuple(sys.intern(keyword) for keyword in row['keywords'] or ()),
+            source=sys.intern(row['source'] or ""),
+            published=row['published'],
+            processed_at=row['processed_at'],
+            revision=row['revision'] or 0,
+            related=tuple(row['related'] or ()),
+            content=row.get('content')
+        )
+
+    def get(self, field: str, default: Any = None) -> Any:
+        """Dict-style access, so helpers written for raw feed dicts accept records"""
+        value = getattr(self, field, None)
+        return default if value is None else value
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {field: getattr(self, field) for field in DELTA_FIELDS}
+        if self.content is not None:
+            data['content'] = self.content
+        data['keywords'] = list(self.keywords)
+        data['related'] = list(self.related)
+        return _serialize_row(data)
+
+
+# External-content FTS5 index over articles, kept in sync by triggers so every
+# upsert updates it incrementally
+FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+        title, summary, content, keywords,
+        content='articles', content_rowid='id', tokenize='porter unicode61', prefix='3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts(rowid, title, summary, content, keywords)
+        VALUES (new.id, new.title, new.summary, new.content, new.keywords);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, summary, content, keywords)
+        VALUES ('delete', old.id, old.title, old.summary, old.content, old.keywords);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, summary, content, keywords)
+        VALUES ('delete', old.id, old.title, old.summary, old.content, old.keywords);
+        INSERT INTO articles_fts(rowid, title, summary, content, keywords)
+        VALUES (new.id, new.title, new.summary, new.content, new.keywords);
+    END
+    """,
+)
+
+# bm25() column weights: title, summary, content, keywords. Stored as the
+# table's default rank so "ORDER BY rank LIMIT n" can use FTS5's top-n path.
+FTS_WEIGHTS = (10.0, 4.0, 1.0, 6.0)
+FTS_RANK = f"bm25({', '.join(str(weight) for weight in FTS_WEIGHTS)})"
+
+SEARCH_SQL = """
+    SELECT a.id, a.title, a.summary, a.category, a.sentiment, a.keywords, a.source,
+           a.url, a.published,
+           rank AS score,
+           highlight(articles_fts, 0, '<mark>', '</mark>') AS title_highlight,
+           snippet(articles_fts, -1, '<mark>', '</mark>', '…', 24) AS snippet
+    FROM articles_fts
+    JOIN articles AS a ON a.id = articles_fts.rowid
+    WHERE articles_fts MATCH :query
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+"""
+
+_SEARCH_TOKEN = re.compile(r"\w+", re.UNICODE)
+# Shorter prefixes expand to too many terms to rank quickly
+MIN_PREFIX_LENGTH = 3
+
+
+def build_fts_query(query: str, prefix: bool = False) -> str:
+    """Turn free text into a safe FTS5 expression matching all terms
+
+    With ``prefix`` the last term also matches longer words (type-ahead).
+    """
+    terms = _SEARCH_TOKEN.findall(query or "")
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    if prefix and len(terms[-1]) >= MIN_PREFIX_LENGTH:
+        quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class ArticleChange(Base):
+    """Append-only change log; the primary key is the feed revision"""
+    __tablename__ = "article_changes"
+
+    revision: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    article_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    kind: Mapped[str] = mapped_column(String(8), nullable=False)  # insert, update or delete
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+
+class TrendingSnapshot(Base):
+    __tablename__ = "trending_snapshots"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    topics: Mapped[List[Dict[str, Any]]] = mapped_column(JSON, default=list)
+
+
+def utc_now() -> datetime:
+    """The current time as naive UTC, the form every stored datetime takes"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def parse_datetime(value: Any) -> datetime:
+    """Best-effort parse of ISO 8601 or RFC 822 feed dates into naive UTC"""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = None
+        if isinstance(value, str) and value:
+            try:
+                parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except ValueError:
+                try:
+                    parsed = parsedate_to_datetime(value)
+                except (TypeError, ValueError):
+                    parsed = None
+        if parsed is None:
+            return utc_now()
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def utc_timestamp(value: Any) -> float:
+    """POSIX timestamp of a feed date; naive values are UTC, not local time"""
+    return parse_datetime(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+def encode_cursor(published: str, article_id: int) -> str:
+    """Opaque keyset cursor for the (published, id) sort order"""
+    return base64.urlsafe_b64encode(f"{published}|{article_id}".encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        published, article_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(published), int(article_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def article_url(article: Dict) -> str:
+    """Upsert key; articles without a usable URL get one derived from source and title"""
+    url = article.get('url') or ''
+    if url and url != '#':
+        return url
+    digest = hashlib.sha1(f"{article.get('source', '')}|{article.get('title', '')}".encode("utf-8")).hexdigest()
+    return f"urn:article:{digest}"
+
+
+def merge_related(current: Optional[List[Dict]], incoming: List[Dict]) -> List[Dict]:
+    """Union of related-coverage entries, keeping the first entry per URL"""
+    merged = list(current or [])
+    known = {entry.get('url') for entry in merged}
+    for entry in incoming:
+        if entry.get('url') not in known:
+            known.add(entry.get('url'))
+            merged.append(entry)
+    return merged
+
+
+class ArticleStore:
+    """Async repository for processed articles and trending snapshots"""
+
+    def __init__(self, url: str = ARTICLE_DB_URL, retention_days: int = ARTICLE_RETENTION_DAYS):
+        self.url = url
+        self.retention_days = retention_days
+        self.engine = None
+        self.sessionmaker = None
+        # Writers allocate feed revisions from the current head; one at a time
+        # in this process, and see _begin_write for other processes
+        self._write_lock = asyncio.Lock()
+
+    async def open(self):
+        if self.url.startswith("sqlite") and ":///" in self.url:
+            path = self.url.split(":///", 1)[1]
+            if path and path != ":memory:":
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Writers in other processes (the backfill CLI) wait for the lock this long
+        connect_args = {'timeout': SQLITE_BUSY_TIMEOUT} if self.url.startswith("sqlite") else {}
+        self.engine = create_async_engine(self.url, connect_args=connect_args)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        async with self.engine.begin() as conn:
+            if self.url.startswith("sqlite"):
+                await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+            await conn.run_sync(Base.metadata.create_all)
+            if self.url.startswith("sqlite"):
+                columns = await conn.exec_driver_sql("PRAGMA table_info(articles)")
+                column_names = {column[1] for column in columns}
+                if 'revision' not in column_names:
+                    await conn.exec_driver_sql("ALTER TABLE articles ADD COLUMN revision INTEGER DEFAULT 0")
+                if 'related' not in column_names:
+                    await conn.exec_driver_sql("ALTER TABLE articles ADD COLUMN related JSON DEFAULT '[]'")
+                existing = await conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'articles_fts'"
+                )
+                fts_exists = existing.first() is not None
+                for statement in FTS_DDL:
+                    await conn.exec_driver_sql(statement)
+                await conn.exec_driver_sql(
+                    f"INSERT INTO articles_fts(articles_fts, rank) VALUES ('rank', '{FTS_RANK}')"
+                )
+                if not fts_exists:
+                    await conn.exec_driver_sql("INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+        return self
+
+    async def close(self):
+        if self.engine:
+            await self.engine.dispose()
+            self.engine = None
+
+    async def _begin_write(self, session):
+        """Take SQLite's write lock before reading the head revision
+
+        Otherwise two processes (the app and a backfill) can read the same
+        head and allocate the same revisions.
+        """
+        if self.url.startswith("sqlite"):
+            await session.execute(text("BEGIN IMMEDIATE"))
+
+    async def _head_revision(self, session) -> int:
+        return (await session.execute(select(func.max(ArticleChange.revision)))).scalar() or 0
+
+    async def head_revision(self) -> int:
+        async with self.sessionmaker() as session:
+            return await self._head_revision(session)
+
+    async def upsert_articles(self, articles: List[Dict]) -> List[ArticleRecord]:
+        """Insert or update articles by URL and return them with their stored ids
+
+        The returned records leave out bodies. Every article whose tracked fields actually change gets a new feed
+        revision and a change-log entry; unchanged articles keep theirs.
+        """
+        if not articles:
+            return []
+        now = utc_now()
+        rows = {}
+        for article in articles:
+            url = article_url(article)
+            rows[url] = {
+                'url': article_url(article),
+                'title': article['title'],
+                'content': article.get('content', ''),
+                'summary': article.get('summary', ''),
+                'category': article.get('category') or 'General',
+                'sentiment': article.get('sentiment') or 'Neutral',
+                'keywords': list(article.get('keywords') or []),
+                'source': article.get('source', ''),
+                'published': parse_datetime(article.get('published')),
+                'processed_at': parse_datetime(article.get('processed_at', now)),
+                'related': list(article.get('related') or [])
+            }
+        urls = list(rows)
+
+        async with self._write_lock, self.sessionmaker() as session:
+            await self._begin_write(session)
+            result = await session.execute(
+                select(Article.url, *(getattr(Article, field) for field in TRACKED_FIELDS))
+                .where(Article.url.in_(urls))
+            )
+            existing = {row['url']: row for row in result.mappings()}
+
+            revision = await self._head_revision(session)
+            changed = []
+            for url, row in rows.items():
+                current = existing.get(url)
+                if current is not None:
+                    row['related'] = merge_related(current['related'], row['related'])
+                if current is None:
+                    kind = 'insert'
+                elif any(current[field] != row[field] for field in TRACKED_FIELDS):
+                    kind = 'update'
+                else:
+                    continue
+                revision += 1
+                row['revision'] = revision
+                changed.append((kind, row))
+
+            if changed:
+                statement = insert(Article)
+                statement = statement.on_conflict_do_update(
+                    index_elements=[Article.url],
+                    set_={key: statement.excluded[key] for key in changed[0][1] if key != 'url'}
+                )
+                await session.execute(statement, [row for _, row in changed])
+
+            result = await session.execute(
+                select(*(getattr(Article, field) for field in DELTA_FIELDS)).where(Article.url.in_(urls))
+            )
+            stored = {row['url']: ArticleRecord.from_row(row) for row in result.mappings()}
+            for kind, row in changed:
+                session.add(ArticleChange(
+                    revision=row['revision'], article_id=stored[row['url']].id,
+                    kind=kind, created_at=now
+                ))
+            await session.commit()
+        return [stored[url] for url in urls if url in stored]
+
+    async def list_articles(self, limit: int = 100, lead_chars: int = 0) -> List[ArticleRecord]:
+        """Most recently published articles first
+
+        Bodies are left out; with ``lead_chars`` each record's ``content``
+        holds just the start of the body (enough for story signatures).
+        """
+        columns = [getattr(Article, field) for field in DELTA_FIELDS]
+        if lead_chars:
+            columns.append(func.substr(Article.content, 1, lead_chars).label('content'))
+        async with self.sessionmaker() as session:
+            result = await session.execute(
+                select(*columns).order_by(Article.published.desc(), Article.id.desc()).limit(limit)
+            )
+            return [ArticleRecord.from_row(row) for row in result.mappings()]
+
+    async def query_articles(self, limit: int = 50, cursor: Optional[str] = None,
+                             category: Optional[str] = None, source: Optional[str] = None,
+                             sentiment: Optional[str] = None, keyword: Optional[str] = None,
+                             since: Optional[datetime] = None, until: Optional[datetime] = None,
+                             fields: Optional[Sequence[str]] = None) -> Tuple[List[Dict], Optional[str]]:
+        """One page of articles, newest first, plus the cursor for the next page
+
+        Only the requested ``fields`` are loaded, so list views can skip
+        article bodies. Raises ValueError for unknown fields or a bad cursor.
+        """
+        fields = list(fields) if fields else list(ARTICLE_FIELDS)
+        unknown = [field for field in fields if field not in ARTICLE_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+        loaded = list(dict.fromkeys(fields + ['id', 'published']))
+        statement = select(*(getattr(Article, field) for field in loaded))
+
+        conditions = []
+        if category:
+            conditions.append(Article.category == category)
+        if source:
+            conditions.append(Article.source == source)
+        if sentiment:
+            conditions.append(Article.sentiment == sentiment)
+        if keyword:
+            keywords = func.json_each(Article.keywords).table_valued("value")
+            conditions.append(
+                select(1).select_from(keywords)
+                .where(func.lower(keywords.c.value) == keyword.lower())
+                .exists()
+            )
+        if since:
+            conditions.append(Article.published >= since)
+        if until:
+            conditions.append(Article.published <= until)
+        if cursor:
+            published, article_id = decode_cursor(cursor)
+            conditions.append(or_(
+                Article.published < published,
+                and_(Article.published == published, Article.id < article_id)
+            ))
+        if conditions:
+            statement = statement.where(*conditions)
+        statement = statement.order_by(Article.published.desc(), Article.id.desc()).limit(limit + 1)
+
+        async with self.sessionmaker() as session:
+            rows = (await session.execute(statement)).mappings().all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last['published'].isoformat(), last['id'])
+        return [_serialize_row({field: row[field] for field in fields}) for row in rows], next_cursor
+
+    async def search(self, query: str, limit: int = 20, offset: int = 0,
+                     prefix: bool = False) -> Tuple[List[Dict], bool]:
+        """BM25-ranked full-text search with highlighted titles and snippets
+
+        Returns the page of results and whether more results follow.
+        """
+        fts_query = build_fts_query(query, prefix)
+        if not fts_query:
+            return [], False
+
+        async with self.sessionmaker() as session:
+            rows = (await session.execute(
+                text(SEARCH_SQL),
+                {'query': fts_query, 'limit': limit + 1, 'offset': offset}
+            )).mappings().all()
+
+        results = []
+        for row in rows[:limit]:
+            result = dict(row)
+            result['score'] = round(-result['score'], 4)
+            if isinstance(result['keywords'], str):
+                result['keywords'] = json.loads(result['keywords'])
+            if isinstance(result['published'], str):
+                result['published'] = datetime.fromisoformat(result['published']).isoformat()
+            results.append(result)
+        return results, len(rows) > limit
+
+    async def get_article(self, article_id: int) -> Optional[Dict]:
+        """One article including its body"""
+        async with self.sessionmaker() as session:
+            article = await session.get(Article, article_id, options=[undefer(Article.content)])
+            return article.to_dict() if article else None
+
+    async def article_exists(self, article_id: int) -> bool:
+        async with self.sessionmaker() as session:
+            result = await session.execute(select(Article.id).where(Article.id == article_id))
+            return result.first() is not None
+
+    async def get_articles(self, article_ids: Sequence[int], fields: Sequence[str] = DELTA_FIELDS) -> List[Dict]:
+        """Articles by id in the order given; missing ids are skipped"""
+        if not article_ids:
+            return []
+        async with self.sessionmaker() as session:
+            result = await session.execute(
+                select(*(getattr(Article, field) for field in fields)).where(Article.id.in_(list(article_ids)))
+            )
+            rows = {row['id']: _serialize_row(dict(row)) for row in result.mappings()}
+        return [rows[article_id] for article_id in article_ids if article_id in rows]
+
+    async def all_ids(self) -> set:
+        async with self.sessionmaker() as session:
+            return set((await session.execute(select(Article.id))).scalars())
+
+    async def existing_urls(self, urls: List[str]) -> set:
+        """Subset of the given URLs that are already stored"""
+        if not urls:
+            return set()
+        async with self.sessionmaker() as session:
+            result = await session.execute(select(Article.url).where(Article.url.in_(urls)))
+            return set(result.scalars())
+
+    async def attach_related(self, attachments: Dict[str, List[Dict]]) -> int:
+        """Merge related-coverage entries into stored stories keyed by URL
+
+        Stories that gain entries get a new feed revision; returns how many.
+        """
+        if not attachments:
+            return 0
+        now = utc_now()
+        updated = 0
+        async with self._write_lock, self.sessionmaker() as session:
+            await self._begin_write(session)
+            result = await session.execute(select(Article).where(Article.url.in_(list(attachments))))
+            stories = list(result.scalars())
+            revision = await self._head_revision(session)
+            for story in stories:
+                incoming = [entry for entry in attachments[story.url] if entry.get('url') != story.url]
+                related = merge_related(story.related, incoming)
+                if len(related) == len(story.related or []):
+                    continue
+                revision += 1
+                updated += 1
+                story.related = related
+                story.revision = revision
+                session.add(ArticleChange(revision=revision, article_id=story.id, kind='update', created_at=now))
+            await session.commit()
+        return updated
+
+    async def count(self) -> int:
+        async with self.sessionmaker() as session:
+            return (await session.execute(select(func.count(Article.id)))).scalar_one()
+
+    async def save_trending(self, topics: List[Dict]):
+        async with self.sessionmaker() as session:
+            session.add(TrendingSnapshot(created_at=utc_now(), topics=list(topics or [])))
+            await session.commit()
+
+    async def latest_trending(self) -> List[Dict]:
+        async with self.sessionmaker() as session:
+            result = await session.execute(
+                select(TrendingSnapshot).order_by(TrendingSnapshot.created_at.desc()).limit(1)
+            )
+            snapshot = result.scalars().first()
+            return snapshot.topics if snapshot else []
+
+    async def prune(self) -> List[int]:
+        """Delete articles, change-log entries and trending snapshots past retention
+
+        Removed articles are recorded in the change log so clients drop them.
+        Returns their ids.
+        """
+        now = utc_now()
+        cutoff = now - timedelta(days=self.retention_days)
+        async with self._write_lock, self.sessionmaker() as session:
+            await self._begin_write(session)
+            expired = (await session.execute(
+                select(Article.id).where(Article.published < cutoff)
+            )).scalars().all()
+            if expired:
+                await session.execute(delete(Article).where(Article.id.in_(expired)))
+                revision = await self._head_revision(session)
+                for offset, article_id in enumerate(expired, start=1):
+                    session.add(ArticleChange(
+                        revision=revision + offset, article_id=article_id,
+                        kind='delete', created_at=now
+                    ))
+            await session.execute(delete(ArticleChange).where(ArticleChange.created_at < cutoff))
+            await session.execute(delete(TrendingSnapshot).where(TrendingSnapshot.created_at < cutoff))
+            await session.commit()
+            return list(expired)
+
+    async def changes_since(self, revision: int) -> Dict[str, Any]:
+        """Delta between a client's last seen revision and the current head
+
+        Falls back to a snapshot of the latest articles (``reset``) when the
+        client is new, its revision predates the retained change log, or the
+        delta would be larger than a snapshot.
+        """
+        async with self.sessionmaker() as session:
+            head = await self._head_revision(session)
+            if revision == head and revision > 0:
+                return {'revision': head, 'base_revision': revision, 'reset': False,
+                        'added': [], 'updated': [], 'removed': []}
+
+            oldest = (await session.execute(select(func.min(ArticleChange.revision)))).scalar()
+            changes = []
+            if revision > 0 and oldest is not None and revision >= oldest - 1:
+                changes = (await session.execute(
+                    select(ArticleChange.article_id, ArticleChange.kind)
+                    .where(ArticleChange.revision > revision)
+                    .order_by(ArticleChange.revision)
+                    .limit(MAX_DELTA_CHANGES + 1)
+                )).all()
+
+            if not changes or len(changes) > MAX_DELTA_CHANGES:
+                snapshot = (await session.execute(
+                    select(*(getattr(Article, field) for field in DELTA_FIELDS))
+                    .order_by(Article.published.desc(), Article.id.desc())
+                    .limit(SNAPSHOT_SIZE)
+                )).mappings().all()
+                return {'revision': head, 'base_revision': revision, 'reset': True,
+                        'added': [_serialize_row(dict(row)) for row in snapshot],
+                        'updated': [], 'removed': []}
+
+            first_kind: Dict[int, str] = {}
+            last_kind: Dict[int, str] = {}
+            for article_id, kind in changes:
+                first_kind.setdefault(article_id, kind)
+                last_kind[article_id] = kind
+
+            added, updated, removed = [], [], []
+            for article_id, kind in last_kind.items():
+                if kind == 'delete':
+                    if first_kind[article_id] != 'insert':
+                        removed.append(article_id)
+                elif first_kind[article_id] == 'insert':
+                    added.append(article_id)
+                else:
+                    updated.append(article_id)
+
+            records = {}
+            if added or updated:
+                rows = (await session.execute(
+                    select(*(getattr(Article, field) for field in DELTA_FIELDS))
+                    .where(Article.id.in_(added + updated))
+                )).mappings().all()
+                records = {row['id']: _serialize_row(dict(row)) for row in rows}
+
+        return {
+            'revision': head,
+            'base_revision': revision,
+            'reset': False,
+            'added': [records[article_id] for article_id in added if article_id in records],
+            'updated': [records[article_id] for article_id in updated if article_id in records],
+            'removed': removed
+        }
@@ -0,0 +1,298 @@
+"""
+Offline replay of archived raw articles
+
+Re-enriches a date range of the raw archive (see raw_archive.py), e.g.
+after a prompt or model change, without fetching any feed. Records go
+through the live dedup (exact URL, then story clustering) and enrichment,
+and the stories are upserted into the article store.
+
+The archive is read in chunks of BACKFILL_CHUNK records whose stories are
+enriched by ``--workers`` concurrent workers. Once a chunk and every chunk
+before it are stored, the archive position is saved to the checkpoint
+file, and a rerun over the same range resumes there. Records before the
+checkpoint are still deduplicated, so clustering sees the same history,
+but they are not enriched again.
+
+Stories whose enrichment failed or fell back on any field are not stored,
+so a flaky LM never overwrites earlier results. The checkpoint then stops
+before their chunk, and a rerun enriches them again.
+
+The live app owns the embedding index, so stored articles are embedded by
+its leader: right away when it shares Redis with the backfill, otherwise
+when it next starts and finds articles without vectors.
+
+    python -m backend.services.backfill --since 2024-06-01 --until 2024-06-30 --workers 4
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from backend.services.article_store import ArticleStore, article_url
+from backend.services.combined_analysis import PROMPT_VERSION
+from backend.services.enrichment_cache import EnrichmentCache
+from backend.services.enrichment_pipeline import ENRICHMENT_MODE, EnrichmentPipeline
+from backend.services.lm_gateway import SharedLMClient
+from backend.services.observability import configure_logging
+from backend.services.pubsub import CONTROL_CHANNEL, create_pubsub
+from backend.services.raw_archive import Position, RAW_ARCHIVE_DIR, RawArchive
+from backend.services.story_clustering import StoryIndex
+
+BACKFILL_CHUNK = int(os.getenv("BACKFILL_CHUNK", "200"))
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "4"))
+BACKFILL_CHECKPOINT = os.getenv("BACKFILL_CHECKPOINT", "data/backfill_checkpoint.json")
+
+Chunk = List[Tuple[Position, Dict]]
+
+
+class Checkpoint:
+    """Archive position up to which a backfill of one date range is stored"""
+
+    def __init__(self, path: str, since: date, until: date):
+        self.path = path
+        self.range = {'since': since.isoformat(), 'until': until.isoformat()}
+
+    def load(self) -> Optional[Position]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        if {key: data.get(key) for key in self.range} != self.range:
+            logger.warning(f"Checkpoint {self.path} is for another date range; starting over")
+            return None
+        return tuple(data['position']) if data.get('position') else None
+
+    def save(self, position: Position, totals: Dict[str, int]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({**self.range, 'position': list(position), 'totals': totals}, f)
+        os.replace(temporary, self.path)
+
+
+class Backfill:
+    """Replays archived raw articles through dedup, enrichment and the store"""
+
+    def __init__(self, archive: RawArchive, store: ArticleStore, client, cache=None,
+                 workers: int = BACKFILL_WORKERS, chunk_size: int = BACKFILL_CHUNK,
+                 checkpoint_path: str = BACKFILL_CHECKPOINT, mode: str = ENRICHMENT_MODE):
+        self.archive = archive
+        self.store = store
+        self.client = client
+        self.cache = cache
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.checkpoint_path = checkpoint_path
+        self.mode = mode
+        self.totals = {
+            'records': 0, 'duplicates': 0, 'replayed': 0, 'stories': 0,
+            'stored': 0, 'failed': 0, 'cache_hits': 0
+        }
+        self._started = 0.0
+        self._resume_from: Optional[Position] = None
+        self._checkpoint: Optional[Checkpoint] = None
+        self._finished: Dict[int, Tuple[Position, int]] = {}
+        self._next_sequence = 0
+        self._held = False
+        self.stored_ids: List[int] = []
+
+    def _read_chunk(self, records: Iterator) -> Chunk:
+        return list(itertools.islice(records, self.chunk_size))
+
+    def _done_before(self, position: Position) -> bool:
+        return self._resume_from is not None and position <= self._resume_from
+
+    def _chunk_finished(self, sequence: int, end: Position, failed: int = 0):
+        """Advance the checkpoint over every contiguous finished chunk
+
+        It never passes a chunk with failed stories, so they are not lost.
+        """
+        self._finished[sequence] = (end, failed)
+        position = None
+        while not self._held and self._next_sequence in self._finished:
+            chunk_end, chunk_failed = self._finished.pop(self._next_sequence)
+            if chunk_failed:
+                self._held = True
+                logger.warning(
+                    f"{chunk_failed} stories failed in the chunk ending at {chunk_end[0]}:{chunk_end[1]}; "
+                    f"the checkpoint stays before it"
+                )
+                break
+            position = chunk_end
+            self._next_sequence += 1
+        if position is None or self._done_before(position):
+            return
+        self._checkpoint.save(position, self.totals)
+        elapsed = time.perf_counter() - self._started
+        logger.info(
+            f"Backfill at {position[0]}:{position[1]}: {self.totals['stored']} stored, "
+            f"{self.totals['stored'] / elapsed:.1f} articles/s"
+        )
+
+    async def _produce(self, since: date, until: date, queue: asyncio.Queue,
+                       attachments: Dict[str, List[Dict]]):
+        story_index = StoryIndex()
+        seen = set()
+        records = self.archive.read(since, until)
+        for sequence in itertools.count():
+            chunk = await asyncio.to_thread(self._read_chunk, records)
+            if not chunk:
+                break
+            self.totals['records'] += len(chunk)
+            replayed, fresh = [], []
+            for position, article in chunk:
+                url = article_url(article)
+                if url in seen:
+                    self.totals['duplicates'] += 1
+                    continue
+                seen.add(url)
+                (replayed if self._done_before(position) else fresh).append(article)
+
+            # Already stored stories only rebuild the clustering history
+            self.totals['replayed'] += len(replayed)
+            _, replayed_attachments = story_index.cluster(replayed)
+            stories, fresh_attachments = story_index.cluster(fresh)
+            for story_url, entries in itertools.chain(replayed_attachments.items(), fresh_attachments.items()):
+                attachments.setdefault(story_url, []).extend(entries)
+
+            end = chunk[-1][0]
+            if stories:
+                self.totals['stories'] += len(stories)
+                await queue.put((sequence, end, stories))
+            else:
+                self._chunk_finished(sequence, end)
+        for _ in range(self.workers):
+            await queue.put(None)
+
+    async def _enrich(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            sequence, end, stories = item
+            pipeline = EnrichmentPipeline(self.client, analyzer=self.client.analyzer,
+                                          mode=self.mode, cache=self.cache)
+            processed = await pipeline.enrich_all(stories, lm_available=True)
+            complete = [article for article in processed if article_url(article) not in pipeline.failures]
+            stored = await self.store.upsert_articles(complete)
+            self.stored_ids.extend(article.id for article in stored)
+            self.totals['stored'] += len(stored)
+            self.totals['failed'] += len(stories) - len(complete)
+            self.totals['cache_hits'] += pipeline.cache_hits
+            self._chunk_finished(sequence, end, len(stories) - len(complete))
+
+    async def run(self, since: date, until: date, resume: bool = True) -> Dict:
+        """Replay since..until (inclusive) and return the throughput report"""
+        if not await self.client.health_check():
+            raise RuntimeError("LM Studio is offline; nothing to re-enrich with")
+        self._checkpoint = Checkpoint(self.checkpoint_path, since, until)
+        self._resume_from = self._checkpoint.load() if resume else None
+        if self._resume_from:
+            logger.info(f"Resuming backfill after {self._resume_from[0]}:{self._resume_from[1]}")
+
+        analyzer = self.client.analyzer
+        baseline = analyzer.get_stats() if analyzer is not None else {}
+        self._started = time.perf_counter()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=2 * self.workers)
+        attachments: Dict[str, List[Dict]] = {}
+        # A failing worker stops the run; the checkpoint keeps what was stored
+        tasks = [asyncio.create_task(self._produce(since, until, queue, attachments))]
+        tasks += [asyncio.create_task(self._enrich(queue)) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        related = await self.store.attach_related(attachments)
+        elapsed = time.perf_counter() - self._started
+
+        usage = analyzer.get_stats() if analyzer is not None else {}
+        prompt_tokens = usage.get('prompt_tokens', 0) - baseline.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0) - baseline.get('completion_tokens', 0)
+        return {
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'resumed_from': list(self._resume_from) if self._resume_from else None,
+            'checkpoint_held': self._held,
+            'workers': self.workers,
+            'mode': self.mode,
+            **self.totals,
+            'related_updated': related,
+            'seconds': round(elapsed, 2),
+            'articles_per_second': round(self.totals['stored'] / elapsed, 2) if elapsed else 0.0,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'tokens_per_second': round((prompt_tokens + completion_tokens) / elapsed, 1) if elapsed else 0.0,
+            'completion_tokens_per_second': round(completion_tokens / elapsed, 1) if elapsed else 0.0
+        }
+
+
+async def notify_live_workers(article_ids: List[int]):
+    """Tell running app workers (when sharing Redis) about stored articles
+
+    Every worker drops its cached responses; the leader embeds the articles.
+    """
+    bus = create_pubsub()
+    await bus.start()
+    try:
+        await bus.publish(CONTROL_CHANNEL, json.dumps({"action": "invalidate"}))
+        await bus.publish(CONTROL_CHANNEL, json.dumps({"action": "embed", "ids": article_ids}))
+    finally:
+        await bus.stop()
+
+
+async def run_backfill(args) -> Dict:
+    store = await ArticleStore().open()
+    client = SharedLMClient()
+    cache = None
+    if not args.no_cache:
+        cache = EnrichmentCache(model=client.pool.model_key, prompt_version=f"{PROMPT_VERSION}/{args.mode}")
+        await cache.open()
+    await client.open()
+    try:
+        backfill = Backfill(RawArchive(args.archive), store, client, cache, workers=args.workers,
+                            chunk_size=args.chunk, checkpoint_path=args.checkpoint, mode=args.mode)
+        report = await backfill.run(args.since, args.until, resume=not args.restart)
+        if report['stored']:
+            await notify_live_workers(backfill.stored_ids)
+        return report
+    finally:
+        await client.close()
+        if cache is not None:
+            await cache.close()
+        await store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--since", type=date.fromisoformat, required=True, help="first day (YYYY-MM-DD, UTC)")
+    parser.add_argument("--until", type=date.fromisoformat, default=date.today(), help="last day, inclusive")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    parser.add_argument("--chunk", type=int, default=BACKFILL_CHUNK, help="archive records per chunk")
+    parser.add_argument("--mode", choices=("separate", "combined", "batch", "stream"), default=ENRICHMENT_MODE)
+    parser.add_argument("--archive", default=RAW_ARCHIVE_DIR)
+    parser.add_argument("--checkpoint", default=BACKFILL_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint")
+    parser.add_argument("--no-cache", action="store_true", help="re-enrich even unchanged prompts")
+    args = parser.parse_args()
+
+    configure_logging()
+    try:
+        report = asyncio.run(run_backfill(args))
+    except RuntimeError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
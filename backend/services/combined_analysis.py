@@ -0,0 +1,405 @@
+"""
+Single-prompt article analysis against LM Studio's OpenAI-compatible API
+
+One completion returns category, summary, sentiment and keywords together
+instead of the four separate prompts issued by LMStudioClient. A batch
+variant packs several articles into one request within a token budget, and
+a streamed variant reports the metadata and summary while they are generated.
+Single-field prompts cover the separate tasks when a backend pool is
+configured. Requests are routed through an LMPool (see lm_pool.py).
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from backend.services.lm_pool import LMPool
+from backend.services.single_flight import SingleFlight
+
+LM_STUDIO_URL = os.getenv("LM_STUDIO_URL", "http://localhost:1234")
+LM_STUDIO_MODEL = os.getenv("LM_STUDIO_MODEL", "local-model")
+
+BATCH_TOKEN_BUDGET = int(os.getenv("ANALYSIS_BATCH_TOKEN_BUDGET", "3000"))
+BATCH_MAX_ARTICLES = int(os.getenv("ANALYSIS_BATCH_MAX_ARTICLES", "8"))
+MAX_CONTENT_CHARS = int(os.getenv("ANALYSIS_MAX_CONTENT_CHARS", "2000"))
+# Streamed summary text is forwarded in pieces of at least this many characters
+STREAM_CHUNK_CHARS = int(os.getenv("ANALYSIS_STREAM_CHUNK_CHARS", "48"))
+
+# Bump whenever the prompts change so cached enrichments are recomputed
+PROMPT_VERSION = "1"
+
+SENTIMENTS = ("Positive", "Negative", "Neutral")
+ANALYSIS_FIELDS = ("category", "summary", "sentiment", "keywords")
+
+SYSTEM_PROMPT = (
+    "You are a news analysis assistant. "
+    "Always answer with a single JSON value and nothing else."
+)
+
+FIELD_SPECS = {
+    'category': (
+        '"category" (one short category name such as Technology, Business, Science, '
+        'Health, Politics, Entertainment or Sports)'
+    ),
+    'summary': '"summary" (2-3 sentences)',
+    'sentiment': '"sentiment" (Positive, Negative or Neutral)',
+    'keywords': '"keywords" (a list of up to 5 short keywords)',
+}
+FIELD_SPEC = (
+    f"{FIELD_SPECS['category']}, {FIELD_SPECS['summary']}, "
+    f"{FIELD_SPECS['sentiment']} and {FIELD_SPECS['keywords']}"
+)
+ARTICLE_INSTRUCTIONS = f"Return a JSON object with the keys {FIELD_SPEC}."
+# Summary last, so the metadata is complete before the summary starts streaming
+STREAM_INSTRUCTIONS = (
+    'Return a JSON object with the keys "category" (one short category name such as '
+    'Technology, Business, Science, Health, Politics, Entertainment or Sports), '
+    '"sentiment" (Positive, Negative or Neutral), "keywords" (a list of up to 5 short '
+    'keywords) and "summary" (2-3 sentences), in exactly that order.'
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def _article_block(article: Dict, index: Optional[int] = None) -> str:
+    content = article.get('content', '')[:MAX_CONTENT_CHARS]
+    header = f"Article {index}\n" if index is not None else ""
+    return f"{header}Title: {article.get('title', '')}\nContent: {content}"
+
+
+def build_article_prompt(article: Dict) -> str:
+    return f"{ARTICLE_INSTRUCTIONS}\n\n{_article_block(article)}"
+
+
+def build_field_prompt(field: str, article: Dict) -> str:
+    return f"Return a JSON object with the key {FIELD_SPECS[field]}.\n\n{_article_block(article)}"
+
+
+def build_stream_prompt(article: Dict) -> str:
+    return f"{STREAM_INSTRUCTIONS}\n\n{_article_block(article)}"
+
+
+def build_batch_prompt(articles: List[Dict]) -> str:
+    blocks = "\n\n".join(_article_block(article, index) for index, article in enumerate(articles))
+    return (
+        f"Analyze each of the {len(articles)} articles below. "
+        'Answer with {"results": [...]} containing one object per article with an '
+        f'"index" key matching the article number and the keys {FIELD_SPEC}.\n\n' + blocks
+    )
+
+
+def pack_batches(articles: List[Dict], token_budget: int = BATCH_TOKEN_BUDGET,
+                 max_articles: int = BATCH_MAX_ARTICLES) -> List[List[int]]:
+    """Group article indexes into batches whose prompts fit the token budget.
+
+    An article that alone exceeds the budget still gets a batch of its own.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = estimate_tokens(build_batch_prompt([]))
+    base = used
+    for index, article in enumerate(articles):
+        cost = estimate_tokens(_article_block(article, index))
+        if current and (used + cost > token_budget or len(current) >= max_articles):
+            batches.append(current)
+            current, used = [], base
+        current.append(index)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_json_payload(text: str) -> Any:
+    """Extract a JSON value from a model reply, tolerating fences and chatter"""
+    if not text:
+        return None
+    text = text.strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1).strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    for opener, closer in (("{", "}"), ("[", "]")):
+        start, end = text.find(opener), text.rfind(closer)
+        if start != -1 and end > start:
+            try:
+                return json.loads(text[start:end + 1])
+            except ValueError:
+                continue
+    return None
+
+
+def normalize_analysis(data: Any) -> Dict[str, Any]:
+    """Keep only well-formed fields; missing ones are filled by the caller"""
+    if not isinstance(data, dict):
+        return {}
+    result: Dict[str, Any] = {}
+
+    category = data.get('category')
+    if isinstance(category, str) and category.strip():
+        result['category'] = category.strip()
+
+    summary = data.get('summary')
+    if isinstance(summary, str) and summary.strip():
+        result['summary'] = summary.strip()
+
+    sentiment = data.get('sentiment')
+    if isinstance(sentiment, str):
+        for label in SENTIMENTS:
+            if label.lower() in sentiment.lower():
+                result['sentiment'] = label
+                break
+
+    keywords = data.get('keywords')
+    if isinstance(keywords, str):
+        keywords = keywords.split(",")
+    if isinstance(keywords, list):
+        cleaned = [str(keyword).strip() for keyword in keywords if str(keyword).strip()]
+        if cleaned:
+            result['keywords'] = cleaned[:10]
+
+    return result
+
+
+def parse_batch_results(data: Any, count: int) -> List[Dict[str, Any]]:
+    """Align batch results with the submitted articles by index or position"""
+    if isinstance(data, dict):
+        data = data.get('results') or data.get('articles') or []
+    results: List[Dict[str, Any]] = [{} for _ in range(count)]
+    if not isinstance(data, list):
+        return results
+
+    for position, item in enumerate(data):
+        if not isinstance(item, dict):
+            continue
+        index = item.get('index', item.get('id', position))
+        try:
+            index = int(index)
+        except (TypeError, ValueError):
+            index = position
+        if 0 <= index < count and not results[index]:
+            results[index] = normalize_analysis(item)
+    return results
+
+
+_SUMMARY_KEY = re.compile(r'"summary"\s*:\s*"')
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class StreamingAnalysisParser:
+    """Incrementally reads a streamed STREAM_INSTRUCTIONS reply
+
+    ``feed`` returns the metadata fields once everything before the summary
+    has arrived (None otherwise) and any newly decoded summary text.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.metadata: Optional[Dict[str, Any]] = None
+        self.summary = ""
+        self._summary_start: Optional[int] = None
+        self._position = 0
+        self.summary_done = False
+
+    def feed(self, delta: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        self.text += delta
+        metadata = None
+        if self._summary_start is None:
+            match = _SUMMARY_KEY.search(self.text)
+            if not match:
+                return None, ""
+            self._summary_start = self._position = match.end()
+            head = self.text[:match.start()].rstrip().rstrip(",")
+            start = head.find("{")
+            if start != -1:
+                self.metadata = normalize_analysis(parse_json_payload(head[start:] + "}"))
+                metadata = self.metadata
+        return metadata, self._decode_summary()
+
+    def _decode_summary(self) -> str:
+        decoded = []
+        text, position = self.text, self._position
+        while position < len(text) and not self.summary_done:
+            char = text[position]
+            if char == '"':
+                self.summary_done = True
+                position += 1
+                break
+            if char == "\\":
+                if position + 1 >= len(text):
+                    break
+                code = text[position + 1]
+                if code == "u":
+                    # Surrogate pairs arrive as two escapes; wait for both
+                    high = text[position + 2:position + 4].lower()
+                    width = 12 if high[:1] == "d" and high[1:2] in "89ab" else 6
+                    if position + width > len(text):
+                        break
+                    decoded.append(json.loads(f'"{text[position:position + width]}"'))
+                    position += width
+                    continue
+                decoded.append(_ESCAPES.get(code, code))
+                position += 2
+                continue
+            decoded.append(char)
+            position += 1
+        self._position = position
+        piece = "".join(decoded)
+        self.summary += piece
+        return piece
+
+
+class CombinedAnalyzer:
+    """Issues combined and batched analysis prompts to LM Studio
+
+    Pass ``session`` to reuse an existing (pooled) aiohttp session; otherwise
+    the analyzer opens and closes its own. Identical prompts in flight at the
+    same time are sent once. Without a ``pool`` every request goes to
+    ``base_url``; with one, each task is routed to one of its backends.
+    """
+
+    def __init__(self, base_url: str = LM_STUDIO_URL, model: str = LM_STUDIO_MODEL,
+                 timeout: float = 120.0, session: Optional[aiohttp.ClientSession] = None,
+                 pool: Optional[LMPool] = None):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.pool = pool or LMPool.single(base_url, model)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session = session
+        self._owns_session = session is None
+        self._single_flight = SingleFlight()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    async def __aenter__(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.session and self._owns_session:
+            await self.session.close()
+            self.session = None
+
+    async def _complete(self, task: str, prompt: str, max_tokens: int) -> str:
+        # The model is filled in by whichever backend serves the request
+        payload = {
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.2,
+            "max_tokens": max_tokens
+        }
+        key = hashlib.sha256(json.dumps([task, payload], sort_keys=True).encode("utf-8")).hexdigest()
+        return await self._single_flight.do(key, lambda: self._post_completion(task, payload, prompt))
+
+    async def _post_completion(self, task: str, payload: Dict[str, Any], prompt: str) -> str:
+        async with self.pool.acquire(task) as backend:
+            async with self.session.post(
+                f"{backend.url}/v1/chat/completions", json={**payload, "model": backend.model},
+                timeout=self.timeout
+            ) as response:
+                response.raise_for_status()
+                data = await response.json()
+
+        self.requests += 1
+        usage = data.get('usage') or {}
+        self.prompt_tokens += usage.get('prompt_tokens', estimate_tokens(prompt))
+        self.completion_tokens += usage.get('completion_tokens', 0)
+        return data['choices'][0]['message']['content']
+
+    async def analyze_article(self, article: Dict) -> Dict[str, Any]:
+        """All four fields for one article from a single completion"""
+        reply = await self._complete('combined', build_article_prompt(article), max_tokens=400)
+        return normalize_analysis(parse_json_payload(reply))
+
+    async def analyze_field(self, task: str, field: str, article: Dict) -> Any:
+        """One field from a single-field prompt; raises ValueError if the reply lacks it"""
+        reply = await self._complete(task, build_field_prompt(field, article), max_tokens=300)
+        result = normalize_analysis(parse_json_payload(reply))
+        if field not in result:
+            raise ValueError(f"LM reply has no usable {field}")
+        return result[field]
+
+    async def analyze_batch(self, articles: List[Dict]) -> List[Dict[str, Any]]:
+        """All four fields for several articles from a single completion"""
+        if not articles:
+            return []
+        reply = await self._complete('batch', build_batch_prompt(articles), max_tokens=300 * len(articles))
+        return parse_batch_results(parse_json_payload(reply), len(articles))
+
+    async def _stream_completion(self, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        """Content deltas of a streamed (server-sent events) completion"""
+        payload = {
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.2,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        async with self.pool.acquire('stream') as backend, self.session.post(
+            f"{backend.url}/v1/chat/completions", json={**payload, "model": backend.model},
+            timeout=self.timeout
+        ) as response:
+            response.raise_for_status()
+            self.requests += 1
+            self.prompt_tokens += estimate_tokens(prompt)
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    continue
+                choices = chunk.get('choices') or [{}]
+                delta = (choices[0].get('delta') or {}).get('content')
+                if delta:
+                    self.completion_tokens += 1
+                    yield delta
+
+    async def stream_article(self, article: Dict) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield ("metadata", fields), then ("summary", text) pieces, then ("complete", fields)
+
+        Metadata is only yielded early when the model keeps the summary last;
+        the complete event always carries everything that could be parsed.
+        """
+        parser = StreamingAnalysisParser()
+        pending = ""
+        async for delta in self._stream_completion(build_stream_prompt(article), max_tokens=400):
+            metadata, piece = parser.feed(delta)
+            if metadata:
+                yield "metadata", metadata
+            pending += piece
+            if pending and (len(pending) >= STREAM_CHUNK_CHARS or parser.summary_done):
+                yield "summary", pending
+                pending = ""
+        if pending:
+            yield "summary", pending
+        yield "complete", normalize_analysis(parse_json_payload(parser.text))
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'requests': self.requests,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'coalesced': self._single_flight.coalesced
+        }
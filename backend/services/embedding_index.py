@@ -0,0 +1,330 @@
+"""
+Article embeddings and nearest-neighbour search
+
+Vectors come from LM Studio's OpenAI-compatible /v1/embeddings endpoint;
+when it is unreachable a deterministic hashing vectorizer stands in so
+offline runs still get (lexical) neighbours. Each row records which of the
+two produced it and searches only compare rows of the same kind.
+
+Vectors live in a memory-mapped float32 matrix on disk, L2-normalised so a
+dot product is the cosine similarity. Search is a brute-force NumPy scan,
+or an IVF index (k-means coarse quantiser, a few probed lists) once the
+matrix is large enough for the scan to show up in request latency.
+
+Removed articles leave a tombstoned row that the next new article reuses,
+so the matrix stays as large as the retained articles need.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+import numpy as np
+from loguru import logger
+
+from backend.services.combined_analysis import LM_STUDIO_URL
+
+EMBEDDING_MODEL = os.getenv("LM_STUDIO_EMBEDDING_MODEL", "text-embedding-nomic-embed-text-v1.5")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "768"))
+EMBEDDING_DIR = os.getenv("EMBEDDING_DIR", "data/embeddings")
+EMBEDDING_MAX_CHARS = int(os.getenv("EMBEDDING_MAX_CHARS", "2000"))
+# "auto" builds the IVF index once the matrix has IVF_MIN_ROWS rows; "on"/"off" force it
+EMBEDDING_IVF = os.getenv("EMBEDDING_IVF", "auto")
+IVF_MIN_ROWS = int(os.getenv("EMBEDDING_IVF_MIN_ROWS", "20000"))
+IVF_NPROBE = int(os.getenv("EMBEDDING_IVF_NPROBE", "8"))
+
+KIND_HASHING = 0
+KIND_LM = 1
+# Tombstone of a removed article's row; matches no search
+KIND_REMOVED = -1
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def embedding_text(article: Dict) -> str:
+    parts = (article.get('title', ''), article.get('summary', ''), article.get('content', ''))
+    return "\n".join(part for part in parts if part)[:EMBEDDING_MAX_CHARS]
+
+
+def hashing_vector(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Signed feature hashing of word unigrams and bigrams, L2-normalised"""
+    tokens = [token.lower() for token in _TOKEN.findall(text)]
+    features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        vector[value % dim] += 1.0 if value >> 63 else -1.0
+    return _normalize(vector)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+class Embedder:
+    """LM Studio embeddings with the hashing vectorizer as fallback"""
+
+    def __init__(self, base_url: str = LM_STUDIO_URL, model: str = EMBEDDING_MODEL,
+                 dim: int = EMBEDDING_DIM, session: Optional[aiohttp.ClientSession] = None):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.dim = dim
+        self.session = session
+        self.lm_vectors = 0
+        self.fallback_vectors = 0
+        self.last_error: Optional[str] = None
+
+    async def _lm_embeddings(self, texts: List[str]) -> np.ndarray:
+        payload = {"model": self.model, "input": texts}
+        async with self.session.post(f"{self.base_url}/v1/embeddings", json=payload) as response:
+            response.raise_for_status()
+            data = await response.json()
+        rows = sorted(data['data'], key=lambda row: row.get('index', 0))
+        vectors = np.asarray([row['embedding'] for row in rows], dtype=np.float32)
+        if vectors.shape != (len(texts), self.dim):
+            raise ValueError(f"expected {len(texts)}x{self.dim} embeddings, got {vectors.shape}")
+        return _normalize(vectors)
+
+    async def embed(self, texts: List[str], lm_available: bool = True) -> Tuple[np.ndarray, int]:
+        """Vectors for the texts and the kind of embedding that produced them"""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32), KIND_LM
+        if lm_available and self.session is not None:
+            try:
+                vectors = await self._lm_embeddings(texts)
+                self.lm_vectors += len(texts)
+                return vectors, KIND_LM
+            except Exception as e:
+                self.last_error = repr(e)
+                logger.warning(f"LM embeddings failed, using hashing vectors: {e!r}")
+        vectors = await asyncio.to_thread(lambda: np.stack([hashing_vector(text, self.dim) for text in texts]))
+        self.fallback_vectors += len(texts)
+        return vectors, KIND_HASHING
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'model': self.model,
+            'dim': self.dim,
+            'lm_vectors': self.lm_vectors,
+            'fallback_vectors': self.fallback_vectors,
+            'last_error': self.last_error
+        }
+
+
+class IVFIndex:
+    """Inverted-file index: rows grouped by their nearest k-means centroid"""
+
+    def __init__(self, centroids: np.ndarray, assignments: np.ndarray):
+        self.centroids = centroids
+        self.lists: List[np.ndarray] = [
+            np.flatnonzero(assignments == cluster) for cluster in range(len(centroids))
+        ]
+        self.trained_rows = len(assignments)
+
+    @classmethod
+    def train(cls, matrix: np.ndarray, nlist: int, iterations: int = 8, sample: int = 20000,
+              seed: int = 0) -> "IVFIndex":
+        rng = np.random.default_rng(seed)
+        rows = len(matrix)
+        training = matrix[rng.choice(rows, size=min(sample, rows), replace=False)]
+        centroids = training[rng.choice(len(training), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            nearest = np.argmax(training @ centroids.T, axis=1)
+            for cluster in range(nlist):
+                members = training[nearest == cluster]
+                if len(members):
+                    centroids[cluster] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+        assignments = np.concatenate([
+            np.argmax(matrix[start:start + 8192] @ centroids.T, axis=1)
+            for start in range(0, rows, 8192)
+        ])
+        return cls(centroids, assignments)
+
+    def add(self, rows: Sequence[int], vectors: np.ndarray):
+        for row, cluster in zip(rows, np.argmax(vectors @ self.centroids.T, axis=1)):
+            self.lists[cluster] = np.append(self.lists[cluster], row)
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        nprobe = min(nprobe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([self.lists[cluster] for cluster in probe])
+
+
+class EmbeddingIndex:
+    """Memory-mapped float32 vector store keyed by article id"""
+
+    def __init__(self, path: str = EMBEDDING_DIR, dim: int = EMBEDDING_DIM, ivf: str = EMBEDDING_IVF,
+                 ivf_min_rows: int = IVF_MIN_ROWS, nprobe: int = IVF_NPROBE):
+        self.path = path
+        self.dim = dim
+        self.ivf_mode = ivf
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+        self.count = 0
+        self.capacity = 0
+        self.vectors: Optional[np.memmap] = None
+        self.ids: Optional[np.memmap] = None
+        self.kinds: Optional[np.memmap] = None
+        self.rows_by_id: Dict[int, int] = {}
+        self.free_rows: List[int] = []
+        self.ivf: Optional[IVFIndex] = None
+        self.searches = 0
+        # add() and related() run in worker threads; the matrix may be remapped
+        self._lock = threading.Lock()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _map(self, capacity: int):
+        for name, dtype, shape in (("vectors.f32", np.float32, (capacity, self.dim)),
+                                   ("ids.i64", np.int64, (capacity,)),
+                                   ("kinds.i8", np.int8, (capacity,))):
+            size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            with open(self._file(name), "ab") as handle:
+                if handle.tell() < size:
+                    handle.truncate(size)
+        self.vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self.ids = np.memmap(self._file("ids.i64"), dtype=np.int64, mode="r+", shape=(capacity,))
+        self.kinds = np.memmap(self._file("kinds.i8"), dtype=np.int8, mode="r+", shape=(capacity,))
+        self.capacity = capacity
+
+    def open(self):
+        os.makedirs(self.path, exist_ok=True)
+        meta = {}
+        if os.path.exists(self._file("meta.json")):
+            with open(self._file("meta.json")) as handle:
+                meta = json.load(handle)
+        if meta and meta.get('dim') != self.dim:
+            logger.warning(f"Embedding dimension changed ({meta.get('dim')} -> {self.dim}); rebuilding index")
+            meta = {}
+        self.count = meta.get('count', 0)
+        self._map(max(1024, meta.get('capacity', 0), self.count))
+        kinds = np.asarray(self.kinds[:self.count])
+        self.free_rows = np.flatnonzero(kinds == KIND_REMOVED).tolist()
+        self.rows_by_id = {
+            int(article_id): row for row, article_id in enumerate(self.ids[:self.count])
+            if kinds[row] != KIND_REMOVED
+        }
+        self._maybe_build_ivf()
+        return self
+
+    def close(self):
+        if self.vectors is not None:
+            self.flush()
+            self.vectors = self.ids = self.kinds = None
+
+    def flush(self):
+        for array in (self.vectors, self.ids, self.kinds):
+            array.flush()
+        meta = {'dim': self.dim, 'count': self.count, 'capacity': self.capacity}
+        with open(self._file("meta.json.tmp"), "w") as handle:
+            json.dump(meta, handle)
+        os.replace(self._file("meta.json.tmp"), self._file("meta.json"))
+
+    def add(self, article_ids: Sequence[int], vectors: np.ndarray, kind: int):
+        """Insert or overwrite the vectors of the given articles"""
+        with self._lock:
+            new_rows = []
+            for article_id, vector in zip(article_ids, vectors):
+                row = self.rows_by_id.get(article_id)
+                if row is None and self.free_rows:
+                    row = self.free_rows.pop()
+                    self.rows_by_id[article_id] = row
+                    self.ids[row] = article_id
+                    new_rows.append(row)
+                elif row is None:
+                    if self.count == self.capacity:
+                        self.flush()
+                        self._map(self.capacity * 2)
+                    row = self.count
+                    self.count += 1
+                    self.rows_by_id[article_id] = row
+                    self.ids[row] = article_id
+                    new_rows.append(row)
+                self.vectors[row] = vector
+                self.kinds[row] = kind
+            self.flush()
+
+            if self.ivf is not None and new_rows:
+                self.ivf.add(new_rows, np.asarray(self.vectors[new_rows]))
+        self._maybe_build_ivf()
+
+    def remove(self, article_ids: Sequence[int]) -> int:
+        """Tombstone the vectors of deleted articles; returns how many were indexed"""
+        with self._lock:
+            removed = 0
+            for article_id in article_ids:
+                row = self.rows_by_id.pop(article_id, None)
+                if row is None:
+                    continue
+                self.kinds[row] = KIND_REMOVED
+                self.free_rows.append(row)
+                removed += 1
+            if removed:
+                self.flush()
+        return removed
+
+    def _maybe_build_ivf(self):
+        if self.ivf_mode == "off" or self.count < 2:
+            return
+        if self.ivf_mode == "auto" and self.count < self.ivf_min_rows:
+            return
+        # (Re)train when the index has doubled since the centroids were fitted.
+        # Training reads a snapshot outside the lock so searches keep running.
+        if self.ivf is None or self.count >= 2 * self.ivf.trained_rows:
+            with self._lock:
+                count, vectors = self.count, self.vectors
+            nlist = max(1, min(int(np.sqrt(count)), count // 2))
+            started = time.perf_counter()
+            ivf = IVFIndex.train(np.asarray(vectors[:count]), nlist)
+            with self._lock:
+                if self.count > count:
+                    ivf.add(range(count, self.count), np.asarray(self.vectors[count:self.count]))
+                self.ivf = ivf
+            logger.info(f"Built IVF index: {nlist} lists over {count} vectors "
+                        f"in {time.perf_counter() - started:.1f}s")
+
+    def related(self, article_id: int, k: int = 10) -> List[Tuple[int, float]]:
+        """(article id, cosine similarity) of the nearest neighbours"""
+        with self._lock:
+            row = self.rows_by_id.get(article_id)
+            if row is None:
+                return []
+            self.searches += 1
+            query = np.asarray(self.vectors[row])
+            if self.ivf is not None:
+                # A reused row can sit in its old list as well as its new one
+                rows = np.unique(self.ivf.candidates(query, self.nprobe))
+                scores = self.vectors[rows] @ query
+            else:
+                rows = np.arange(self.count)
+                scores = self.vectors[:self.count] @ query
+            if rows.size == 0:
+                return []
+
+            # Only compare vectors from the same embedding space, never the article itself
+            scores = np.where((self.kinds[rows] == self.kinds[row]) & (rows != row), scores, -np.inf)
+            k = min(k, rows.size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(int(self.ids[rows[i]]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'vectors': len(self.rows_by_id),
+            'rows': self.count,
+            'free_rows': len(self.free_rows),
+            'dim': self.dim,
+            'ivf_lists': len(self.ivf.centroids) if self.ivf is not None else 0,
+            'nprobe': self.nprobe,
+            'searches': self.searches
+        }
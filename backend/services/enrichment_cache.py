@@ -0,0 +1,151 @@
+"""
+Persistent cache of AI enrichment results keyed by article content hash
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+import aiosqlite
+
+ENRICHMENT_CACHE_PATH = os.getenv("ENRICHMENT_CACHE_PATH", "data/enrichment_cache.db")
+ENRICHMENT_CACHE_MAX_ENTRIES = int(os.getenv("ENRICHMENT_CACHE_MAX_ENTRIES", "50000"))
+ENRICHMENT_CACHE_TTL = float(os.getenv("ENRICHMENT_CACHE_TTL", str(30 * 24 * 3600)))
+# Eviction runs once per this many writes, so the cache may briefly exceed its size by as much
+ENRICHMENT_CACHE_EVICT_EVERY = int(os.getenv("ENRICHMENT_CACHE_EVICT_EVERY", "500"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", (text or "").strip().lower())
+
+
+def enrichment_key(title: str, content: str, model: str, prompt_version: str) -> str:
+    """Stable hash of the inputs that determine an enrichment result"""
+    payload = "\x1f".join((_normalize(title), _normalize(content), model, prompt_version))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EnrichmentCache:
+    """SQLite-backed enrichment cache with LRU and TTL eviction"""
+
+    def __init__(self, path: str = ENRICHMENT_CACHE_PATH, model: str = "",
+                 prompt_version: str = "", max_entries: int = ENRICHMENT_CACHE_MAX_ENTRIES,
+                 ttl: float = ENRICHMENT_CACHE_TTL, evict_every: int = ENRICHMENT_CACHE_EVICT_EVERY):
+        self.path = path
+        self.model = model
+        self.prompt_version = prompt_version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evict_every = max(evict_every, 1)
+        self._puts_since_evict = 0
+        self.db: Optional[aiosqlite.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def open(self):
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.db = await aiosqlite.connect(self.path)
+        await self.db.execute("PRAGMA journal_mode=WAL")
+        await self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS enrichment_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        await self.db.execute(
+            "CREATE INDEX IF NOT EXISTS ix_enrichment_cache_last_access "
+            "ON enrichment_cache (last_access)"
+        )
+        await self.db.execute(
+            "CREATE INDEX IF NOT EXISTS ix_enrichment_cache_created_at "
+            "ON enrichment_cache (created_at)"
+        )
+        await self.db.commit()
+        await self.evict()
+        return self
+
+    async def close(self):
+        if self.db:
+            await self.db.close()
+            self.db = None
+
+    def key_for(self, article: Dict) -> str:
+        return enrichment_key(article.get('title', ''), article.get('content', ''),
+                              self.model, self.prompt_version)
+
+    async def get(self, article: Dict) -> Optional[Dict[str, Any]]:
+        """Cached enrichment for an article, or None"""
+        key = self.key_for(article)
+        async with self.db.execute(
+            "SELECT value, created_at FROM enrichment_cache WHERE key = ?", (key,)
+        ) as cursor:
+            row = await cursor.fetchone()
+
+        now = time.time()
+        if row is None or now - row[1] > self.ttl:
+            self.misses += 1
+            return None
+
+        await self.db.execute(
+            "UPDATE enrichment_cache SET last_access = ? WHERE key = ?", (now, key)
+        )
+        await self.db.commit()
+        self.hits += 1
+        return json.loads(row[0])
+
+    async def put(self, article: Dict, enrichment: Dict[str, Any]):
+        now = time.time()
+        await self.db.execute(
+            "INSERT OR REPLACE INTO enrichment_cache (key, value, created_at, last_access) "
+            "VALUES (?, ?, ?, ?)",
+            (self.key_for(article), json.dumps(enrichment), now, now)
+        )
+        await self.db.commit()
+        self._puts_since_evict += 1
+        if self._puts_since_evict >= self.evict_every:
+            await self.evict()
+
+    async def evict(self):
+        """Drop expired entries, then least recently used ones over capacity"""
+        self._puts_since_evict = 0
+        cursor = await self.db.execute(
+            "DELETE FROM enrichment_cache WHERE created_at < ?", (time.time() - self.ttl,)
+        )
+        removed = cursor.rowcount
+        cursor = await self.db.execute(
+            """
+            DELETE FROM enrichment_cache WHERE key IN (
+                SELECT key FROM enrichment_cache ORDER BY last_access ASC
+                LIMIT max((SELECT COUNT(*) FROM enrichment_cache) - ?, 0)
+            )
+            """,
+            (self.max_entries,)
+        )
+        removed += cursor.rowcount
+        await self.db.commit()
+        self.evictions += max(removed, 0)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        entries = 0
+        if self.db:
+            async with self.db.execute("SELECT COUNT(*) FROM enrichment_cache") as cursor:
+                entries = (await cursor.fetchone())[0]
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+        }
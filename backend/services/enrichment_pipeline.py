@@ -0,0 +1,299 @@
+"""
+Concurrent AI enrichment pipeline for fetched articles
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from backend.services.article_store import article_url
+from backend.services.combined_analysis import pack_batches
+from backend.services.observability import (
+    ARTICLES_FAILED, ARTICLES_PROCESSED, CACHE_REQUESTS, LM_CALL_FAILURES, LM_CALL_SECONDS
+)
+
+ProgressCallback = Callable[[str, Dict, Any], Awaitable[None]]
+
+ENRICHMENT_CONCURRENCY = int(os.getenv("ENRICHMENT_CONCURRENCY", "4"))
+ENRICHMENT_CALL_TIMEOUT = float(os.getenv("ENRICHMENT_CALL_TIMEOUT", "60"))
+# "separate" (four prompts per article), "combined" (one prompt per article),
+# "batch" (several articles per prompt) or "stream" (one streamed prompt per
+# article, published piece by piece)
+ENRICHMENT_MODE = os.getenv("ENRICHMENT_MODE", "combined")
+
+ANALYSIS_TASKS = ("categorize", "summarize", "sentiment", "keywords")
+TASK_FIELDS = {
+    'categorize': 'category',
+    'summarize': 'summary',
+    'sentiment': 'sentiment',
+    'keywords': 'keywords',
+}
+
+
+def fallback_enrichment(article: Dict) -> Dict[str, Any]:
+    """Offline values used when LM Studio is unavailable or a call fails"""
+    return {
+        'category': "Technology",
+        'summary': article['content'][:200] + "...",
+        'sentiment': "Neutral",
+        'keywords': []
+    }
+
+
+def build_processed_article(article: Dict, enrichment: Dict, article_id: int) -> Dict:
+    """Merge a raw article with its AI enrichment"""
+    return {
+        'id': article_id,
+        'title': article['title'],
+        'content': article['content'],
+        'summary': enrichment['summary'],
+        'category': enrichment['category'],
+        'sentiment': enrichment['sentiment'],
+        'keywords': enrichment['keywords'],
+        'source': article['source'],
+        'url': article.get('url', ''),
+        'published': article.get('published', datetime.now(timezone.utc).isoformat()),
+        'processed_at': datetime.now(timezone.utc).isoformat(),
+        'related': article.get('related', [])
+    }
+
+
+class EnrichmentPipeline:
+    """Runs the four LM analyses for many articles with bounded concurrency.
+
+    A single semaphore caps the number of in-flight LM calls, so the four
+    analyses of one article and the analyses of different articles all share
+    the same budget. Every call has its own timeout; a failed or timed-out
+    call falls back to the offline value for that field only.
+
+    With an analyzer, "combined" and "batch" modes ask for all four fields in
+    one completion and only re-run the separate prompt for fields the reply
+    is missing.
+
+    With a cache, articles whose content hash was enriched before skip the
+    LM entirely; only results produced without any fallback are stored.
+
+    ``failures`` maps the URL of every article that failed outright or fell
+    back on any field to the error, so callers can retry it.
+
+    With ``on_progress``, every article is reported as soon as it is done
+    (``"complete"``); in "stream" mode it is also reported when its metadata
+    is known (``"metadata"``) and while its summary is generated
+    (``"summary"`` text pieces).
+    """
+
+    def __init__(self, client, concurrency: int = ENRICHMENT_CONCURRENCY,
+                 call_timeout: float = ENRICHMENT_CALL_TIMEOUT,
+                 analyzer=None, mode: str = ENRICHMENT_MODE, cache=None,
+                 on_progress: Optional[ProgressCallback] = None):
+        self.client = client
+        self.on_progress = on_progress
+        self.analyzer = analyzer
+        self.cache = cache
+        self.mode = mode if analyzer is not None else "separate"
+        self.concurrency = concurrency
+        self.call_timeout = call_timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        tasks = ANALYSIS_TASKS + ("combined", "batch", "stream")
+        self.timings: Dict[str, List[float]] = {task: [] for task in tasks}
+        self.call_failures: Dict[str, int] = {task: 0 for task in tasks}
+        self.article_failures = 0
+        self.failures: Dict[str, str] = {}
+        self.cache_hits = 0
+        # The analyzer may be app-scoped; report only this run's share
+        self._analyzer_baseline = analyzer.get_stats() if analyzer is not None else {}
+
+    async def _call(self, task: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                return await asyncio.wait_for(factory(), self.call_timeout)
+            except Exception:
+                LM_CALL_FAILURES.labels(task).inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                self.timings[task].append(elapsed)
+                LM_CALL_SECONDS.labels(task).observe(elapsed)
+
+    async def _analyze_combined(self, article: Dict) -> Dict[str, Any]:
+        try:
+            return await self._call('combined', lambda: self.analyzer.analyze_article(article))
+        except Exception as e:
+            self.call_failures['combined'] += 1
+            logger.warning(f"combined analysis failed for '{article['title'][:60]}': {e!r}")
+            return {}
+
+    async def _analyze_batch(self, articles: List[Dict]) -> List[Dict[str, Any]]:
+        try:
+            return await self._call('batch', lambda: self.analyzer.analyze_batch(articles))
+        except Exception as e:
+            self.call_failures['batch'] += 1
+            logger.warning(f"batch analysis of {len(articles)} articles failed: {e!r}")
+            return [{} for _ in articles]
+
+    async def _emit(self, stage: str, article: Dict, data: Any):
+        if self.on_progress is None:
+            return
+        try:
+            await self.on_progress(stage, article, data)
+        except Exception as e:
+            logger.warning(f"Progress callback failed at {stage}: {e!r}")
+
+    async def _analyze_stream(self, article: Dict) -> Dict[str, Any]:
+        async def consume():
+            async for stage, data in self.analyzer.stream_article(article):
+                if stage == "metadata":
+                    preview = {**fallback_enrichment(article), **data, 'summary': ''}
+                    await self._emit('metadata', article, build_processed_article(article, preview, 0))
+                elif stage == "summary":
+                    await self._emit('summary', article, data)
+                else:
+                    return data
+            return {}
+
+        try:
+            return await self._call('stream', consume)
+        except Exception as e:
+            self.call_failures['stream'] += 1
+            logger.warning(f"streamed analysis failed for '{article['title'][:60]}': {e!r}")
+            return {}
+
+    async def _cache_get(self, article: Dict) -> Optional[Dict[str, Any]]:
+        try:
+            cached = await self.cache.get(article)
+        except Exception as e:
+            logger.warning(f"Enrichment cache read failed: {e!r}")
+            return None
+        CACHE_REQUESTS.labels("enrichment", "miss" if cached is None else "hit").inc()
+        return cached
+
+    async def _cache_put(self, article: Dict, enrichment: Dict[str, Any]):
+        try:
+            await self.cache.put(article, enrichment)
+        except Exception as e:
+            logger.warning(f"Enrichment cache write failed: {e!r}")
+
+    async def enrich_article(self, article: Dict, lm_available: bool = True,
+                             partial: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Return category, summary, sentiment and keywords for one article
+
+        ``partial`` holds fields already produced by a batch completion.
+        """
+        fallback = fallback_enrichment(article)
+        if not lm_available:
+            return fallback
+
+        enrichment = dict(partial or {})
+        if partial is None and self.mode == "combined":
+            enrichment = await self._analyze_combined(article)
+        elif partial is None and self.mode == "stream":
+            enrichment = await self._analyze_stream(article)
+
+        title, content = article['title'], article['content']
+        calls = {
+            'categorize': lambda: self.client.categorize_article(title, content),
+            'summarize': lambda: self.client.summarize_article(title, content),
+            'sentiment': lambda: self.client.analyze_sentiment(content),
+            'keywords': lambda: self.client.extract_keywords(content),
+        }
+        calls = {task: factory for task, factory in calls.items()
+                 if TASK_FIELDS[task] not in enrichment}
+        results = await asyncio.gather(
+            *(self._call(task, factory) for task, factory in calls.items()),
+            return_exceptions=True
+        )
+
+        degraded = False
+        for task, result in zip(calls, results):
+            field = TASK_FIELDS[task]
+            if isinstance(result, BaseException):
+                self.call_failures[task] += 1
+                logger.warning(f"{task} failed for '{title[:60]}': {result!r}")
+                self.failures[article_url(article)] = f"{task}: {result!r}"
+                enrichment[field] = fallback[field]
+                degraded = True
+            else:
+                enrichment[field] = result
+
+        if self.cache is not None and not degraded:
+            await self._cache_put(article, enrichment)
+        return enrichment
+
+    async def enrich_all(self, articles: List[Dict], lm_available: bool = True) -> List[Dict]:
+        """Enrich all articles concurrently, dropping only the ones that fail outright"""
+        results: List[Any] = [None] * len(articles)
+        if self.cache is not None:
+            for index, article in enumerate(articles):
+                results[index] = await self._cache_get(article)
+        pending = [index for index, result in enumerate(results) if result is None]
+        self.cache_hits += len(articles) - len(pending)
+        for article, result in zip(articles, results):
+            if result is not None:
+                await self._emit('complete', article, build_processed_article(article, result, 0))
+
+        partials: Dict[int, Dict[str, Any]] = {}
+        if lm_available and self.mode == "batch" and pending:
+            batches = pack_batches([articles[index] for index in pending])
+            batch_results = await asyncio.gather(
+                *(self._analyze_batch([articles[pending[i]] for i in batch]) for batch in batches)
+            )
+            for batch, batch_result in zip(batches, batch_results):
+                for i, result in zip(batch, batch_result):
+                    partials[pending[i]] = result
+
+        async def enrich_and_report(index: int) -> Dict[str, Any]:
+            enrichment = await self.enrich_article(articles[index], lm_available, partials.get(index))
+            await self._emit('complete', articles[index], build_processed_article(articles[index], enrichment, 0))
+            return enrichment
+
+        enriched = await asyncio.gather(
+            *(enrich_and_report(index) for index in pending),
+            return_exceptions=True
+        )
+        for index, result in zip(pending, enriched):
+            results[index] = result
+
+        processed_articles = []
+        for article, result in zip(articles, results):
+            if isinstance(result, BaseException):
+                self.article_failures += 1
+                self.failures[article_url(article)] = repr(result)
+                ARTICLES_FAILED.inc()
+                logger.error(f"Error processing article: {result!r}")
+                continue
+            processed_articles.append(
+                build_processed_article(article, result, len(processed_articles) + 1)
+            )
+        ARTICLES_PROCESSED.inc(len(processed_articles))
+        return processed_articles
+
+    def report(self) -> Dict[str, Any]:
+        """Per-task call counts and latencies in seconds"""
+        tasks = {}
+        for task, samples in self.timings.items():
+            tasks[task] = {
+                'calls': len(samples),
+                'failures': self.call_failures[task],
+                'total': round(sum(samples), 3),
+                'mean': round(sum(samples) / len(samples), 3) if samples else 0.0,
+                'max': round(max(samples), 3) if samples else 0.0
+            }
+        report = {
+            'mode': self.mode,
+            'concurrency': self.concurrency,
+            'call_timeout': self.call_timeout,
+            'article_failures': self.article_failures,
+            'cache_hits': self.cache_hits,
+            'tasks': tasks
+        }
+        if self.analyzer is not None:
+            report['analyzer'] = {
+                key: value - self._analyzer_baseline.get(key, 0)
+                for key, value in self.analyzer.get_stats().items()
+            }
+        return report
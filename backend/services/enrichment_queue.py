@@ -0,0 +1,365 @@
+"""
+Durable priority queue of article enrichment jobs
+
+New stories are queued in SQLite before any LM work starts, so nothing is
+lost on a crash or restart. Workers claim the highest-priority due jobs; a
+claim that is not settled within ``ENRICHMENT_QUEUE_LEASE`` seconds is taken
+to belong to a process that stopped, and the job is requeued. Priority combines recency with the
+weight of the source and the number of outlets carrying the story.
+
+A job whose enrichment fails is retried with exponential backoff and
+jitter. After ``max_attempts`` it is moved to the dead letter state, where
+it stays for inspection until the story is queued again. When LM Studio cannot keep up, the queue grows
+past ``max_depth`` and the lowest-priority pending jobs are shed.
+"""
+
+import json
+import math
+import os
+import random
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import aiosqlite
+
+from backend.services.article_store import article_url, merge_related, utc_timestamp
+from backend.services.observability import QUEUE_DEPTH, QUEUE_JOBS, QUEUE_OLDEST_SECONDS
+
+ENRICHMENT_QUEUE_PATH = os.getenv("ENRICHMENT_QUEUE_PATH", "data/enrichment_queue.db")
+ENRICHMENT_QUEUE_MAX_DEPTH = int(os.getenv("ENRICHMENT_QUEUE_MAX_DEPTH", "500"))
+ENRICHMENT_QUEUE_BATCH = int(os.getenv("ENRICHMENT_QUEUE_BATCH", "20"))
+ENRICHMENT_QUEUE_MAX_ATTEMPTS = int(os.getenv("ENRICHMENT_QUEUE_MAX_ATTEMPTS", "5"))
+ENRICHMENT_QUEUE_RETRY_BASE = float(os.getenv("ENRICHMENT_QUEUE_RETRY_BASE", "30"))
+ENRICHMENT_QUEUE_RETRY_MAX = float(os.getenv("ENRICHMENT_QUEUE_RETRY_MAX", "3600"))
+# Longer than a batch can take, so a live worker's claims are never requeued under it
+ENRICHMENT_QUEUE_LEASE = float(os.getenv("ENRICHMENT_QUEUE_LEASE", "900"))
+# Doubling a story's weight ranks it like a story published this many hours later
+ENRICHMENT_QUEUE_WEIGHT_HOURS = float(os.getenv("ENRICHMENT_QUEUE_WEIGHT_HOURS", "6"))
+
+PENDING = "pending"
+RUNNING = "running"
+DEAD = "dead"
+
+
+def job_priority(article: Dict, source_weight: float = 1.0, now: Optional[float] = None) -> float:
+    """Publication time in hours, boosted by source weight and outlet count"""
+    now = time.time() if now is None else now
+    published = min(utc_timestamp(article.get('published')), now)
+    outlets = 1 + len(article.get('related') or [])
+    return published / 3600 + ENRICHMENT_QUEUE_WEIGHT_HOURS * math.log2(max(source_weight, 0.01) * outlets)
+
+
+def retry_delay(attempts: int, base: float = ENRICHMENT_QUEUE_RETRY_BASE,
+                cap: float = ENRICHMENT_QUEUE_RETRY_MAX) -> float:
+    """Exponential backoff with +/-20% jitter so retries do not arrive in lockstep"""
+    return min(cap, base * 2 ** max(attempts - 1, 0)) * random.uniform(0.8, 1.2)
+
+
+class EnrichmentQueue:
+    """SQLite-backed job queue with priorities, retries and load shedding
+
+    ``on_shed`` (optional) receives the URLs of shed jobs, whose stories
+    will never be stored.
+    """
+
+    def __init__(self, path: str = ENRICHMENT_QUEUE_PATH, max_depth: int = ENRICHMENT_QUEUE_MAX_DEPTH,
+                 max_attempts: int = ENRICHMENT_QUEUE_MAX_ATTEMPTS, lease: float = ENRICHMENT_QUEUE_LEASE,
+                 source_weights: Optional[Dict[str, float]] = None,
+                 on_shed: Optional[Callable[[List[str]], None]] = None):
+        self.path = path
+        self.max_depth = max_depth
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.source_weights = source_weights or {}
+        self.on_shed = on_shed
+        self.db: Optional[aiosqlite.Connection] = None
+        self.enqueued = 0
+        self.completed = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.shed = 0
+
+    async def open(self):
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.db = await aiosqlite.connect(self.path)
+        await self.db.execute("PRAGMA journal_mode=WAL")
+        await self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS enrichment_jobs (
+                url TEXT PRIMARY KEY,
+                article TEXT NOT NULL,
+                priority REAL NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                not_before REAL NOT NULL,
+                enqueued_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                last_error TEXT
+            )
+            """
+        )
+        await self.db.execute(
+            "CREATE INDEX IF NOT EXISTS ix_enrichment_jobs_ready "
+            "ON enrichment_jobs (status, priority DESC)"
+        )
+        await self.db.commit()
+        await self.requeue_expired()
+        await self._update_gauges()
+        return self
+
+    async def requeue_expired(self) -> int:
+        """Make jobs claimed longer than ``lease`` seconds ago due again
+
+        Other workers may open the queue while one is enriching, so only
+        claims old enough to belong to a process that stopped are requeued.
+        """
+        cursor = await self.db.execute(
+            "UPDATE enrichment_jobs SET status = ?, not_before = 0 WHERE status = ? AND updated_at < ?",
+            (PENDING, RUNNING, time.time() - self.lease)
+        )
+        await self.db.commit()
+        if cursor.rowcount:
+            await self._update_gauges()
+        return cursor.rowcount
+
+    async def close(self):
+        if self.db:
+            await self.db.close()
+            self.db = None
+
+    def priority_for(self, article: Dict) -> float:
+        return job_priority(article, self.source_weights.get(article.get('source', ''), 1.0))
+
+    async def enqueue(self, articles: Iterable[Dict]) -> int:
+        """Queue stories for enrichment; returns how many were new or revived
+
+        A story that is already pending takes the newer copy of the article;
+        a dead-lettered one starts over with a fresh set of attempts.
+        Queuing past ``max_depth`` sheds the lowest-priority pending jobs.
+        """
+        now = time.time()
+        rows = [
+            (article_url(article), json.dumps(article, default=str), self.priority_for(article),
+             PENDING, now, now, now)
+            for article in articles
+        ]
+        if not rows:
+            return 0
+        existing = set()
+        for offset in range(0, len(rows), 500):
+            urls = [row[0] for row in rows[offset:offset + 500]]
+            async with self.db.execute(
+                f"SELECT url FROM enrichment_jobs WHERE status != ? AND url IN ({','.join('?' * len(urls))})",
+                (DEAD, *urls)
+            ) as cursor:
+                existing.update(url for (url,) in await cursor.fetchall())
+        await self.db.executemany(
+            """
+            INSERT INTO enrichment_jobs (url, article, priority, status, not_before, enqueued_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET article = excluded.article, priority = excluded.priority,
+                updated_at = excluded.updated_at,
+                attempts = CASE WHEN enrichment_jobs.status = 'dead' THEN 0 ELSE enrichment_jobs.attempts END,
+                not_before = CASE WHEN enrichment_jobs.status = 'dead'
+                    THEN excluded.not_before ELSE enrichment_jobs.not_before END,
+                status = excluded.status
+            WHERE enrichment_jobs.status IN ('pending', 'dead')
+            """,
+            rows
+        )
+        await self.db.commit()
+        added = len({row[0] for row in rows} - existing)
+        self.enqueued += added
+        QUEUE_JOBS.labels("enqueued").inc(added)
+        await self._shed()
+        await self._update_gauges()
+        return added
+
+    async def _shed(self):
+        async with self.db.execute(
+            "SELECT COUNT(*) FROM enrichment_jobs WHERE status = ?", (PENDING,)
+        ) as cursor:
+            (depth,) = await cursor.fetchone()
+        excess = depth - self.max_depth
+        if excess <= 0:
+            return
+        async with self.db.execute(
+            "SELECT url FROM enrichment_jobs WHERE status = ? ORDER BY priority ASC LIMIT ?", (PENDING, excess)
+        ) as cursor:
+            urls = [url for (url,) in await cursor.fetchall()]
+        await self.db.executemany("DELETE FROM enrichment_jobs WHERE url = ?", [(url,) for url in urls])
+        await self.db.commit()
+        self.shed += len(urls)
+        QUEUE_JOBS.labels("shed").inc(len(urls))
+        if self.on_shed is not None:
+            self.on_shed(urls)
+
+    async def attach_related(self, attachments: Dict[str, List[Dict]]) -> int:
+        """Merge related coverage into stories still waiting in the queue"""
+        if not attachments:
+            return 0
+        placeholders = ",".join("?" * len(attachments))
+        async with self.db.execute(
+            f"SELECT url, article FROM enrichment_jobs WHERE status = ? AND url IN ({placeholders})",
+            (PENDING, *attachments)
+        ) as cursor:
+            jobs = await cursor.fetchall()
+        updates = []
+        for url, payload in jobs:
+            article = json.loads(payload)
+            incoming = [entry for entry in attachments[url] if entry.get('url') != url]
+            related = merge_related(article.get('related'), incoming)
+            if len(related) != len(article.get('related') or []):
+                article['related'] = related
+                updates.append((json.dumps(article, default=str), self.priority_for(article), url))
+        if updates:
+            await self.db.executemany(
+                "UPDATE enrichment_jobs SET article = ?, priority = ? WHERE url = ?", updates
+            )
+            await self.db.commit()
+        return len(updates)
+
+    async def claim(self, limit: int = ENRICHMENT_QUEUE_BATCH) -> List[Dict[str, Any]]:
+        """Mark up to ``limit`` due jobs as running, highest priority first"""
+        now = time.time()
+        async with self.db.execute(
+            """
+            SELECT url, article, attempts, enqueued_at FROM enrichment_jobs
+            WHERE status = ? AND not_before <= ? ORDER BY priority DESC LIMIT ?
+            """,
+            (PENDING, now, limit)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        if not rows:
+            return []
+        await self.db.executemany(
+            "UPDATE enrichment_jobs SET status = ?, updated_at = ? WHERE url = ?",
+            [(RUNNING, now, url) for url, *_ in rows]
+        )
+        await self.db.commit()
+        await self._update_gauges()
+        return [
+            {'url': url, 'article': json.loads(article), 'attempts': attempts, 'enqueued_at': enqueued_at}
+            for url, article, attempts, enqueued_at in rows
+        ]
+
+    def retrying(self, jobs: List[Dict[str, Any]], failures: Dict[str, str]) -> Set[str]:
+        """URLs of the failed jobs that ``settle`` will retry rather than dead-letter"""
+        return {
+            job['url'] for job in jobs
+            if job['url'] in failures and job['attempts'] + 1 < self.max_attempts
+        }
+
+    async def release(self, jobs: List[Dict[str, Any]], delay: float = 0.0):
+        """Return claimed jobs to pending without using up an attempt
+
+        For work that could not be attempted (LM Studio offline) or whose
+        results were not stored.
+        """
+        if not jobs:
+            return
+        now = time.time()
+        await self.db.executemany(
+            "UPDATE enrichment_jobs SET status = ?, not_before = ?, updated_at = ? WHERE url = ? AND status = ?",
+            [(PENDING, now + delay, now, job['url'], RUNNING) for job in jobs]
+        )
+        await self.db.commit()
+        await self._update_gauges()
+
+    async def settle(self, jobs: List[Dict[str, Any]], failures: Dict[str, str]) -> Set[str]:
+        """Record the outcome of claimed jobs; returns the URLs that will be retried
+
+        Jobs without a failure are done and removed. Failed jobs are retried
+        after a backoff, or dead-lettered once they reach ``max_attempts``.
+        Call it only once the results of the done jobs are stored.
+        """
+        now = time.time()
+        done, retries, dead = [], [], []
+        for job in jobs:
+            error = failures.get(job['url'])
+            if error is None:
+                done.append((job['url'],))
+                continue
+            attempts = job['attempts'] + 1
+            if attempts >= self.max_attempts:
+                dead.append((DEAD, attempts, now, error[:1000], job['url']))
+            else:
+                retries.append((PENDING, attempts, now + retry_delay(attempts), now, error[:1000], job['url']))
+
+        if done:
+            await self.db.executemany("DELETE FROM enrichment_jobs WHERE url = ?", done)
+        if retries:
+            await self.db.executemany(
+                "UPDATE enrichment_jobs SET status = ?, attempts = ?, not_before = ?, updated_at = ?, "
+                "last_error = ? WHERE url = ?",
+                retries
+            )
+        if dead:
+            await self.db.executemany(
+                "UPDATE enrichment_jobs SET status = ?, attempts = ?, updated_at = ?, last_error = ? "
+                "WHERE url = ?",
+                dead
+            )
+        await self.db.commit()
+
+        self.completed += len(done)
+        self.retried += len(retries)
+        self.dead_lettered += len(dead)
+        QUEUE_JOBS.labels("completed").inc(len(done))
+        QUEUE_JOBS.labels("retried").inc(len(retries))
+        QUEUE_JOBS.labels("dead_lettered").inc(len(dead))
+        await self._update_gauges()
+        return {url for *_, url in retries}
+
+    async def next_due(self) -> Optional[float]:
+        """Seconds until the next pending job may run, or None if none is pending"""
+        async with self.db.execute(
+            "SELECT MIN(not_before) FROM enrichment_jobs WHERE status = ?", (PENDING,)
+        ) as cursor:
+            (not_before,) = await cursor.fetchone()
+        return None if not_before is None else max(0.0, not_before - time.time())
+
+    async def dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        async with self.db.execute(
+            "SELECT url, attempts, last_error, updated_at FROM enrichment_jobs WHERE status = ? "
+            "ORDER BY updated_at DESC LIMIT ?",
+            (DEAD, limit)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return [
+            {'url': url, 'attempts': attempts, 'last_error': error, 'failed_at': failed_at}
+            for url, attempts, error, failed_at in rows
+        ]
+
+    async def _depths(self) -> Dict[str, Any]:
+        async with self.db.execute(
+            "SELECT status, COUNT(*), MIN(enqueued_at) FROM enrichment_jobs GROUP BY status"
+        ) as cursor:
+            rows = await cursor.fetchall()
+        now = time.time()
+        depths = {status: 0 for status in (PENDING, RUNNING, DEAD)}
+        oldest = {status: 0.0 for status in (PENDING, RUNNING, DEAD)}
+        for status, count, enqueued_at in rows:
+            depths[status] = count
+            oldest[status] = round(now - enqueued_at, 1)
+        return {'depth': depths, 'oldest_seconds': oldest}
+
+    async def _update_gauges(self):
+        depths = await self._depths()
+        for status, count in depths['depth'].items():
+            QUEUE_DEPTH.labels(status).set(count)
+        QUEUE_OLDEST_SECONDS.set(depths['oldest_seconds'][PENDING])
+
+    async def get_stats(self) -> Dict[str, Any]:
+        depths = await self._depths()
+        return {
+            **depths,
+            'max_depth': self.max_depth,
+            'max_attempts': self.max_attempts,
+            'enqueued': self.enqueued,
+            'completed': self.completed,
+            'retried': self.retried,
+            'dead_lettered': self.dead_lettered,
+            'shed': self.shed
+        }
@@ -0,0 +1,232 @@
+"""
+Per-source RSS scheduler with adaptive intervals
+
+Each feed is polled on its own interval. Feeds that keep changing are polled
+more often (down to their base interval), feeds that rarely change back off
+towards the maximum, and every delay gets random jitter so sources do not
+synchronise. New items are handed to a callback as soon as they are found.
+Downloads go through the shared FeedFetcher, so a 304 counts as unchanged.
+``fetch_all`` is the full refresh: every source once, through the same
+fetcher and bookkeeping.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from backend.services.feed_fetcher import FeedFetcher
+
+FEED_BASE_INTERVAL = float(os.getenv("FEED_BASE_INTERVAL", "300"))
+FEED_MAX_INTERVAL = float(os.getenv("FEED_MAX_INTERVAL", "3600"))
+FEED_JITTER = float(os.getenv("FEED_JITTER", "0.1"))
+FEED_FETCH_CONCURRENCY = int(os.getenv("FEED_FETCH_CONCURRENCY", "8"))
+
+# Override with NEWS_FEEDS='[{"name": "...", "url": "...", "interval": 600, "weight": 2}, ...]'
+# (weight ranks a source's stories higher in the enrichment queue; default 1)
+DEFAULT_FEEDS = [
+    {'name': 'TechCrunch', 'url': 'https://techcrunch.com/feed/'},
+    {'name': 'The Verge', 'url': 'https://www.theverge.com/rss/index.xml'},
+    {'name': 'Ars Technica', 'url': 'https://feeds.arstechnica.com/arstechnica/index'},
+    {'name': 'Wired', 'url': 'https://www.wired.com/feed/rss'},
+    {'name': 'MIT Technology Review', 'url': 'https://www.technologyreview.com/feed/'},
+    {'name': 'BBC Technology', 'url': 'https://feeds.bbci.co.uk/news/technology/rss.xml'},
+]
+
+# How quickly intervals react: halve after a change, grow 1.5x when unchanged
+SPEEDUP_FACTOR = 0.5
+BACKOFF_FACTOR = 1.5
+ERROR_BACKOFF_FACTOR = 2.0
+SEEN_URLS_PER_SOURCE = 1000
+
+
+def load_feed_sources() -> List["FeedSource"]:
+    feeds = json.loads(os.getenv("NEWS_FEEDS", "") or "null") or DEFAULT_FEEDS
+    return [
+        FeedSource(feed['name'], feed['url'], float(feed.get('interval', FEED_BASE_INTERVAL)),
+                   weight=float(feed.get('weight', 1.0)))
+        for feed in feeds
+    ]
+
+
+class FeedSource:
+    """Scheduling state for one feed"""
+
+    def __init__(self, name: str, url: str, base_interval: float = FEED_BASE_INTERVAL,
+                 max_interval: float = FEED_MAX_INTERVAL, weight: float = 1.0):
+        self.name = name
+        self.url = url
+        self.weight = weight
+        self.base_interval = base_interval
+        self.max_interval = max(max_interval, base_interval)
+        self.interval = base_interval
+        self.next_due = 0.0
+        self.seen_urls: Dict[str, None] = {}
+        self.last_checked: Optional[str] = None
+        self.last_changed: Optional[str] = None
+        self.checks = 0
+        self.changes = 0
+        self.errors = 0
+        self.new_items = 0
+        # Conditional request validators and transfer counters (see FeedFetcher)
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.last_status: Optional[int] = None
+        self.not_modified = 0
+        self.bytes_downloaded = 0
+        self.fetch_seconds = 0.0
+
+    def schedule(self, changed: Optional[bool]):
+        """Adapt the interval to the outcome of a check (None = error)"""
+        if changed is None:
+            factor = ERROR_BACKOFF_FACTOR
+        elif changed:
+            factor = SPEEDUP_FACTOR
+        else:
+            factor = BACKOFF_FACTOR
+        self.interval = min(self.max_interval, max(self.base_interval, self.interval * factor))
+        jitter = random.uniform(-FEED_JITTER, FEED_JITTER) * self.interval
+        self.next_due = time.monotonic() + self.interval + jitter
+
+    def remember(self, urls: List[str]) -> List[str]:
+        """Record item URLs and return the ones not seen before"""
+        unseen = [url for url in urls if url not in self.seen_urls]
+        for url in unseen:
+            self.seen_urls[url] = None
+        while len(self.seen_urls) > SEEN_URLS_PER_SOURCE:
+            self.seen_urls.pop(next(iter(self.seen_urls)))
+        return unseen
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'weight': self.weight,
+            'interval': round(self.interval, 1),
+            'next_check_in': round(max(0.0, self.next_due - time.monotonic()), 1),
+            'checks': self.checks,
+            'changes': self.changes,
+            'errors': self.errors,
+            'new_items': self.new_items,
+            'not_modified': self.not_modified,
+            'bytes_downloaded': self.bytes_downloaded,
+            'fetch_seconds': round(self.fetch_seconds, 3),
+            'last_status': self.last_status,
+            'last_checked': self.last_checked,
+            'last_changed': self.last_changed
+        }
+
+
+class FeedScheduler:
+    """Polls every source on its own adaptive schedule
+
+    ``on_new_items`` receives the new raw articles of one source at a time;
+    ``is_known`` (optional) filters out URLs that were already processed.
+    """
+
+    def __init__(self, sources: List[FeedSource],
+                 on_new_items: Callable[[List[Dict]], Awaitable[None]],
+                 is_known: Optional[Callable[[List[str]], Awaitable[set]]] = None,
+                 fetcher: Optional[FeedFetcher] = None,
+                 concurrency: int = FEED_FETCH_CONCURRENCY):
+        self.sources = sources
+        self.on_new_items = on_new_items
+        self.is_known = is_known
+        self.fetcher = fetcher or FeedFetcher()
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _download(self, source: FeedSource) -> Optional[List[Dict]]:
+        """The source's items; None (already rescheduled) after an error or a 304"""
+        async with self._semaphore:
+            source.checks += 1
+            source.last_checked = datetime.now().isoformat()
+            try:
+                articles = await self.fetcher.fetch(source)
+            except Exception as e:
+                source.errors += 1
+                source.schedule(None)
+                logger.bind(source=source.name).warning(f"Feed {source.name} failed: {e!r}")
+                return None
+
+        if articles is None:
+            source.schedule(False)
+        return articles
+
+    async def fetch_all(self) -> List[Dict]:
+        """Fetch every source once and return all their items
+
+        Validators and item URLs are recorded, so the scheduled checks that
+        follow only hand over what appeared since.
+        """
+        async def fetch(source: FeedSource) -> List[Dict]:
+            articles = await self._download(source)
+            if articles is None:
+                return []
+            source.schedule(bool(source.remember([article['url'] for article in articles])))
+            return articles
+
+        results = await asyncio.gather(*(fetch(source) for source in self.sources))
+        return [article for articles in results for article in articles]
+
+    async def check(self, source: FeedSource):
+        """Fetch one source, hand over its new items and reschedule it"""
+        articles = await self._download(source)
+        if articles is None:
+            return
+
+        by_url = {article['url']: article for article in articles}
+        unseen = source.remember(list(by_url))
+        source.schedule(bool(unseen))
+        if not unseen:
+            return
+
+        source.changes += 1
+        source.last_changed = source.last_checked
+        if self.is_known:
+            known = await self.is_known(unseen)
+            unseen = [url for url in unseen if url not in known]
+        # Every remembered item is handed over; the enrichment queue sheds by priority
+        new_articles = [by_url[url] for url in unseen]
+        if new_articles:
+            source.new_items += len(new_articles)
+            logger.bind(source=source.name, new_items=len(new_articles)).info(
+                f"{len(new_articles)} new items from {source.name}"
+            )
+            await self.on_new_items(new_articles)
+
+    async def run(self, is_active: Callable[[], bool] = lambda: True):
+        """Check due sources until cancelled; pauses while ``is_active`` is false
+
+        Each check runs as its own task, so a source whose new items are
+        still being enriched never delays the checks of other sources.
+        """
+        in_flight: Dict[FeedSource, asyncio.Task] = {}
+        try:
+            while True:
+                if not is_active():
+                    await asyncio.sleep(5)
+                    continue
+                now = time.monotonic()
+                for source in self.sources:
+                    if source not in in_flight and source.next_due <= now:
+                        task = asyncio.create_task(self.check(source))
+                        in_flight[source] = task
+                        task.add_done_callback(lambda _, source=source: in_flight.pop(source, None))
+
+                waiting = [source.next_due for source in self.sources if source not in in_flight]
+                delay = min(waiting) - now if waiting else 1.0
+                await asyncio.sleep(min(max(delay, 0.5), 30))
+        finally:
+            for task in list(in_flight.values()):
+                task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'fetcher': self.fetcher.get_stats(),
+            'bytes_downloaded': sum(source.bytes_downloaded for source in self.sources),
+            'sources': {source.name: source.get_stats() for source in self.sources}
+        }
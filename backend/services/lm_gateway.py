@@ -0,0 +1,159 @@
+"""
+App-scoped LM Studio access
+
+One SharedLMClient is opened in the FastAPI lifespan and reused by every
+refresh. It keeps the LMStudioClient context open, shares one keep-alive
+connection pool with the combined analyzer, coalesces identical in-flight
+requests and caches the health probe, so status readers never call LM Studio.
+
+Completions are routed through an LMPool. With LM_BACKENDS set, the four
+separate enrichment prompts go through the pool too, as single-field JSON
+prompts, so they can use model tiers. The health probe then asks every
+backend. Without it, they keep using LMStudioClient.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import aiohttp
+
+from backend.services.combined_analysis import CombinedAnalyzer, LM_STUDIO_MODEL, LM_STUDIO_URL
+from backend.services.lm_pool import LMPool
+from backend.services.lm_studio_client import LMStudioClient
+from backend.services.single_flight import SingleFlight
+
+LM_POOL_SIZE = int(os.getenv("LM_POOL_SIZE", "16"))
+LM_KEEPALIVE_TIMEOUT = float(os.getenv("LM_KEEPALIVE_TIMEOUT", "120"))
+LM_REQUEST_TIMEOUT = float(os.getenv("LM_REQUEST_TIMEOUT", "120"))
+# How long a health probe result is trusted, and how often it is refreshed
+LM_HEALTH_TTL = float(os.getenv("LM_HEALTH_TTL", "15"))
+LM_HEALTH_INTERVAL = float(os.getenv("LM_HEALTH_INTERVAL", "30"))
+
+
+class SharedLMClient:
+    """Long-lived LM Studio client with pooling, single-flight and cached health
+
+    Exposes the LMStudioClient methods used by EnrichmentPipeline; identical
+    concurrent calls (same method and arguments) share one request.
+    """
+
+    def __init__(self, base_url: str = LM_STUDIO_URL, model: str = LM_STUDIO_MODEL,
+                 health_ttl: float = LM_HEALTH_TTL, health_interval: float = LM_HEALTH_INTERVAL,
+                 client_factory: Callable[[], Any] = LMStudioClient, pool: Optional[LMPool] = None):
+        self.base_url = base_url
+        self.model = model
+        self.pool = pool or LMPool.from_env(base_url, model)
+        self.health_ttl = health_ttl
+        self.health_interval = health_interval
+        self.client_factory = client_factory
+        self.client = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.analyzer: Optional[CombinedAnalyzer] = None
+        self._single_flight = SingleFlight()
+        self._online = False
+        self._checked_at = 0.0
+        self._checked_at_iso: Optional[str] = None
+        self._probe_task: Optional[asyncio.Task] = None
+        self.health_probes = 0
+
+    async def open(self):
+        connector = aiohttp.TCPConnector(limit=LM_POOL_SIZE, keepalive_timeout=LM_KEEPALIVE_TIMEOUT)
+        self.session = aiohttp.ClientSession(
+            connector=connector, timeout=aiohttp.ClientTimeout(total=LM_REQUEST_TIMEOUT)
+        )
+        self.analyzer = await CombinedAnalyzer(self.base_url, self.model, LM_REQUEST_TIMEOUT,
+                                               session=self.session, pool=self.pool).__aenter__()
+        self.client = await self.client_factory().__aenter__()
+        await self.health_check()
+        self._probe_task = asyncio.create_task(self._probe_loop())
+        return self
+
+    async def close(self):
+        if self._probe_task:
+            self._probe_task.cancel()
+            self._probe_task = None
+        if self.client is not None:
+            await self.client.__aexit__(None, None, None)
+            self.client = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _coalesced(self, key, factory: Callable[[], Awaitable[Any]]) -> Any:
+        return await self._single_flight.do(key, factory)
+
+    async def _probe_backend(self, url: str) -> bool:
+        try:
+            async with self.session.get(f"{url}/v1/models", timeout=aiohttp.ClientTimeout(total=10)) as response:
+                return response.status == 200
+        except Exception:
+            return False
+
+    async def _probe(self) -> bool:
+        self.health_probes += 1
+        try:
+            if self.pool.configured:
+                results = await asyncio.gather(*(self._probe_backend(backend.url) for backend in self.pool.backends))
+                online = any(results)
+            else:
+                online = bool(await self.client.health_check())
+        except Exception:
+            online = False
+        self._online = online
+        self._checked_at = time.monotonic()
+        self._checked_at_iso = datetime.now().isoformat()
+        return online
+
+    async def health_check(self) -> bool:
+        """LM availability, probing at most once per TTL"""
+        if self._checked_at and time.monotonic() - self._checked_at < self.health_ttl:
+            return self._online
+        return await self._coalesced(('health_check',), self._probe)
+
+    def cached_health(self) -> bool:
+        """Last known availability; never touches LM Studio"""
+        return self._online
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.health_check()
+
+    def _field(self, task: str, field: str, title: str, content: str) -> Callable[[], Awaitable[Any]]:
+        article = {'title': title, 'content': content}
+        return lambda: self.analyzer.analyze_field(task, field, article)
+
+    async def categorize_article(self, title: str, content: str):
+        factory = (self._field('categorize', 'category', title, content) if self.pool.configured
+                   else lambda: self.client.categorize_article(title, content))
+        return await self._coalesced(('categorize', title, content), factory)
+
+    async def summarize_article(self, title: str, content: str):
+        factory = (self._field('summarize', 'summary', title, content) if self.pool.configured
+                   else lambda: self.client.summarize_article(title, content))
+        return await self._coalesced(('summarize', title, content), factory)
+
+    async def analyze_sentiment(self, content: str):
+        factory = (self._field('sentiment', 'sentiment', "", content) if self.pool.configured
+                   else lambda: self.client.analyze_sentiment(content))
+        return await self._coalesced(('sentiment', content), factory)
+
+    async def extract_keywords(self, content: str):
+        factory = (self._field('keywords', 'keywords', "", content) if self.pool.configured
+                   else lambda: self.client.extract_keywords(content))
+        return await self._coalesced(('keywords', content), factory)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'online': self._online,
+            'checked_at': self._checked_at_iso,
+            'health_ttl': self.health_ttl,
+            'health_probes': self.health_probes,
+            'pool_size': LM_POOL_SIZE,
+            'single_flight': self._single_flight.get_stats(),
+            'analyzer': self.analyzer.get_stats() if self.analyzer else {},
+            'pool': self.pool.get_stats()
+        }
@@ -0,0 +1,277 @@
+"""
+Routing of LM requests across several OpenAI-compatible backends
+
+LM_BACKENDS lists the servers as JSON, e.g.
+
+    [{"url": "http://gpu1:1234", "model": "qwen2.5-14b", "weight": 2, "max_concurrency": 6,
+      "tiers": ["large"]},
+     {"url": "http://gpu2:1234", "model": "qwen2.5-3b", "tiers": ["small"]}]
+
+Without it the pool holds one backend at LM_STUDIO_URL with no concurrency
+cap and no circuit breaker, so requests behave as before. LM_TASK_TIERS maps
+enrichment tasks to tiers, e.g. {"sentiment": "small", "summarize": "large"}.
+A task without a tier, or a backend without tiers, matches any.
+
+Each request goes to an available backend that serves the task's tier:
+- LM_ROUTING=least_outstanding (the default) picks the fewest requests in
+  flight per unit of weight.
+- LM_ROUTING=weighted picks at random in proportion to weight.
+
+A backend never has more than ``max_concurrency`` requests in flight. When
+every matching backend is full, requests wait for a slot.
+
+Every backend has a circuit breaker that opens when, over the last
+LM_BREAKER_WINDOW calls, the error rate reaches LM_BREAKER_ERROR_RATE or
+the smoothed latency exceeds LM_BREAKER_LATENCY. An open backend gets no
+traffic for LM_BREAKER_COOLDOWN seconds. After that, one trial request
+either closes the breaker or reopens it. When every backend of a task's
+tier is open, the task falls back to the backends of other tiers. When
+those are open too, requests fail fast with NoBackendAvailable; enrichment
+then falls back and the queue retries later.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+from backend.services.observability import LM_BACKEND_CALLS, LM_BACKEND_OPEN
+
+LM_BACKENDS = os.getenv("LM_BACKENDS", "")
+LM_TASK_TIERS = os.getenv("LM_TASK_TIERS", "")
+LM_ROUTING = os.getenv("LM_ROUTING", "least_outstanding")
+LM_BACKEND_CONCURRENCY = int(os.getenv("LM_BACKEND_CONCURRENCY", "8"))
+LM_BREAKER_WINDOW = int(os.getenv("LM_BREAKER_WINDOW", "20"))
+LM_BREAKER_MIN_CALLS = int(os.getenv("LM_BREAKER_MIN_CALLS", "5"))
+LM_BREAKER_ERROR_RATE = float(os.getenv("LM_BREAKER_ERROR_RATE", "0.5"))
+# Smoothed seconds per call that open the breaker; 0 disables the latency trip
+LM_BREAKER_LATENCY = float(os.getenv("LM_BREAKER_LATENCY", "45"))
+LM_BREAKER_COOLDOWN = float(os.getenv("LM_BREAKER_COOLDOWN", "30"))
+
+ROUTING_POLICIES = ("least_outstanding", "weighted")
+_LATENCY_SMOOTHING = 0.2
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class NoBackendAvailable(RuntimeError):
+    """Every backend that could serve the request has an open circuit"""
+
+
+class LMBackend:
+    """One OpenAI-compatible server, its limits and its circuit breaker
+
+    ``max_concurrency=None`` removes the cap and ``breaker=False`` the
+    circuit breaker.
+    """
+
+    def __init__(self, url: str, model: str, weight: float = 1.0,
+                 max_concurrency: Optional[int] = LM_BACKEND_CONCURRENCY, tiers: Sequence[str] = (),
+                 window: int = LM_BREAKER_WINDOW, min_calls: int = LM_BREAKER_MIN_CALLS,
+                 error_rate: float = LM_BREAKER_ERROR_RATE, max_latency: float = LM_BREAKER_LATENCY,
+                 cooldown: float = LM_BREAKER_COOLDOWN, breaker: bool = True):
+        self.url = url.rstrip("/")
+        self.model = model
+        self.weight = max(float(weight), 0.01)
+        self.max_concurrency = max(int(max_concurrency), 1) if max_concurrency is not None else None
+        self.breaker = breaker
+        self.tiers = frozenset(tiers)
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.max_latency = max_latency
+        self.cooldown = cooldown
+        self.outstanding = 0
+        self.latency: Optional[float] = None
+        self.outcomes: deque = deque(maxlen=window)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.trips = 0
+
+    @property
+    def name(self) -> str:
+        return f"{self.url}#{self.model}"
+
+    def serves(self, tier: Optional[str]) -> bool:
+        return tier is None or not self.tiers or tier in self.tiers
+
+    def available(self, now: float) -> bool:
+        if self.state == OPEN and now - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+        if self.state == OPEN:
+            return False
+        if self.state == HALF_OPEN:
+            # One trial request at a time
+            return self.outstanding == 0
+        return self.max_concurrency is None or self.outstanding < self.max_concurrency
+
+    def _trip(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self.trips += 1
+        LM_BACKEND_OPEN.labels(self.name).set(1)
+
+    def record(self, ok: bool, seconds: float, now: float):
+        self.calls += 1
+        self.outcomes.append(ok)
+        LM_BACKEND_CALLS.labels(self.name, "ok" if ok else "error").inc()
+        if ok:
+            self.latency = seconds if self.latency is None else (
+                _LATENCY_SMOOTHING * seconds + (1 - _LATENCY_SMOOTHING) * self.latency
+            )
+        else:
+            self.failures += 1
+        if not self.breaker:
+            return
+
+        slow = bool(self.max_latency) and self.latency is not None and self.latency > self.max_latency
+        if self.state == HALF_OPEN:
+            if ok and not slow:
+                self.state = CLOSED
+                self.outcomes.clear()
+                LM_BACKEND_OPEN.labels(self.name).set(0)
+            else:
+                self._trip(now)
+            return
+        if self.state == CLOSED and len(self.outcomes) >= self.min_calls:
+            errors = self.outcomes.count(False) / len(self.outcomes)
+            if errors >= self.error_rate or slow:
+                self._trip(now)
+
+    def get_stats(self) -> Dict:
+        return {
+            'url': self.url,
+            'model': self.model,
+            'weight': self.weight,
+            'tiers': sorted(self.tiers),
+            'max_concurrency': self.max_concurrency,
+            'breaker': self.breaker,
+            'outstanding': self.outstanding,
+            'state': self.state,
+            'calls': self.calls,
+            'failures': self.failures,
+            'trips': self.trips,
+            'latency_ms': round(1000 * self.latency, 1) if self.latency is not None else None
+        }
+
+
+def _load_json(value: str, default):
+    return json.loads(value) if value.strip() else default
+
+
+class LMPool:
+    """Chooses a backend per request and tracks its outcome"""
+
+    def __init__(self, backends: List[LMBackend], routing: str = LM_ROUTING,
+                 task_tiers: Optional[Dict[str, str]] = None, configured: bool = True):
+        if not backends:
+            raise ValueError("An LM pool needs at least one backend")
+        if routing not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown LM_ROUTING {routing!r}; expected one of {', '.join(ROUTING_POLICIES)}")
+        self.backends = backends
+        self.routing = routing
+        self.task_tiers = dict(task_tiers or {})
+        # False for the implicit single LM_STUDIO_URL backend
+        self.configured = configured
+        self._released = asyncio.Event()
+        self.waits = 0
+        self.rejected = 0
+        self.fallbacks = 0
+
+    @classmethod
+    def single(cls, url: str, model: str) -> "LMPool":
+        """Just ``url``, uncapped and without a breaker, like a plain client"""
+        return cls([LMBackend(url, model, max_concurrency=None, breaker=False)], configured=False)
+
+    @classmethod
+    def from_env(cls, default_url: str, default_model: str) -> "LMPool":
+        """LM_BACKENDS, or a single backend at the default URL"""
+        entries = _load_json(LM_BACKENDS, [])
+        if not entries:
+            return cls.single(default_url, default_model)
+        backends = [
+            LMBackend(
+                url=entry['url'],
+                model=entry.get('model') or default_model,
+                weight=entry.get('weight', 1.0),
+                max_concurrency=entry.get('max_concurrency', LM_BACKEND_CONCURRENCY),
+                tiers=entry.get('tiers') or ()
+            )
+            for entry in entries
+        ]
+        return cls(backends, LM_ROUTING, _load_json(LM_TASK_TIERS, {}))
+
+    @property
+    def model_key(self) -> str:
+        """The models that may serve each task, for enrichment cache keys
+
+        A single backend gives just its model name, as before pools existed.
+        """
+        if not self.configured:
+            return self.backends[0].model
+        backends = sorted(f"{backend.model}[{','.join(sorted(backend.tiers))}]" for backend in self.backends)
+        return json.dumps({'backends': backends, 'task_tiers': self.task_tiers}, sort_keys=True)
+
+    def _choose(self, ready: List[LMBackend]) -> LMBackend:
+        if self.routing == "weighted":
+            return random.choices(ready, weights=[backend.weight for backend in ready])[0]
+        return min(ready, key=lambda backend: (backend.outstanding / backend.weight, backend.latency or 0.0))
+
+    async def _claim(self, task: str) -> LMBackend:
+        tier = self.task_tiers.get(task)
+        candidates = [backend for backend in self.backends if backend.serves(tier)]
+        if not candidates:
+            raise NoBackendAvailable(f"No LM backend serves tier {tier!r} (task {task})")
+        waited = False
+        while True:
+            now = time.monotonic()
+            ready = [backend for backend in candidates if backend.available(now)]
+            if ready:
+                backend = self._choose(ready)
+                backend.outstanding += 1
+                return backend
+            if all(backend.state == OPEN for backend in candidates):
+                others = [backend for backend in self.backends if backend not in candidates]
+                if tier is not None and others:
+                    # Another tier's model is better than no answer
+                    self.fallbacks += 1
+                    candidates, tier = others, None
+                    continue
+                self.rejected += 1
+                raise NoBackendAvailable(f"Every LM backend for task {task} has an open circuit")
+            if not waited:
+                self.waits += 1
+                waited = True
+            self._released.clear()
+            await self._released.wait()
+
+    @asynccontextmanager
+    async def acquire(self, task: str) -> AsyncIterator[LMBackend]:
+        """Hold a slot on a backend for ``task``; an exception counts as a failure"""
+        backend = await self._claim(task)
+        start = time.monotonic()
+        ok = False
+        try:
+            yield backend
+            ok = True
+        finally:
+            now = time.monotonic()
+            backend.outstanding -= 1
+            backend.record(ok, now - start, now)
+            self._released.set()
+
+    def get_stats(self) -> Dict:
+        return {
+            'routing': self.routing,
+            'configured': self.configured,
+            'task_tiers': self.task_tiers,
+            'waits': self.waits,
+            'rejected': self.rejected,
+            'fallbacks': self.fallbacks,
+            'backends': [backend.get_stats() for backend in self.backends]
+        }
@@ -0,0 +1,135 @@
+"""
+Metrics, span tracing and structured logging
+
+Metrics use the Prometheus client and are served by ``/metrics``. Each
+worker exposes its own registry, so scrape every worker (or sum by instance).
+Cache hit ratios are ``hit / (hit + miss)`` over ``ainews_cache_requests_total``.
+
+``span`` times one stage of work: it observes ``ainews_stage_seconds``,
+optionally records the duration in a timings dict, and logs the stage with
+the trace id shared by every span of the same refresh. Logging goes through
+loguru; set LOG_JSON=1 for one JSON object per line.
+"""
+
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from loguru import logger
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_JSON = os.getenv("LOG_JSON", "").lower() in ("1", "true", "yes")
+
+_LM_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+_FETCH_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_BROADCAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+_STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+FEED_FETCH_SECONDS = Histogram(
+    "ainews_feed_fetch_seconds", "Time to fetch one feed", ["source"], buckets=_FETCH_BUCKETS
+)
+FEED_FETCHES = Counter(
+    "ainews_feed_fetches_total", "Feed fetches by outcome (ok, not_modified, error)", ["source", "result"]
+)
+LM_CALL_SECONDS = Histogram(
+    "ainews_lm_call_seconds", "LM call latency by enrichment task", ["task"], buckets=_LM_BUCKETS
+)
+LM_CALL_FAILURES = Counter(
+    "ainews_lm_call_failures_total", "Failed or timed-out LM calls by task", ["task"]
+)
+LM_BACKEND_CALLS = Counter(
+    "ainews_lm_backend_calls_total", "LM requests per pooled backend by outcome (ok, error)",
+    ["backend", "result"]
+)
+LM_BACKEND_OPEN = Gauge("ainews_lm_backend_circuit_open", "1 while a backend's circuit breaker is open", ["backend"])
+ARTICLES_PROCESSED = Counter("ainews_articles_processed_total", "Articles enriched and stored")
+ARTICLES_FAILED = Counter("ainews_articles_failed_total", "Articles dropped because enrichment failed")
+CACHE_REQUESTS = Counter(
+    "ainews_cache_requests_total", "Cache lookups by cache and result (hit, miss)", ["cache", "result"]
+)
+WEBSOCKET_CONNECTIONS = Gauge("ainews_websocket_connections", "Open WebSocket connections on this worker")
+BROADCAST_SECONDS = Histogram(
+    "ainews_broadcast_seconds", "Time to encode and publish one broadcast", ["type"],
+    buckets=_BROADCAST_BUCKETS
+)
+WEBSOCKET_SEND_SECONDS = Histogram(
+    "ainews_websocket_send_seconds", "Time to send one message to one client", buckets=_BROADCAST_BUCKETS
+)
+QUEUE_DEPTH = Gauge("ainews_enrichment_queue_depth", "Enrichment jobs by status", ["status"])
+QUEUE_OLDEST_SECONDS = Gauge(
+    "ainews_enrichment_queue_oldest_seconds", "Age of the oldest pending enrichment job"
+)
+QUEUE_JOBS = Counter(
+    "ainews_enrichment_queue_jobs_total",
+    "Enrichment job transitions (enqueued, completed, retried, dead_lettered, shed)", ["outcome"]
+)
+STAGE_SECONDS = Histogram(
+    "ainews_stage_seconds", "Duration of each ingest pipeline stage", ["stage"], buckets=_STAGE_BUCKETS
+)
+
+_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+
+
+def _console_format(record) -> str:
+    fields = "".join(f" <dim>{key}={{extra[{key}]}}</dim>" for key in record["extra"])
+    return (
+        "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+        "<cyan>{name}</cyan> - <level>{message}</level>" + fields + "\n{exception}"
+    )
+
+
+def configure_logging(level: str = LOG_LEVEL, json_lines: bool = LOG_JSON):
+    """Replace loguru's default sink with the app's console or JSON sink"""
+    logger.remove()
+    if json_lines:
+        logger.add(sys.stderr, level=level, serialize=True, enqueue=True)
+    else:
+        logger.add(sys.stderr, level=level, format=_console_format, enqueue=True)
+
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+@contextmanager
+def span(name: str, timings: Optional[Dict[str, float]] = None, **fields: Any) -> Iterator[Dict[str, Any]]:
+    """Time one stage; starts a new trace unless one is already active
+
+    Yields a dict; keys added to it are logged with the span.
+    """
+    trace_token = None
+    if _trace_id.get() is None:
+        trace_token = _trace_id.set(uuid.uuid4().hex[:16])
+    parent = _current_span.get()
+    span_token = _current_span.set(name)
+    trace_id = _trace_id.get()
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield fields
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current_span.reset(span_token)
+        if trace_token is not None:
+            _trace_id.reset(trace_token)
+        STAGE_SECONDS.labels(name).observe(duration)
+        if timings is not None:
+            timings[name] = round(duration, 3)
+        logger.bind(
+            trace_id=trace_id, span=name, parent=parent, status=status,
+            duration_ms=round(1000 * duration, 1), **fields
+        ).debug(f"span {name} finished")
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus text exposition and its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,209 @@
+"""
+Pub/sub and leader election backends for running several workers
+
+The in-process backend keeps single-worker deployments dependency free; the
+Redis backend (enabled by setting REDIS_URL) lets every uvicorn worker or
+replica see every broadcast and elects one of them to run the news updater.
+"""
+
+import asyncio
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+REDIS_URL = os.getenv("REDIS_URL", "")
+LEADER_LOCK_TTL = float(os.getenv("LEADER_LOCK_TTL", "30"))
+# Refresh requests and cache invalidations between workers and tools
+CONTROL_CHANNEL = "ai-news:control"
+
+Handler = Callable[[str], Awaitable[None]]
+
+# Extend the lock only while we still own it
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class InProcessPubSub:
+    """Delivers messages to handlers in this process; every lock is granted"""
+
+    name = "in-process"
+
+    def __init__(self):
+        self.handlers: Dict[str, List[Handler]] = {}
+        self.locks: Dict[str, str] = {}
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        self.handlers.clear()
+
+    async def publish(self, channel: str, data: str):
+        for handler in list(self.handlers.get(channel, [])):
+            try:
+                await handler(data)
+            except Exception as e:
+                logger.error(f"Pub/sub handler error on {channel}: {e!r}")
+
+    async def subscribe(self, channel: str, handler: Handler):
+        self.handlers.setdefault(channel, []).append(handler)
+
+    async def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        return self.locks.setdefault(key, owner) == owner
+
+    async def renew_lock(self, key: str, owner: str, ttl: float) -> bool:
+        return self.locks.get(key) == owner
+
+    async def release_lock(self, key: str, owner: str):
+        if self.locks.get(key) == owner:
+            del self.locks[key]
+
+
+class RedisPubSub:
+    """Redis-backed pub/sub with SET NX PX leader locks
+
+    ``client`` may be any redis.asyncio-compatible client (e.g. fakeredis).
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = REDIS_URL, client=None):
+        self.url = url
+        self.client = client
+        self.handlers: Dict[str, List[Handler]] = {}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.client is None:
+            import redis.asyncio as redis
+            self.client = redis.from_url(self.url, decode_responses=True)
+        self._pubsub = self.client.pubsub()
+        return self
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        await self.client.aclose()
+
+    async def publish(self, channel: str, data: str):
+        await self.client.publish(channel, data)
+
+    async def subscribe(self, channel: str, handler: Handler):
+        self.handlers.setdefault(channel, []).append(handler)
+        await self._pubsub.subscribe(channel)
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis pub/sub error: {e!r}")
+                await asyncio.sleep(1)
+                continue
+            if not message:
+                continue
+
+            data = message['data']
+            if isinstance(data, bytes):
+                data = data.decode("utf-8")
+            for handler in list(self.handlers.get(message['channel'], [])):
+                try:
+                    await handler(data)
+                except Exception as e:
+                    logger.error(f"Pub/sub handler error on {message['channel']}: {e!r}")
+
+    async def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        return bool(await self.client.set(key, owner, nx=True, px=int(ttl * 1000)))
+
+    async def renew_lock(self, key: str, owner: str, ttl: float) -> bool:
+        return bool(await self.client.eval(_RENEW_SCRIPT, 1, key, owner, int(ttl * 1000)))
+
+    async def release_lock(self, key: str, owner: str):
+        await self.client.eval(_RELEASE_SCRIPT, 1, key, owner)
+
+
+def create_pubsub():
+    """Redis backend when REDIS_URL is set, otherwise in-process"""
+    if REDIS_URL:
+        return RedisPubSub(REDIS_URL)
+    return InProcessPubSub()
+
+
+class LeaderElector:
+    """Keeps trying to hold a TTL lock; exactly one holder is the leader"""
+
+    def __init__(self, bus, name: str = "ai-news:leader", ttl: float = LEADER_LOCK_TTL,
+                 owner: Optional[str] = None):
+        self.bus = bus
+        self.key = name
+        self.ttl = ttl
+        self.owner = owner or worker_id()
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await self._tick()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self.is_leader:
+            try:
+                await self.bus.release_lock(self.key, self.owner)
+            except Exception:
+                pass
+            self.is_leader = False
+
+    async def _tick(self):
+        try:
+            if self.is_leader:
+                self.is_leader = await self.bus.renew_lock(self.key, self.owner, self.ttl)
+                if not self.is_leader:
+                    logger.warning("Lost news updater leadership")
+            else:
+                self.is_leader = await self.bus.acquire_lock(self.key, self.owner, self.ttl)
+                if self.is_leader:
+                    logger.info(f"{self.owner} is now the news updater leader")
+        except Exception as e:
+            # Without the lock backend we cannot prove leadership; step down
+            logger.error(f"Leader election error: {e!r}")
+            self.is_leader = False
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            await self._tick()
+
+    async def wait_for_leadership(self):
+        while not self.is_leader:
+            await asyncio.sleep(self.ttl / 3)
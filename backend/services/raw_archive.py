@@ -0,0 +1,130 @@
+"""
+Append-only archive of raw fetched articles
+
+Every fetch appends its raw articles to gzip-compressed JSON Lines
+segments under RAW_ARCHIVE_DIR, one series of segments per UTC day
+(raw-2024-06-01-0000.jsonl.gz, ...). A segment is closed once it
+reaches RAW_ARCHIVE_SEGMENT_MB. Each append is written as its own gzip
+member, so segments are never rewritten and a crash can at most
+truncate the last member, which readers skip. A restarted process opens
+a new segment rather than appending after a truncated one.
+
+Records are ``{"archived_at": ..., "article": {...}}``. The archive is
+the input of backend/services/backfill.py.
+"""
+
+import gzip
+import os
+import re
+import threading
+import zlib
+from datetime import date, datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import orjson
+from loguru import logger
+
+RAW_ARCHIVE_DIR = os.getenv("RAW_ARCHIVE_DIR", "data/raw_archive")
+RAW_ARCHIVE_SEGMENT_MB = float(os.getenv("RAW_ARCHIVE_SEGMENT_MB", "64"))
+
+_SEGMENT_NAME = re.compile(r"^raw-(\d{4}-\d{2}-\d{2})-(\d{4})\.jsonl\.gz$")
+
+# (segment name, records read from it); positions compare in archive order
+Position = Tuple[str, int]
+
+
+def segment_name(day: date, sequence: int) -> str:
+    return f"raw-{day.isoformat()}-{sequence:04d}.jsonl.gz"
+
+
+class RawArchive:
+    """Writes and reads the day-partitioned raw article segments"""
+
+    def __init__(self, directory: str = RAW_ARCHIVE_DIR, segment_mb: float = RAW_ARCHIVE_SEGMENT_MB):
+        self.directory = directory
+        self.segment_bytes = int(segment_mb * 2 ** 20)
+        self._lock = threading.Lock()
+        self._current: Optional[Tuple[date, int]] = None
+        self.records_written = 0
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _day_segments(self, day: date) -> List[int]:
+        sequences = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_NAME.match(name)
+            if match and match.group(1) == day.isoformat():
+                sequences.append(int(match.group(2)))
+        return sorted(sequences)
+
+    def _writable_segment(self, day: date) -> str:
+        if self._current is None or self._current[0] != day:
+            # Never append after another process's possibly truncated tail
+            sequences = self._day_segments(day)
+            self._current = (day, sequences[-1] + 1 if sequences else 0)
+        sequence = self._current[1]
+        path = self._segment_path(segment_name(day, sequence))
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+            self._current = (day, sequence + 1)
+            path = self._segment_path(segment_name(day, sequence + 1))
+        return path
+
+    def append(self, articles: List[Dict], archived_at: Optional[datetime] = None) -> int:
+        """Archive one fetch's raw articles; returns the number written"""
+        if not articles:
+            return 0
+        archived_at = archived_at or datetime.now(timezone.utc)
+        stamp = archived_at.isoformat()
+        payload = b"".join(
+            orjson.dumps({'archived_at': stamp, 'article': article}, default=str) + b"\n"
+            for article in articles
+        )
+        member = gzip.compress(payload, compresslevel=6, mtime=0)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._writable_segment(archived_at.astimezone(timezone.utc).date())
+            with open(path, "ab") as f:
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+            self.records_written += len(articles)
+        return len(articles)
+
+    def segments(self, since: date, until: date) -> List[str]:
+        """Names of the segments for days since..until (inclusive), in order"""
+        if not os.path.isdir(self.directory):
+            return []
+        names = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_NAME.match(name)
+            if match and since <= date.fromisoformat(match.group(1)) <= until:
+                names.append(name)
+        return sorted(names)
+
+    def read(self, since: date, until: date) -> Iterator[Tuple[Position, Dict]]:
+        """Yield ((segment, records read so far), raw article) across the range"""
+        for name in self.segments(since, until):
+            line = 0
+            try:
+                with gzip.open(self._segment_path(name), "rb") as f:
+                    for raw_line in f:
+                        line += 1
+                        try:
+                            record = orjson.loads(raw_line)
+                        except orjson.JSONDecodeError:
+                            logger.warning(f"Skipping corrupt record {line} in {name}")
+                            continue
+                        yield (name, line), record['article']
+            except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+                # Interrupted append; everything before it is intact
+                logger.warning(f"Truncated raw archive segment {name} after {line} records: {e!r}")
+
+    def get_stats(self) -> Dict:
+        segments = self.segments(date.min, date.max)
+        return {
+            'directory': self.directory,
+            'segments': len(segments),
+            'bytes': sum(os.path.getsize(self._segment_path(name)) for name in segments),
+            'records_written': self.records_written
+        }
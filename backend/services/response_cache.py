@@ -0,0 +1,161 @@
+"""
+Versioned response cache with precompressed variants and ETags
+
+Read endpoints serialise their payload once per data version and keep the
+identity, gzip and (when the brotli package is installed) brotli encodings.
+Each variant has a strong ETag, so polling clients revalidate with
+If-None-Match and mostly get an empty 304. ``invalidate`` is called whenever
+new data is published and drops every entry at once.
+"""
+
+import gzip
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+from backend.services.observability import CACHE_REQUESTS
+from backend.services.single_flight import SingleFlight
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+RESPONSE_CACHE_ENTRIES = int(os.getenv("RESPONSE_CACHE_ENTRIES", "256"))
+# Payloads smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+
+
+class CachedResponse:
+    """One serialised payload and its encodings"""
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str,
+                 gzip_level: int = 6, brotli_quality: int = 5):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.digest = digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants: Dict[str, bytes] = {'identity': body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.variants['gzip'] = gzip.compress(body, compresslevel=gzip_level, mtime=0)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(body, quality=brotli_quality)
+        # Strong validators must differ per encoding
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == 'identity' else f'"{digest}-{encoding}"'
+            for encoding in self.variants
+        }
+
+    def choose_encoding(self, accept_encoding: str) -> str:
+        accepted = {
+            part.split(";")[0].strip().lower()
+            for part in accept_encoding.split(",")
+            if part.strip() and not part.replace(" ", "").endswith(";q=0")
+        }
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return 'identity'
+
+
+def _etag_matches(if_none_match: Optional[str], etags) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+def send_cached(request: Request, entry: CachedResponse, cache_control: Optional[str] = None) -> Response:
+    """The best encoding of ``entry`` for this request, or a 304 when the client has it"""
+    encoding = entry.choose_encoding(request.headers.get("accept-encoding", ""))
+    headers = {
+        'ETag': entry.etags[encoding],
+        'Cache-Control': cache_control or entry.cache_control,
+        'Vary': 'Accept-Encoding'
+    }
+    if _etag_matches(request.headers.get("if-none-match"), entry.etags.values()):
+        return Response(status_code=304, headers=headers)
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return Response(content=entry.variants[encoding], media_type=entry.media_type, headers=headers)
+
+
+class ResponseCache:
+    """Per-version cache of serialised responses keyed by path and query"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.version = 0
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._single_flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def invalidate(self):
+        """New data was published; every cached payload is stale"""
+        self.version += 1
+        self.entries.clear()
+        self.invalidations += 1
+
+    @staticmethod
+    def request_key(request: Request) -> str:
+        return f"{request.url.path}?{'&'.join(sorted(f'{k}={v}' for k, v in request.query_params.multi_items()))}"
+
+    async def _build(self, key: str, version: int, build: Callable[[], Awaitable[Any]],
+                     media_type: str, cache_control: str) -> CachedResponse:
+        payload = await build()
+        body = payload.encode("utf-8") if isinstance(payload, str) else orjson.dumps(payload, default=str)
+        entry = CachedResponse(body, media_type, cache_control)
+        # Data may have been swapped while building; never cache across versions
+        if version == self.version:
+            self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    async def respond(self, request: Request, build: Callable[[], Awaitable[Any]],
+                      media_type: str = "application/json",
+                      cache_control: str = "no-cache", key: Optional[str] = None) -> Response:
+        """Serve ``build()``'s payload (dict or str) from cache, or as a 304
+
+        ``key`` overrides the path-and-query key for pages that ignore the query.
+        """
+        key = key or self.request_key(request)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            CACHE_REQUESTS.labels("response", "hit").inc()
+            self.entries.move_to_end(key)
+        else:
+            self.misses += 1
+            CACHE_REQUESTS.labels("response", "miss").inc()
+            version = self.version
+            entry = await self._single_flight.do(
+                (key, version), lambda: self._build(key, version, build, media_type, cache_control)
+            )
+
+        response = send_cached(request, entry)
+        if response.status_code == 304:
+            self.not_modified += 1
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'version': self.version,
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'invalidations': self.invalidations,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            'brotli': brotli is not None
+        }
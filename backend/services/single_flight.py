@@ -0,0 +1,47 @@
+"""
+Single-flight request coalescing
+
+Concurrent callers asking for the same key share one in-flight call instead
+of each issuing their own.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time and shares its result
+
+    The shared call is shielded, so a caller that gives up (e.g. on a
+    timeout) does not cancel it for the others still waiting.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._calls[key] = future
+            self.calls += 1
+            future.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        # Mark the exception as retrieved when every waiter has given up
+        if not future.cancelled():
+            future.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': self.in_flight}
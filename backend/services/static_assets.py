@@ -0,0 +1,116 @@
+"""
+Fingerprinted, precompressed static assets and the homepage shell
+
+Every file under STATIC_DIR is read and compressed (gzip and, when
+installed, brotli) once at startup. Each is also served under a name that
+carries a hash of its content, e.g. /static/css/app.3f2a9c1d04be.css. Those
+URLs never change meaning, so they are cached for a year as immutable. The
+plain names still work but must be revalidated.
+
+The homepage template references assets by their plain names; ``render``
+rewrites known ones to the hashed URLs once at load. ``render_page`` then
+fills in the initial data snapshot. The caller caches the page per data
+version with an ETag and ``no-cache``, so a repeat visit costs one 304 for
+the page and nothing for its assets.
+"""
+
+import mimetypes
+import os
+import re
+from typing import Any, Dict
+
+import orjson
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+from backend.services.response_cache import CachedResponse, send_cached
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STATIC_DIR = os.getenv("STATIC_DIR", os.path.join(_PROJECT_ROOT, "static"))
+HOME_TEMPLATE = os.getenv("HOME_TEMPLATE", os.path.join(_PROJECT_ROOT, "frontend", "index.html"))
+STATIC_PREFIX = "/static"
+FINGERPRINT_LENGTH = 12
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_ASSET_REFERENCE = re.compile(r'(src|href)="/static/([^"?#]+)"')
+# Replaced by a JSON script element holding the initial data snapshot
+INITIAL_DATA_MARKER = "<!-- initial-data -->"
+
+
+def _media_type(path: str) -> str:
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type in ("application/javascript", "image/svg+xml"):
+        media_type += "; charset=utf-8"
+    return media_type
+
+
+def fingerprinted(path: str, digest: str) -> str:
+    """css/app.css -> css/app.<digest>.css"""
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+
+class StaticAssets:
+    """Static files kept in memory with their encodings and hashed names"""
+
+    def __init__(self, directory: str = STATIC_DIR, template: str = HOME_TEMPLATE):
+        self.directory = directory
+        self.template = template
+        self.files: Dict[str, CachedResponse] = {}
+        # Hashed name -> plain name
+        self.hashed: Dict[str, str] = {}
+        self.shell = ""
+
+    def load(self) -> "StaticAssets":
+        """Read and precompress every asset, then prepare the homepage shell"""
+        files, hashed = {}, {}
+        if os.path.isdir(self.directory):
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    full_path = os.path.join(root, name)
+                    path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+                    with open(full_path, "rb") as f:
+                        body = f.read()
+                    entry = CachedResponse(body, _media_type(path), REVALIDATE, gzip_level=9, brotli_quality=11)
+                    files[path] = entry
+                    hashed[fingerprinted(path, entry.digest)] = path
+        self.files, self.hashed = files, hashed
+
+        with open(self.template, encoding="utf-8") as f:
+            self.shell = self.render(f.read())
+        return self
+
+    def url(self, path: str) -> str:
+        """Hashed URL of an asset; unknown paths keep their plain URL"""
+        entry = self.files.get(path)
+        if entry is None:
+            return f"{STATIC_PREFIX}/{path}"
+        return f"{STATIC_PREFIX}/{fingerprinted(path, entry.digest)}"
+
+    def render(self, html: str) -> str:
+        """Point src/href references at the hashed asset URLs"""
+        return _ASSET_REFERENCE.sub(lambda match: f'{match.group(1)}="{self.url(match.group(2))}"', html)
+
+    def respond(self, request: Request, path: str) -> Response:
+        if path in self.hashed:
+            return send_cached(request, self.files[self.hashed[path]], IMMUTABLE)
+        entry = self.files.get(path)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Not found")
+        return send_cached(request, entry)
+
+    def render_page(self, initial_data: Dict[str, Any]) -> str:
+        """The homepage shell with ``initial_data`` embedded as JSON"""
+        # "<" escaped so no value can close the script element
+        payload = orjson.dumps(initial_data, default=str).decode("utf-8").replace("<", "\\u003c")
+        script = f'<script id="initial-data" type="application/json">{payload}</script>'
+        return self.shell.replace(INITIAL_DATA_MARKER, script, 1)
+
+    def get_stats(self) -> Dict:
+        return {
+            'files': len(self.files),
+            'bytes': sum(len(entry.variants['identity']) for entry in self.files.values()),
+            'shell_bytes': len(self.shell)
+        }
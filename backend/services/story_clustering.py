@@ -0,0 +1,209 @@
+"""
+Near-duplicate story clustering with MinHash signatures and LSH buckets
+
+The same story usually arrives from several feeds with slightly different
+titles. Articles are reduced to MinHash signatures over word shingles and
+bucketed by LSH bands, so finding the candidates for one article costs a few
+dictionary lookups no matter how many stories are indexed. Each cluster is
+enriched once through its representative; the other articles are attached
+to it as related coverage.
+"""
+
+import os
+import re
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from backend.services.article_store import article_url
+
+# 32 bands of 3 rows: pairs at Jaccard 0.4 become candidates ~88% of the
+# time, pairs at 0.1 ~3% of the time
+STORY_NUM_PERM = int(os.getenv("STORY_NUM_PERM", "96"))
+STORY_BANDS = int(os.getenv("STORY_BANDS", "32"))
+# Minimum estimated Jaccard similarity for two articles to be one story
+STORY_SIMILARITY = float(os.getenv("STORY_SIMILARITY", "0.4"))
+STORY_INDEX_SIZE = int(os.getenv("STORY_INDEX_SIZE", "5000"))
+# Words of content used next to the title; leads overlap, bodies diverge
+STORY_LEAD_WORDS = 40
+# Characters of the body that can hold the lead words
+STORY_LEAD_CHARS = STORY_LEAD_WORDS * 12
+
+_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, 2 ** 31, size=STORY_NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 2 ** 31, size=STORY_NUM_PERM, dtype=np.uint64)
+
+# Letters and digits of any script
+_WORD = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this "
+    "to was were will with after over new says said how why what".split()
+)
+
+
+def shingles(article: Dict) -> Set[str]:
+    """Content words of the title and the lead
+
+    Single words rather than n-grams: reworded headlines reorder words far
+    more often than they replace them.
+    """
+    title = _WORD.findall(article.get('title', '').casefold())
+    lead = _WORD.findall(article.get('content', '').casefold()[:STORY_LEAD_CHARS])[:STORY_LEAD_WORDS]
+    return {word for word in title + lead if word not in STOPWORDS}
+
+
+def minhash(tokens: Iterable[str]) -> np.ndarray:
+    """MinHash signature (one uint64 per permutation) of a token set"""
+    hashes = np.fromiter(
+        (zlib.crc32(token.encode("utf-8")) for token in tokens), dtype=np.uint64
+    )
+    if hashes.size == 0:
+        return np.full(STORY_NUM_PERM, _PRIME, dtype=np.uint64)
+    return ((np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _PRIME).min(axis=1)
+
+
+def is_empty(signature: np.ndarray) -> bool:
+    """Signature of an empty token set; real minima are always below _PRIME"""
+    return bool(signature[0] == _PRIME)
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(first == second)) / first.size
+
+
+def related_entry(article: Dict) -> Dict[str, str]:
+    return {
+        'source': article.get('source', ''),
+        'url': article.get('url', ''),
+        'title': article.get('title', ''),
+        'published': str(article.get('published', ''))
+    }
+
+
+class StoryIndex:
+    """LSH index of story signatures keyed by the representative's URL
+
+    Holds at most ``max_stories`` stories; the oldest are forgotten first.
+    """
+
+    def __init__(self, bands: int = STORY_BANDS, threshold: float = STORY_SIMILARITY,
+                 max_stories: int = STORY_INDEX_SIZE):
+        if STORY_NUM_PERM % bands:
+            raise ValueError("STORY_NUM_PERM must be a multiple of the band count")
+        self.bands = bands
+        self.rows = STORY_NUM_PERM // bands
+        self.threshold = threshold
+        self.max_stories = max_stories
+        self.signatures: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+        self.articles_seen = 0
+        self.duplicates = 0
+        self.attached_to_existing = 0
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def add(self, key: str, signature: np.ndarray):
+        # Empty signatures are all alike; such articles stay separate stories
+        if key in self.signatures or is_empty(signature):
+            return
+        self.signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self.buckets.setdefault(band_key, set()).add(key)
+        while len(self.signatures) > self.max_stories:
+            self._remove(next(iter(self.signatures)))
+
+    def _remove(self, key: str):
+        signature = self.signatures.pop(key)
+        for band_key in self._band_keys(signature):
+            bucket = self.buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band_key]
+
+    def discard(self, keys: Iterable[str]):
+        """Forget stories that will not be stored, so no duplicate attaches to them"""
+        for key in keys:
+            if key in self.signatures:
+                self._remove(key)
+
+    def match(self, signature: np.ndarray) -> Optional[str]:
+        """Key of the most similar indexed story above the threshold"""
+        if is_empty(signature):
+            return None
+        candidates: Set[str] = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self.buckets.get(band_key, ()))
+        best, best_score = None, self.threshold
+        for key in candidates:
+            score = similarity(signature, self.signatures[key])
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def seed(self, articles: Iterable[Dict]):
+        """Index already stored articles, e.g. after a restart"""
+        for article in articles:
+            self.add(article_url(article), minhash(shingles(article)))
+
+    def cluster(self, articles: List[Dict], limit: Optional[int] = None
+                ) -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+        """Group articles into stories
+
+        Returns the new stories (representatives carrying a ``related`` list,
+        in arrival order, at most ``limit``) and the articles that duplicate
+        an already indexed story, keyed by that story's URL. Only returned
+        stories are added to the index; ``discard`` the ones never stored.
+        """
+        self.articles_seen += len(articles)
+        signatures = [minhash(shingles(article)) for article in articles]
+
+        # Longest content first so each cluster is represented by its fullest version
+        order = sorted(range(len(articles)), key=lambda i: -len(articles[i].get('content', '')))
+        local = StoryIndex(self.bands, self.threshold, max_stories=len(articles) or 1)
+        members: Dict[int, List[int]] = {}
+        for i in order:
+            key = local.match(signatures[i])
+            if key is None:
+                local.add(str(i), signatures[i])
+                members[i] = []
+            else:
+                members[int(key)].append(i)
+
+        stories: List[Dict] = []
+        attachments: Dict[str, List[Dict]] = {}
+        for representative in sorted(members, key=lambda i: min([i] + members[i])):
+            group = [representative] + members[representative]
+            self.duplicates += len(group) - 1
+            existing = self.match(signatures[representative])
+            if existing is not None:
+                attachments.setdefault(existing, []).extend(related_entry(articles[i]) for i in group)
+                self.attached_to_existing += len(group)
+                continue
+            if limit is not None and len(stories) >= limit:
+                continue
+            story = dict(articles[representative])
+            story['related'] = [related_entry(articles[i]) for i in members[representative]]
+            stories.append(story)
+            self.add(article_url(story), signatures[representative])
+        return stories, attachments
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'stories_indexed': len(self.signatures),
+            'buckets': len(self.buckets),
+            'articles_seen': self.articles_seen,
+            'duplicates': self.duplicates,
+            'attached_to_existing': self.attached_to_existing
+        }
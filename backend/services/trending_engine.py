@@ -0,0 +1,161 @@
+"""
+Incremental trending topics with exponentially time-decayed counts
+
+Every term (LM keywords plus capitalised title words) owns one slot in two
+NumPy arrays: a short half-life "recent" count and a long half-life
+"baseline" count. Counts use forward decay: a mention at time t adds
+exp(t / tau) relative to a reference time, so recording an article touches
+only its own terms and never rescans history. Reading divides by
+exp(now / tau). The reference time moves forward now and then to keep the
+numbers finite.
+
+A topic trends when its recent rate is well above its own baseline rate
+(burst), not merely when it is mentioned often.
+"""
+
+import math
+import os
+import re
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from backend.services.article_store import utc_timestamp
+
+TRENDING_RECENT_HALF_LIFE = float(os.getenv("TRENDING_RECENT_HALF_LIFE", str(3 * 3600)))
+TRENDING_BASELINE_HALF_LIFE = float(os.getenv("TRENDING_BASELINE_HALF_LIFE", str(3 * 86400)))
+# A topic is bursting when its recent rate is this many times its baseline rate
+TRENDING_BURST_RATIO = float(os.getenv("TRENDING_BURST_RATIO", "3"))
+TRENDING_MIN_MENTIONS = float(os.getenv("TRENDING_MIN_MENTIONS", "2"))
+TRENDING_TOP_K = int(os.getenv("TRENDING_TOP_K", "10"))
+
+# Rates are smoothed by this many mentions per day so one-off terms do not
+# look infinitely bursty against an empty baseline
+_PRIOR_PER_SECOND = 1.0 / 86400
+# Move the reference time once exp() factors reach e**_MAX_EXPONENT
+_MAX_EXPONENT = 50.0
+
+_TITLE_WORD = re.compile(r"\b[A-Z][\w\-\.]*[A-Za-z0-9]")
+_TITLE_STOPWORDS = frozenset(
+    "A An And The This That These Those How Why What When Where Who New Is Are Was "
+    "Will Can Could Should Would It Its In On Of For To With After Before As At By".split()
+)
+
+
+def article_terms(article: Dict) -> Dict[str, str]:
+    """Normalised term -> display form for one article"""
+    terms: Dict[str, str] = {}
+    for keyword in article.get('keywords') or []:
+        keyword = str(keyword).strip()
+        if keyword:
+            terms.setdefault(keyword.lower(), keyword)
+    for word in _TITLE_WORD.findall(article.get('title', '')):
+        if word not in _TITLE_STOPWORDS and len(word) > 2:
+            terms.setdefault(word.lower(), word)
+    return terms
+
+
+class TrendingEngine:
+    """Time-decayed term counts with burst scores
+
+    ``update`` costs O(terms in the new articles); ``top`` is one vectorised
+    pass over the vocabulary.
+    """
+
+    def __init__(self, recent_half_life: float = TRENDING_RECENT_HALF_LIFE,
+                 baseline_half_life: float = TRENDING_BASELINE_HALF_LIFE,
+                 capacity: int = 1024):
+        self.recent_tau = recent_half_life / math.log(2)
+        self.baseline_tau = baseline_half_life / math.log(2)
+        self.reference = time.time()
+        self.index: Dict[str, int] = {}
+        self.labels: List[str] = []
+        self.recent = np.zeros(capacity, dtype=np.float64)
+        self.baseline = np.zeros(capacity, dtype=np.float64)
+        self.articles_seen = 0
+
+    def _slot(self, term: str, label: str) -> int:
+        slot = self.index.get(term)
+        if slot is None:
+            slot = len(self.labels)
+            if slot == self.recent.size:
+                self.recent = np.concatenate([self.recent, np.zeros(slot)])
+                self.baseline = np.concatenate([self.baseline, np.zeros(slot)])
+            self.index[term] = slot
+            self.labels.append(label)
+        return slot
+
+    def _rebase(self, now: float):
+        """Fold decay into the stored counts and drop negligible terms"""
+        self.recent[:len(self.labels)] *= math.exp(-(now - self.reference) / self.recent_tau)
+        self.baseline[:len(self.labels)] *= math.exp(-(now - self.reference) / self.baseline_tau)
+        self.reference = now
+
+        keep = np.flatnonzero(self.baseline[:len(self.labels)] >= 1e-3)
+        if keep.size < len(self.labels):
+            recent = np.zeros(max(1024, 2 * keep.size))
+            baseline = np.zeros_like(recent)
+            recent[:keep.size] = self.recent[keep]
+            baseline[:keep.size] = self.baseline[keep]
+            self.recent, self.baseline = recent, baseline
+            self.labels = [self.labels[slot] for slot in keep]
+            self.index = {label.lower(): slot for slot, label in enumerate(self.labels)}
+
+    def update(self, articles: Iterable[Dict], now: Optional[float] = None):
+        """Record newly processed articles (each story counts once per source)"""
+        now = time.time() if now is None else now
+        if (now - self.reference) / self.recent_tau > _MAX_EXPONENT:
+            self._rebase(now)
+
+        slots: List[int] = []
+        stamps: List[float] = []
+        for article in articles:
+            self.articles_seen += 1
+            published = utc_timestamp(article.get('published'))
+            stamp = min(published, now) - self.reference
+            weight = 1 + len(article.get('related') or [])
+            for term, label in article_terms(article).items():
+                slots.extend([self._slot(term, label)] * weight)
+                stamps.extend([stamp] * weight)
+        if not slots:
+            return
+
+        slots_array = np.asarray(slots)
+        stamps_array = np.asarray(stamps)
+        np.add.at(self.recent, slots_array, np.exp(stamps_array / self.recent_tau))
+        np.add.at(self.baseline, slots_array, np.exp(stamps_array / self.baseline_tau))
+
+    def top(self, k: int = TRENDING_TOP_K, now: Optional[float] = None) -> List[Dict]:
+        """Topics ranked by recent volume weighted by burstiness"""
+        if not self.labels:
+            return []
+        now = time.time() if now is None else now
+        size = len(self.labels)
+        recent = self.recent[:size] * math.exp(-(now - self.reference) / self.recent_tau)
+        baseline = self.baseline[:size] * math.exp(-(now - self.reference) / self.baseline_tau)
+
+        # Decayed count / tau approximates the mention rate over each window
+        recent_rate = recent / self.recent_tau
+        baseline_rate = baseline / self.baseline_tau
+        burst = (recent_rate + _PRIOR_PER_SECOND) / (baseline_rate + _PRIOR_PER_SECOND)
+        score = np.where(recent >= TRENDING_MIN_MENTIONS, recent * np.log1p(burst), 0.0)
+
+        k = min(k, size)
+        candidates = np.argpartition(-score, k - 1)[:k]
+        ranked = candidates[np.argsort(-score[candidates])]
+        return [
+            {
+                'topic': self.labels[slot],
+                'mentions': round(float(recent[slot]), 1),
+                'score': round(float(score[slot]), 3),
+                'velocity_per_hour': round(float(recent_rate[slot]) * 3600, 3),
+                'baseline_per_hour': round(float(baseline_rate[slot]) * 3600, 3),
+                'burst': round(float(burst[slot]), 2),
+                'bursting': bool(burst[slot] >= TRENDING_BURST_RATIO)
+            }
+            for slot in ranked if score[slot] > 0
+        ]
+
+    def get_stats(self) -> Dict[str, int]:
+        return {'terms': len(self.labels), 'articles_seen': self.articles_seen}
@@ -0,0 +1,109 @@
+"""
+Retained memory per article benchmark
+
+Builds ``--articles`` synthetic stored articles the way they come back from
+the database (every string decoded separately), keeps them in a list and
+reports the traced bytes per article for:
+
+- dict: the old plain dict with the full body
+- dict_without_content: the same dict minus the body
+- record: ArticleRecord, slotted, interned and without the body
+
+    python -m benchmarks.article_memory --articles 100000
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.article_store import ArticleRecord  # noqa: E402
+
+_CATEGORIES = ("Technology", "Business", "Science", "Health", "Politics", "Entertainment")
+_SENTIMENTS = ("Positive", "Negative", "Neutral")
+_SOURCES = tuple(f"Outlet {number}" for number in range(40))
+_KEYWORDS = tuple(f"topic{number}" for number in range(300))
+_SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pa")
+_WORDS = tuple(first + second + third for first in _SYLLABLES for second in _SYLLABLES for third in _SYLLABLES)
+
+
+def make_row(rng: random.Random, article_id: int, content_words: int) -> dict:
+    """One article as a result mapping: a fresh object for every value"""
+    published = datetime(2024, 6, 1) + timedelta(minutes=article_id)
+    row = {
+        'id': article_id,
+        'url': f"https://outlet{article_id % 40}.example.com/{article_id}",
+        'title': " ".join(rng.choices(_WORDS, k=10)).capitalize(),
+        'content': " ".join(rng.choices(_WORDS, k=content_words)),
+        'summary': " ".join(rng.choices(_WORDS, k=40)).capitalize() + ".",
+        'category': rng.choice(_CATEGORIES),
+        'sentiment': rng.choice(_SENTIMENTS),
+        'keywords': rng.sample(_KEYWORDS, 4),
+        'source': rng.choice(_SOURCES),
+        'published': published.isoformat(),
+        'processed_at': published.isoformat(),
+        'revision': article_id,
+        'related': []
+    }
+    # A JSON round trip decodes every string separately, like database rows
+    row = json.loads(json.dumps(row))
+    row['published'] = datetime.fromisoformat(row['published'])
+    row['processed_at'] = datetime.fromisoformat(row['processed_at'])
+    return row
+
+
+def as_dict(row: dict) -> dict:
+    return row
+
+
+def as_dict_without_content(row: dict) -> dict:
+    row.pop('content')
+    return row
+
+
+def as_record(row: dict) -> ArticleRecord:
+    row.pop('content')
+    return ArticleRecord.from_row(row)
+
+
+def measure(convert, count: int, content_words: int) -> dict:
+    rng = random.Random(0)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    retained = [convert(make_row(rng, article_id, content_words)) for article_id in range(1, count + 1)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del retained
+    return {
+        'bytes_per_article': round(used / count),
+        'total_mb': round(used / 2 ** 20, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--content-words", type=int, default=300,
+                        help="words per article body (about 7 characters each)")
+    args = parser.parse_args()
+
+    results = {'articles': args.articles, 'content_words': args.content_words}
+    for name, convert in (('dict', as_dict), ('dict_without_content', as_dict_without_content),
+                          ('record', as_record)):
+        results[name] = measure(convert, args.articles, args.content_words)
+    results['reduction'] = round(
+        1 - results['record']['bytes_per_article'] / results['dict']['bytes_per_article'], 3
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
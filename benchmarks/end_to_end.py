@@ -0,0 +1,346 @@
+"""
+End-to-end benchmark against a fake LM Studio and fake feeds
+
+Starts FakeLMServer and FakeFeedServer, points the app at them and serves
+it with uvicorn. It then measures:
+
+- the wall-clock time of each ``fetch_and_process_news`` run, with LM calls
+  per article;
+- REST latency (p50/p95/p99) and throughput under concurrent load;
+- WebSocket broadcast time for growing client counts.
+
+LM traffic goes through LM_BACKENDS, so probes and prompts of every mode
+reach the fake server through the backend pool. When the LM Studio client
+module is not installed, a placeholder stands in for it; with LM_BACKENDS
+set it is never called.
+
+The first refresh runs against an empty store. Later refreshes first publish
+a new generation of feed items. The scheduled background updater is not
+started, so only the measured refreshes run.
+
+Results are printed as JSON (or written to --output). With --baseline, the
+"lower is better" figures are compared with an earlier result and the run
+exits with status 1 when one regresses by more than --tolerance:
+
+    python -m benchmarks.end_to_end --feeds 20 --items 10 --ws-clients 10,100,1000
+    python -m benchmarks.end_to_end --output current.json --baseline main.json --tolerance 0.25
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import socket
+import sys
+import tempfile
+import time
+import types
+from typing import Dict, List
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_servers import FakeFeedServer, FakeLMServer  # noqa: E402
+
+# Seconds to wait for every client to receive one broadcast
+FANOUT_TIMEOUT = 30
+
+
+def percentile(samples: List[float], share: float) -> float:
+    ordered = sorted(samples)
+    return ordered[int(share * (len(ordered) - 1))] if ordered else 0.0
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    return {
+        'p50_ms': round(1000 * percentile(samples, 0.50), 3),
+        'p95_ms': round(1000 * percentile(samples, 0.95), 3),
+        'p99_ms': round(1000 * percentile(samples, 0.99), 3),
+        'max_ms': round(1000 * max(samples), 3) if samples else 0.0
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def raise_file_limit():
+    """Each WebSocket client costs two descriptors in this process"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard if hard != resource.RLIM_INFINITY else 65536, hard))
+
+
+def configure_environment(args, lm: FakeLMServer, feeds: FakeFeedServer, workdir: str):
+    """Point the app's settings at the fakes; must run before enhanced_main is imported"""
+    os.environ.update({
+        'LM_STUDIO_URL': lm.url,
+        'LM_BACKENDS': json.dumps([{'url': lm.url, 'max_concurrency': args.lm_slots}]),
+        'NEWS_FEEDS': json.dumps(feeds.sources()),
+        'ENRICHMENT_MODE': args.mode,
+        'ARTICLE_DB_URL': f"sqlite+aiosqlite:///{os.path.join(workdir, 'news.db')}",
+        'ENRICHMENT_CACHE_PATH': os.path.join(workdir, 'enrichment_cache.db'),
+        'ENRICHMENT_QUEUE_PATH': os.path.join(workdir, 'enrichment_queue.db'),
+        'EMBEDDING_DIR': os.path.join(workdir, 'embeddings'),
+        'RAW_ARCHIVE_DIR': os.path.join(workdir, 'raw_archive'),
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'),
+        'REDIS_URL': ''
+    })
+
+
+class UnusedLMStudioClient:
+    """Placeholder for a missing backend.services.lm_studio_client"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+def install_missing_modules():
+    """Stand in for optional modules the app imports; must run before enhanced_main is imported"""
+    try:
+        import backend.services.lm_studio_client  # noqa: F401
+    except ModuleNotFoundError:
+        module = types.ModuleType("backend.services.lm_studio_client")
+        module.LMStudioClient = UnusedLMStudioClient
+        sys.modules[module.__name__] = module
+
+
+async def run_refreshes(app_module, lm: FakeLMServer, feeds: FakeFeedServer, count: int) -> List[Dict]:
+    runs = []
+    for number in range(count):
+        if number:
+            feeds.advance()
+        lm.reset()
+        start = time.perf_counter()
+        await app_module.fetch_and_process_news()
+        wall = time.perf_counter() - start
+        stats = app_module.refresh_stats
+        processed = stats.get('run', {}).get('articles_processed', 0)
+        lm_stats = lm.get_stats()
+        runs.append({
+            'refresh': number,
+            'wall_seconds': round(wall, 3),
+            'articles_processed': processed,
+            'raw_articles': stats.get('stories', {}).get('raw_articles', 0),
+            'batches': stats.get('run', {}).get('batches', 0),
+            'lm_calls': lm_stats['chat_calls'],
+            'lm_calls_per_article': round(lm_stats['chat_calls'] / processed, 3) if processed else 0.0,
+            'lm_calls_by_kind': lm_stats['calls'],
+            'lm_max_in_flight': lm_stats['max_in_flight'],
+            'stage_timings': stats.get('stage_timings', {})
+        })
+    return runs
+
+
+async def load_endpoint(session: aiohttp.ClientSession, url: str, requests: int,
+                        concurrency: int) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                async with session.get(url, headers={'Accept-Encoding': 'gzip, br'}) as response:
+                    await response.read()
+                    if response.status >= 400:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        **latency_summary(latencies),
+        'requests': requests,
+        'errors': errors,
+        'requests_per_second': round(requests / elapsed, 1) if elapsed else 0.0
+    }
+
+
+async def run_api_load(base_url: str, app_module, requests: int, concurrency: int) -> Dict[str, Dict]:
+    first = await app_module.article_store.list_articles(limit=1)
+    article_id = first[0].id if first else 1
+    endpoints = {
+        'home': "/",
+        'news': "/api/news?limit=20",
+        'news_filtered': "/api/news?limit=20&category=Technology",
+        'search': "/api/search?q=model",
+        'trending': "/api/trending",
+        'article': f"/api/articles/{article_id}",
+        'related': f"/api/articles/{article_id}/related",
+        'health': "/api/health"
+    }
+    results = {}
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for name, path in endpoints.items():
+            results[name] = await load_endpoint(session, base_url + path, requests, concurrency)
+    return results
+
+
+async def run_fanout(base_url: str, app_module, clients: int, broadcasts: int) -> Dict:
+    """Connect ``clients`` sockets and time broadcasts until every client has them"""
+    manager = app_module.websocket_manager
+    received: Dict[int, List[float]] = {number: [] for number in range(broadcasts)}
+
+    async def read(ws: aiohttp.ClientWebSocketResponse):
+        async for message in ws:
+            data = json.loads(message.data)
+            if data.get('type') == 'benchmark':
+                received[data['number']].append(time.perf_counter() - data['sent'])
+
+    url = base_url.replace("http", "ws", 1) + "/ws"
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        sockets = await asyncio.gather(*(session.ws_connect(url, max_msg_size=0) for _ in range(clients)))
+        tasks = [asyncio.create_task(read(ws)) for ws in sockets]
+        while manager.get_connection_count() < clients:
+            await asyncio.sleep(0.01)
+
+        publish_times, delivery_times = [], []
+        for number in range(broadcasts):
+            start = time.perf_counter()
+            await manager.broadcast({'type': 'benchmark', 'number': number, 'sent': start})
+            publish_times.append(time.perf_counter() - start)
+            # Slow consumers may be dropped by the server; do not wait forever
+            while len(received[number]) < clients and time.perf_counter() - start < FANOUT_TIMEOUT:
+                await asyncio.sleep(0.001)
+            delivery_times.append(time.perf_counter() - start)
+        await asyncio.gather(*(ws.close() for ws in sockets))
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    while manager.get_connection_count():
+        await asyncio.sleep(0.01)
+    client_latencies = [latency for samples in received.values() for latency in samples]
+    return {
+        'clients': clients,
+        'broadcasts': broadcasts,
+        'publish_ms_p50': round(1000 * percentile(publish_times, 0.5), 3),
+        'all_delivered_ms_p50': round(1000 * percentile(delivery_times, 0.5), 3),
+        'all_delivered_ms_max': round(1000 * max(delivery_times), 3),
+        'missed_deliveries': clients * broadcasts - len(client_latencies),
+        'client_latency': latency_summary(client_latencies)
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """Lower-is-better figures that got worse than baseline * (1 + tolerance)"""
+    def figures(result: Dict) -> Dict[str, float]:
+        flat = {}
+        for run in result.get('refreshes', []):
+            flat[f"refresh[{run['refresh']}].wall_seconds"] = run['wall_seconds']
+            flat[f"refresh[{run['refresh']}].lm_calls_per_article"] = run['lm_calls_per_article']
+        for name, stats in result.get('api', {}).items():
+            flat[f"api.{name}.p95_ms"] = stats['p95_ms']
+        for fanout in result.get('websocket', []):
+            flat[f"websocket[{fanout['clients']}].all_delivered_ms_p50"] = fanout['all_delivered_ms_p50']
+        return flat
+
+    current_figures, baseline_figures = figures(current), figures(baseline)
+    regressions = []
+    for key, value in current_figures.items():
+        reference = baseline_figures.get(key)
+        if reference is not None and value > reference * (1 + tolerance) and value - reference > 1e-3:
+            regressions.append({'metric': key, 'baseline': reference, 'current': value})
+    return regressions
+
+
+async def run(args) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="ai-news-bench-")
+    lm = await FakeLMServer(args.lm_latency, args.lm_tokens_per_second, args.lm_slots).start()
+    feeds = await FakeFeedServer(args.feeds, args.items, args.duplicate_share).start()
+    configure_environment(args, lm, feeds, workdir)
+    install_missing_modules()
+
+    import uvicorn
+    import enhanced_main
+
+    async def no_background_updates():
+        return None
+    enhanced_main.background_news_updater = no_background_updates
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(enhanced_main.app, host="127.0.0.1", port=port,
+                                           log_level="warning", lifespan="on", ws_max_size=2 ** 24))
+    serving = asyncio.create_task(server.serve())
+    try:
+        while not server.started:
+            if serving.done():
+                serving.result()
+            await asyncio.sleep(0.05)
+        base_url = f"http://127.0.0.1:{port}"
+
+        results = {
+            'config': {key: value for key, value in vars(args).items()
+                       if key not in ('output', 'baseline', 'tolerance')},
+            'refreshes': await run_refreshes(enhanced_main, lm, feeds, args.refreshes),
+            'api': await run_api_load(base_url, enhanced_main, args.api_requests, args.api_concurrency),
+            'websocket': []
+        }
+        for clients in args.ws_clients:
+            results['websocket'].append(await run_fanout(base_url, enhanced_main, clients, args.broadcasts))
+        results['feed_server'] = {'requests': feeds.requests, 'not_modified': feeds.not_modified}
+        return results
+    finally:
+        server.should_exit = True
+        await serving
+        await lm.stop()
+        await feeds.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--feeds", type=int, default=10)
+    parser.add_argument("--items", type=int, default=10, help="items per feed")
+    parser.add_argument("--duplicate-share", type=float, default=0.3,
+                        help="share of each feed's items that every feed carries")
+    parser.add_argument("--mode", default=os.getenv("ENRICHMENT_MODE", "combined"),
+                        choices=("separate", "combined", "batch", "stream"))
+    parser.add_argument("--lm-latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--lm-tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--lm-slots", type=int, default=4, help="requests the fake LM serves at once")
+    parser.add_argument("--refreshes", type=int, default=2)
+    parser.add_argument("--api-requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--api-concurrency", type=int, default=20)
+    parser.add_argument("--ws-clients", type=lambda value: [int(part) for part in value.split(",")],
+                        default=[10, 100, 1000], help="comma-separated client counts")
+    parser.add_argument("--broadcasts", type=int, default=5, help="broadcasts per client count")
+    parser.add_argument("--output", help="write results here instead of stdout")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    raise_file_limit()
+    results = asyncio.run(run(args))
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as handle:
+            results['regressions'] = compare(results, json.load(handle), args.tolerance)
+        status = 1 if results['regressions'] else 0
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(text)
+    else:
+        print(text)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
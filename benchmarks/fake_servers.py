@@ -0,0 +1,267 @@
+"""
+Local stand-ins for LM Studio and news feeds
+
+FakeLMServer speaks the OpenAI-compatible endpoints the app uses
+(/v1/models, /v1/chat/completions with and without streaming, and
+/v1/embeddings). Each completion waits ``latency`` seconds, then "generates"
+at ``tokens_per_second``. At most ``slots`` requests are served at a time,
+the way a local model server queues work. A ``failure_rate`` share of
+completions answer 503 after the latency, like an overloaded server.
+Replies are valid for the combined, batch and streamed prompts of
+combined_analysis.
+
+FakeFeedServer serves ``feeds`` RSS documents at /feeds/<n>.xml. Some items
+repeat the same story across feeds with reworded titles, so clustering has
+work to do. Feeds honour If-None-Match, and ``advance()`` publishes a new
+generation of items.
+
+Both servers listen on an ephemeral port; ``url`` is set once started.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+import numpy as np
+from aiohttp import web
+
+_CATEGORIES = ("Technology", "Business", "Science", "Health", "Politics")
+_SENTIMENTS = ("Positive", "Negative", "Neutral")
+_TOPICS = (
+    "GPU", "Chips", "Robotics", "OpenAI", "Quantum", "Climate", "Vaccine", "Startup",
+    "Privacy", "Regulation", "Battery", "Satellite", "Datacenter", "Translation", "Agents"
+)
+# A thousand made-up words, so unrelated stories rarely look alike
+_SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pa")
+_WORDS = tuple(first + second + third for first in _SYLLABLES for second in _SYLLABLES for third in _SYLLABLES)
+
+
+async def _start(app: web.Application, host: str, port: int):
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+class FakeLMServer:
+    """OpenAI-compatible completion and embedding server with simulated speed"""
+
+    def __init__(self, latency: float = 0.2, tokens_per_second: float = 80.0, slots: int = 4,
+                 embedding_dim: int = 768, host: str = "127.0.0.1", port: int = 0,
+                 failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.tokens_per_second = tokens_per_second
+        self.slots = slots
+        self.embedding_dim = embedding_dim
+        self.host = host
+        self.port = port
+        self.url: Optional[str] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._semaphore = asyncio.Semaphore(slots)
+        self.calls: Counter = Counter()
+        self.completion_tokens = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def start(self) -> "FakeLMServer":
+        app = web.Application()
+        app.router.add_get("/v1/models", self._models)
+        app.router.add_post("/v1/chat/completions", self._chat)
+        app.router.add_post("/v1/embeddings", self._embeddings)
+        self._runner, self.url = await _start(app, self.host, self.port)
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def reset(self):
+        self.calls.clear()
+        self.completion_tokens = 0
+        self.failures = 0
+        self.max_in_flight = 0
+
+    def get_stats(self) -> Dict:
+        return {
+            'calls': dict(self.calls),
+            'chat_calls': sum(count for kind, count in self.calls.items() if kind != 'embeddings'),
+            'completion_tokens': self.completion_tokens,
+            'failures': self.failures,
+            'max_in_flight': self.max_in_flight
+        }
+
+    async def _models(self, request: web.Request) -> web.Response:
+        return web.json_response({'object': 'list', 'data': [{'id': 'fake-model', 'object': 'model'}]})
+
+    @staticmethod
+    def _analysis(seed: str) -> Dict:
+        rng = random.Random(seed)
+        return {
+            'category': rng.choice(_CATEGORIES),
+            'sentiment': rng.choice(_SENTIMENTS),
+            'keywords': rng.sample(_TOPICS, 3),
+            'summary': " ".join(rng.choice(_WORDS) for _ in range(40)).capitalize() + "."
+        }
+
+    def _reply(self, prompt: str) -> Tuple[str, str]:
+        """(kind, reply text) for a user prompt"""
+        if '{"results"' in prompt:
+            count = len(re.findall(r"^Article \d+$", prompt, re.MULTILINE))
+            results = [{'index': index, **self._analysis(f"{prompt}:{index}")} for index in range(count)]
+            return 'batch', json.dumps({'results': results})
+        if prompt.startswith("Return a JSON object"):
+            analysis = self._analysis(prompt)
+            # Streamed prompts ask for the summary last
+            ordered = {key: analysis[key] for key in ('category', 'sentiment', 'keywords', 'summary')}
+            return 'combined', json.dumps(ordered)
+        rng = random.Random(prompt)
+        return 'separate', rng.choice(_CATEGORIES)
+
+    async def _chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        prompt = next((m['content'] for m in reversed(body.get('messages', [])) if m.get('role') == 'user'), "")
+        kind, reply = self._reply(prompt)
+        stream = bool(body.get('stream'))
+        self.calls['stream' if stream and kind == 'combined' else kind] += 1
+        tokens = max(1, len(reply) // 4)
+        self.completion_tokens += tokens
+
+        async with self._semaphore:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                await asyncio.sleep(self.latency)
+                if self.failure_rate and random.random() < self.failure_rate:
+                    self.failures += 1
+                    return web.json_response({'error': 'model overloaded'}, status=503)
+                if not stream:
+                    await asyncio.sleep(tokens / self.tokens_per_second)
+                    return web.json_response({
+                        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply},
+                                     'finish_reason': 'stop'}],
+                        'usage': {'prompt_tokens': len(prompt) // 4 + 1, 'completion_tokens': tokens}
+                    })
+
+                response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+                await response.prepare(request)
+                for offset in range(0, len(reply), 4):
+                    chunk = {'choices': [{'index': 0, 'delta': {'content': reply[offset:offset + 4]}}]}
+                    await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    await asyncio.sleep(1 / self.tokens_per_second)
+                await response.write(b"data: [DONE]\n\n")
+                return response
+            finally:
+                self.in_flight -= 1
+
+    async def _embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        texts = body.get('input') or []
+        if isinstance(texts, str):
+            texts = [texts]
+        self.calls['embeddings'] += 1
+        data = []
+        for index, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(self.embedding_dim).astype(np.float32)
+            data.append({'object': 'embedding', 'index': index, 'embedding': vector.tolist()})
+        return web.json_response({'object': 'list', 'data': data, 'model': body.get('model')})
+
+
+class FakeFeedServer:
+    """RSS feeds with overlapping stories and conditional GET support"""
+
+    def __init__(self, feeds: int = 10, items: int = 10, duplicate_share: float = 0.3,
+                 seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        self.feeds = feeds
+        self.items = items
+        self.duplicate_share = duplicate_share
+        self.host = host
+        self.port = port
+        self.url: Optional[str] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._rng = random.Random(seed)
+        self.generation = 0
+        self.documents: List[bytes] = []
+        self.requests = 0
+        self.not_modified = 0
+        self._build()
+
+    async def start(self) -> "FakeFeedServer":
+        app = web.Application()
+        app.router.add_get("/feeds/{number}.xml", self._feed)
+        self._runner, self.url = await _start(app, self.host, self.port)
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def sources(self) -> List[Dict[str, str]]:
+        """NEWS_FEEDS entries for every feed"""
+        return [{'name': f"Feed {number}", 'url': f"{self.url}/feeds/{number}.xml"}
+                for number in range(self.feeds)]
+
+    def advance(self):
+        """Publish a new generation of items on every feed"""
+        self.generation += 1
+        self._build()
+
+    def _story(self) -> Dict[str, str]:
+        topic = self._rng.choice(_TOPICS)
+        words = self._rng.sample(_WORDS, 8)
+        return {
+            'title': f"{topic} {' '.join(words[:5])}",
+            'lead': " ".join([topic] + words + self._rng.sample(_WORDS, 10))
+        }
+
+    def _build(self):
+        shared = [self._story() for _ in range(max(1, int(self.items * self.duplicate_share)))]
+        published = format_datetime(datetime.now(timezone.utc))
+        self.documents = []
+        for number in range(self.feeds):
+            entries = []
+            for position in range(self.items):
+                if position < len(shared):
+                    story = dict(shared[position])
+                    # Same story, lightly reworded per outlet
+                    story['title'] = f"{story['title']} {self._rng.choice(_WORDS)}"
+                else:
+                    story = self._story()
+                link = f"https://outlet{number}.example.com/{self.generation}/{position}"
+                entries.append(
+                    "<item>"
+                    f"<title>{escape(story['title'].title())}</title>"
+                    f"<link>{escape(link)}</link>"
+                    f"<description>{escape(story['lead'])}</description>"
+                    f"<pubDate>{published}</pubDate>"
+                    "</item>"
+                )
+            self.documents.append((
+                '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+                f"<title>Feed {number}</title>{''.join(entries)}</channel></rss>"
+            ).encode("utf-8"))
+
+    async def _feed(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        number = int(request.match_info['number'])
+        if not 0 <= number < len(self.documents):
+            raise web.HTTPNotFound()
+        body = self.documents[number]
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        if request.headers.get('If-None-Match') == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(body=body, content_type="application/rss+xml", headers={'ETag': etag})
@@ -0,0 +1,143 @@
+"""
+LM backend pool benchmark against several fake LM servers
+
+Starts one FakeLMServer per --servers entry and analyzes --articles
+articles through CombinedAnalyzer with an LMPool over them, once per
+routing policy. A server can be made slow or flaky, so the run shows how
+routing spreads work by capacity and how breakers take failing servers
+out of rotation. Reports throughput, p50/p95 latency per article, failed
+articles and each backend's calls, failures and breaker trips as JSON.
+
+Each server is "latency:slots[:failure_rate]":
+
+    python -m benchmarks.lm_pool --servers 0.2:4,0.2:4,0.6:2,0.2:4:0.8 --articles 300
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.combined_analysis import CombinedAnalyzer  # noqa: E402
+from backend.services.lm_pool import ROUTING_POLICIES, LMBackend, LMPool  # noqa: E402
+from benchmarks.fake_servers import FakeLMServer  # noqa: E402
+
+
+def parse_servers(value: str) -> List[Dict]:
+    servers = []
+    for spec in value.split(","):
+        parts = spec.split(":")
+        servers.append({
+            'latency': float(parts[0]),
+            'slots': int(parts[1]),
+            'failure_rate': float(parts[2]) if len(parts) > 2 else 0.0
+        })
+    return servers
+
+
+def percentile(samples: List[float], share: float) -> float:
+    ordered = sorted(samples)
+    return ordered[int(share * (len(ordered) - 1))] if ordered else 0.0
+
+
+def make_articles(count: int, run: str) -> List[Dict]:
+    return [
+        {'title': f"Story {run} {index}", 'content': f"Body of story {index} in the {run} run. " * 20}
+        for index in range(count)
+    ]
+
+
+async def run_policy(servers: List[FakeLMServer], routing: str, articles: List[Dict],
+                     concurrency: int, cooldown: float) -> Dict:
+    for server in servers:
+        server.reset()
+    # Weights follow each server's slots, the way LM_BACKENDS would be written
+    backends = [
+        LMBackend(server.url, "fake-model", weight=server.slots, max_concurrency=server.slots,
+                  cooldown=cooldown, max_latency=0)
+        for server in servers
+    ]
+    pool = LMPool(backends, routing=routing)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failed = [], 0
+
+    async with aiohttp.ClientSession() as session:
+        analyzer = CombinedAnalyzer(session=session, pool=pool)
+
+        async def analyze(article: Dict):
+            nonlocal failed
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await analyzer.analyze_article(article)
+                except Exception:
+                    failed += 1
+                    return
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(analyze(article) for article in articles))
+        elapsed = time.perf_counter() - start
+
+    stats = pool.get_stats()
+    return {
+        'seconds': round(elapsed, 2),
+        'articles_per_second': round(len(latencies) / elapsed, 2),
+        'failed': failed,
+        'p50_ms': round(1000 * percentile(latencies, 0.5), 1),
+        'p95_ms': round(1000 * percentile(latencies, 0.95), 1),
+        'waits': stats['waits'],
+        'rejected': stats['rejected'],
+        'backends': [
+            {
+                'server': f"{server.latency}:{server.slots}:{server.failure_rate}",
+                'calls': backend['calls'],
+                'failures': backend['failures'],
+                'trips': backend['trips'],
+                'state': backend['state'],
+                'max_in_flight': server.max_in_flight
+            }
+            for server, backend in zip(servers, stats['backends'])
+        ]
+    }
+
+
+async def run(args) -> Dict:
+    servers = [
+        await FakeLMServer(latency=spec['latency'], tokens_per_second=args.tokens_per_second,
+                           slots=spec['slots'], failure_rate=spec['failure_rate']).start()
+        for spec in args.servers
+    ]
+    try:
+        results = {'articles': args.articles, 'concurrency': args.concurrency, 'servers': len(servers)}
+        for routing in ROUTING_POLICIES:
+            # Fresh articles per policy, so the analyzer never shares a prompt across runs
+            articles = make_articles(args.articles, routing)
+            results[routing] = await run_policy(servers, routing, articles, args.concurrency, args.cooldown)
+        return results
+    finally:
+        for server in servers:
+            await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--servers", type=parse_servers, default=parse_servers("0.2:4,0.2:4,0.6:2,0.2:4:0.8"),
+                        help="comma-separated latency:slots[:failure_rate] per fake server")
+    parser.add_argument("--articles", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=32, help="articles analyzed at once")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--cooldown", type=float, default=5.0, help="breaker cooldown in seconds")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
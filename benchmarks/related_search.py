@@ -0,0 +1,91 @@
+"""
+Related-article search latency benchmark
+
+Fills an EmbeddingIndex with clustered random unit vectors and measures
+related() latency for brute-force and IVF search, plus IVF recall@k
+against the exact results.
+
+    python -m benchmarks.related_search --vectors 100000 --dim 768
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.embedding_index import EmbeddingIndex, KIND_LM, _normalize  # noqa: E402
+
+
+def make_vectors(count: int, dim: int, topics: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = _normalize(rng.standard_normal((topics, dim)).astype(np.float32))
+    noise = rng.standard_normal((count, dim)).astype(np.float32) * (2 / np.sqrt(dim))
+    return _normalize(centers[rng.integers(0, topics, count)] + noise)
+
+
+def percentile(samples, share: float) -> float:
+    ordered = sorted(samples)
+    return ordered[int(share * (len(ordered) - 1))]
+
+
+def run(vectors: np.ndarray, mode: str, queries: np.ndarray, k: int, nprobe: int):
+    path = tempfile.mkdtemp(prefix="embeddings-")
+    try:
+        index = EmbeddingIndex(path, dim=vectors.shape[1], ivf=mode, nprobe=nprobe).open()
+        start = time.perf_counter()
+        for offset in range(0, len(vectors), 10000):
+            chunk = vectors[offset:offset + 10000]
+            index.add(list(range(offset, offset + len(chunk))), chunk, KIND_LM)
+        build = time.perf_counter() - start
+
+        latencies, results = [], {}
+        for query in queries:
+            start = time.perf_counter()
+            results[int(query)] = [article_id for article_id, _ in index.related(int(query), k)]
+            latencies.append(time.perf_counter() - start)
+        index.close()
+        return build, latencies, results
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=8)
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.vectors, args.dim, args.topics)
+    queries = np.random.default_rng(1).integers(0, args.vectors, args.queries)
+    results = {'vectors': args.vectors, 'dim': args.dim, 'k': args.k}
+
+    exact = None
+    for mode in ("off", "on"):
+        build, latencies, found = run(vectors, mode, queries, args.k, args.nprobe)
+        name = "brute_force" if mode == "off" else "ivf"
+        results[name] = {
+            'build_seconds': round(build, 2),
+            'p50_ms': round(1000 * percentile(latencies, 0.5), 3),
+            'p95_ms': round(1000 * percentile(latencies, 0.95), 3)
+        }
+        if exact is None:
+            exact = found
+        else:
+            recall = np.mean([len(set(found[q]) & set(exact[q])) / max(1, len(exact[q])) for q in exact])
+            results[name]['recall_at_k'] = round(float(recall), 3)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
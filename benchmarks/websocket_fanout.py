@@ -0,0 +1,144 @@
+"""
+WebSocket fan-out load benchmark
+
+Simulates thousands of connected clients (a configurable share of them slow)
+and compares RealtimeManager's encode-once, per-connection queue broadcast
+with the naive approach of encoding and awaiting each send in turn.
+
+    python -m benchmarks.websocket_fanout --clients 10000 --slow 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.realtime_manager import RealtimeManager  # noqa: E402
+
+
+class SimulatedWebSocket:
+    """Stands in for a Starlette WebSocket with a fixed per-send delay"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.received = 0
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received += 1
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+
+def sample_message(articles: int):
+    return {
+        'type': 'news_update',
+        'data': [
+            {
+                'id': i,
+                'title': f'Article {i} about AI and the future of computing',
+                'summary': 'A short AI generated summary of the article. ' * 4,
+                'category': 'Technology',
+                'sentiment': 'Positive',
+                'keywords': ['AI', 'Computing', 'Research'],
+                'source': 'Tech News',
+                'url': f'https://example.com/{i}',
+                'published': '2026-01-01T00:00:00'
+            }
+            for i in range(articles)
+        ],
+        'count': articles
+    }
+
+
+def make_clients(count: int, slow_share: float, slow_delay: float):
+    slow_every = int(1 / slow_share) if slow_share > 0 else 0
+    return [
+        SimulatedWebSocket(slow_delay if slow_every and i % slow_every == 0 else 0.0)
+        for i in range(count)
+    ]
+
+
+async def run_naive(clients, message, timeout: float):
+    """Baseline: encode per client and await every send serially"""
+    start = time.perf_counter()
+    for client in clients:
+        try:
+            await asyncio.wait_for(client.send_text(json.dumps(message)), timeout)
+        except asyncio.TimeoutError:
+            pass
+    return time.perf_counter() - start
+
+
+async def run_manager(clients, message, broadcasts: int, queue_size: int, policy: str):
+    manager = RealtimeManager(queue_size=queue_size, slow_consumer_policy=policy)
+    for client in clients:
+        await manager.connect(client)
+
+    fast = [client for client in clients if not client.delay]
+    enqueue_time = 0.0
+    delivery_time = 0.0
+    for sent in range(1, broadcasts + 1):
+        start = time.perf_counter()
+        await manager.broadcast(message)
+        enqueue_time += time.perf_counter() - start
+
+        # Broadcasts are minutes apart in production; let fast clients drain
+        # while the slow ones build up their own backlog
+        while any(client.received < sent for client in fast):
+            await asyncio.sleep(0.001)
+        delivery_time += time.perf_counter() - start
+
+    stats = manager.get_stats()
+    for client in list(manager.active_connections):
+        manager.disconnect(client)
+    return enqueue_time / broadcasts, delivery_time / broadcasts, stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--articles", type=int, default=20)
+    parser.add_argument("--broadcasts", type=int, default=5)
+    parser.add_argument("--slow", type=float, default=0.01, help="share of slow clients")
+    parser.add_argument("--slow-delay", type=float, default=0.2, help="seconds per send for slow clients")
+    parser.add_argument("--queue-size", type=int, default=4)
+    parser.add_argument("--policy", default="drop_oldest",
+                        choices=["drop_oldest", "drop_newest", "disconnect"])
+    parser.add_argument("--skip-naive", action="store_true")
+    args = parser.parse_args()
+
+    message = sample_message(args.articles)
+    payload_bytes = len(json.dumps(message))
+    results = {'clients': args.clients, 'payload_bytes': payload_bytes, 'broadcasts': args.broadcasts}
+
+    if not args.skip_naive:
+        clients = make_clients(args.clients, args.slow, args.slow_delay)
+        results['naive_seconds_per_broadcast'] = round(
+            await run_naive(clients, message, args.slow_delay * 2), 3
+        )
+
+    clients = make_clients(args.clients, args.slow, args.slow_delay)
+    enqueue_time, delivery_time, stats = await run_manager(
+        clients, message, args.broadcasts, args.queue_size, args.policy
+    )
+    results.update({
+        'manager_enqueue_ms_per_broadcast': round(1000 * enqueue_time, 3),
+        'manager_fast_client_delivery_ms_per_broadcast': round(1000 * delivery_time, 3),
+        'manager_stats': stats
+    })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
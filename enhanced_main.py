@@ -2,40 +2,116 @@
 Enhanced AI News Website with Full Features
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, BackgroundTasks, HTTPException
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import uvicorn
-from datetime import datetime
+from datetime import datetime, timezone
 import asyncio
 from typing import List, Dict, Optional
 import json
-import os
+import time
 
-from backend.services.lm_studio_client import LMStudioClient
-from backend.services.news_scraper_enhanced import EnhancedNewsScraperService
-from backend.websocket_manager import WebSocketManager
+from loguru import logger
+
+from backend.services.article_store import ArticleStore, article_url, parse_datetime
+from backend.services.combined_analysis import PROMPT_VERSION
+from backend.services.enrichment_cache import EnrichmentCache
+from backend.services.enrichment_queue import EnrichmentQueue, ENRICHMENT_QUEUE_BATCH, ENRICHMENT_QUEUE_RETRY_BASE
+from backend.services.feed_fetcher import FeedFetcher
+from backend.services.feed_scheduler import FeedScheduler, load_feed_sources
+from backend.services.enrichment_pipeline import EnrichmentPipeline, ENRICHMENT_MODE
+from backend.services.lm_gateway import SharedLMClient
+from backend.services.pubsub import CONTROL_CHANNEL, LeaderElector, create_pubsub
+from backend.services.story_clustering import StoryIndex, STORY_INDEX_SIZE, STORY_LEAD_CHARS
+from backend.services.trending_engine import TrendingEngine
+from backend.services.embedding_index import Embedder, EmbeddingIndex, embedding_text
+from backend.services.raw_archive import RawArchive
+from backend.services.response_cache import ResponseCache
+from backend.services.static_assets import StaticAssets
+from backend.services.observability import (
+    WEBSOCKET_CONNECTIONS, configure_logging, current_trace_id, render_metrics, span
+)
+from backend.realtime_manager import RealtimeManager, delta_is_empty, news_delta_message
+
+configure_logging()
 
 # Global variables
-news_cache = []
-trending_cache = []
-websocket_manager = WebSocketManager()
+article_store = ArticleStore()
+refresh_stats = {}
+broadcast_revision = 0
+lm_client = SharedLMClient()
+# Keyed by every model the pool may route to, so changing LM_BACKENDS re-enriches
+enrichment_cache = EnrichmentCache(model=lm_client.pool.model_key, prompt_version=f"{PROMPT_VERSION}/{ENRICHMENT_MODE}")
+websocket_manager = RealtimeManager()
+WEBSOCKET_CONNECTIONS.set_function(websocket_manager.get_connection_count)
+story_index = StoryIndex()
+trending_engine = TrendingEngine()
+embedder = Embedder()
+embedding_index = EmbeddingIndex()
+response_cache = ResponseCache()
+static_assets = StaticAssets()
+raw_archive = RawArchive()
+bus = create_pubsub()
+leader = LeaderElector(bus)
+processing_lock = asyncio.Lock()
+feed_fetcher = FeedFetcher()
+feed_scheduler = FeedScheduler(
+    load_feed_sources(),
+    on_new_items=lambda articles: process_new_feed_items(articles),
+    is_known=lambda urls: article_store.existing_urls(urls),
+    fetcher=feed_fetcher
+)
+enrichment_queue = EnrichmentQueue(source_weights={source.name: source.weight for source in feed_scheduler.sources},
+                                   on_shed=story_index.discard)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     # Startup
-    print("🚀 Starting Enhanced AI News Platform...")
+    logger.info("Starting Enhanced AI News Platform...")
+    global broadcast_revision
+    await asyncio.to_thread(static_assets.load)
+    await article_store.open()
+    await enrichment_cache.open()
+    await enrichment_queue.open()
+    await feed_fetcher.open()
+    await lm_client.open()
+    embedder.session = lm_client.session
+    await asyncio.to_thread(embedding_index.open)
+    # Vectors of articles deleted while the index was not told (e.g. a crash after prune)
+    stale = set(embedding_index.rows_by_id) - await article_store.all_ids()
+    if stale:
+        await asyncio.to_thread(embedding_index.remove, list(stale))
+    broadcast_revision = await article_store.head_revision()
+    recent_articles = await article_store.list_articles(limit=STORY_INDEX_SIZE, lead_chars=STORY_LEAD_CHARS)
+    story_index.seed(recent_articles)
+    trending_engine.update(recent_articles)
     
-    # Start background news fetching
+    # Share broadcasts and refresh requests with other workers
+    await bus.start()
+    await websocket_manager.attach_bus(bus)
+    await bus.subscribe(CONTROL_CHANNEL, handle_control_message)
+    await leader.start()
+    
+    # Start background news fetching (runs only while this worker is leader)
     asyncio.create_task(background_news_updater())
+    asyncio.create_task(enrichment_retry_worker())
+    asyncio.create_task(embed_missing_articles())
     
     yield
     
     # Shutdown
-    print("📴 Shutting down Enhanced AI News Platform...")
+    logger.info("Shutting down Enhanced AI News Platform...")
+    await leader.stop()
+    await bus.stop()
+    await feed_fetcher.close()
+    await lm_client.close()
+    embedding_index.close()
+    await enrichment_queue.close()
+    await enrichment_cache.close()
+    await article_store.close()
 
 app = FastAPI(
     title="Enhanced AI News Platform",
@@ -53,400 +129,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-if os.path.exists("static"):
-    app.mount("/static", StaticFiles(directory="static"), name="static")
-
 @app.get("/", response_class=HTMLResponse)
-async def home():
+async def home(request: Request):
     """Enhanced homepage with 3D visualization"""
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>🚀 Enhanced AI News Platform</title>
-        <!-- Three.js replaced with simple visualization -->
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }
-            
-            body {
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                color: white;
-                overflow-x: hidden;
-            }
-            
-            .header {
-                text-align: center;
-                padding: 20px;
-                background: rgba(0, 0, 0, 0.2);
-                backdrop-filter: blur(10px);
-            }
-            
-            .header h1 {
-                font-size: 2.5rem;
-                margin-bottom: 10px;
-                text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-            }
-            
-            .status-bar {
-                display: flex;
-                justify-content: space-around;
-                padding: 10px;
-                background: rgba(0, 0, 0, 0.1);
-                font-size: 0.9rem;
-            }
-            
-            .status-item {
-                display: flex;
-                align-items: center;
-                gap: 5px;
-            }
-            
-            .status-indicator {
-                width: 8px;
-                height: 8px;
-                border-radius: 50%;
-                background: #4CAF50;
-                animation: pulse 2s infinite;
-            }
-            
-            @keyframes pulse {
-                0% { opacity: 1; }
-                50% { opacity: 0.5; }
-                100% { opacity: 1; }
-            }
-            
-            .main-container {
-                display: grid;
-                grid-template-columns: 1fr 400px;
-                gap: 20px;
-                padding: 20px;
-                height: calc(100vh - 200px);
-            }
-            
-            .visualization-container {
-                background: rgba(0, 0, 0, 0.3);
-                border-radius: 15px;
-                border: 1px solid rgba(255, 255, 255, 0.2);
-                position: relative;
-                overflow: hidden;
-            }
-            
-            .sidebar {
-                display: flex;
-                flex-direction: column;
-                gap: 20px;
-            }
-            
-            .news-panel, .trending-panel {
-                background: rgba(255, 255, 255, 0.1);
-                backdrop-filter: blur(10px);
-                border-radius: 15px;
-                padding: 20px;
-                border: 1px solid rgba(255, 255, 255, 0.2);
-                flex: 1;
-            }
-            
-            .panel-title {
-                font-size: 1.2rem;
-                margin-bottom: 15px;
-                color: #fff;
-                border-bottom: 1px solid rgba(255, 255, 255, 0.2);
-                padding-bottom: 10px;
-            }
-            
-            .news-item {
-                background: rgba(0, 0, 0, 0.2);
-                border-radius: 8px;
-                padding: 12px;
-                margin-bottom: 10px;
-                cursor: pointer;
-                transition: all 0.3s ease;
-            }
-            
-            .news-item:hover {
-                background: rgba(0, 0, 0, 0.4);
-                transform: translateX(5px);
-            }
-            
-            .news-title {
-                font-size: 0.9rem;
-                font-weight: bold;
-                margin-bottom: 5px;
-            }
-            
-            .news-meta {
-                font-size: 0.8rem;
-                opacity: 0.7;
-                display: flex;
-                justify-content: space-between;
-            }
-            
-            .trending-item {
-                display: flex;
-                justify-content: space-between;
-                padding: 8px 0;
-                border-bottom: 1px solid rgba(255, 255, 255, 0.1);
-            }
-            
-            .trending-topic {
-                font-weight: bold;
-            }
-            
-            .trending-count {
-                background: rgba(255, 255, 255, 0.2);
-                padding: 2px 8px;
-                border-radius: 12px;
-                font-size: 0.8rem;
-            }
-            
-            .article-detail-panel {
-                position: fixed;
-                top: 50%;
-                left: 50%;
-                transform: translate(-50%, -50%);
-                background: rgba(0, 0, 0, 0.9);
-                backdrop-filter: blur(20px);
-                border-radius: 15px;
-                padding: 0;
-                max-width: 600px;
-                width: 90%;
-                max-height: 80vh;
-                overflow-y: auto;
-                z-index: 1000;
-                border: 1px solid rgba(255, 255, 255, 0.2);
-                display: none;
-            }
-            
-            .panel-content {
-                padding: 30px;
-                position: relative;
-            }
-            
-            .close-btn {
-                position: absolute;
-                top: 15px;
-                right: 20px;
-                background: none;
-                border: none;
-                color: white;
-                font-size: 24px;
-                cursor: pointer;
-                opacity: 0.7;
-            }
-            
-            .close-btn:hover {
-                opacity: 1;
-            }
-            
-            .read-more {
-                display: inline-block;
-                background: linear-gradient(45deg, #667eea, #764ba2);
-                color: white;
-                padding: 10px 20px;
-                border-radius: 25px;
-                text-decoration: none;
-                margin-top: 15px;
-                transition: all 0.3s ease;
-            }
-            
-            .read-more:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 5px 15px rgba(0, 0, 0, 0.3);
-            }
-            
-            @media (max-width: 768px) {
-                .main-container {
-                    grid-template-columns: 1fr;
-                    height: auto;
-                }
-                
-                .visualization-container {
-                    height: 400px;
-                }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>🚀 Enhanced AI News Platform</h1>
-            <p>Real-time AI processing with 3D visualization and live updates</p>
-        </div>
-        
-        <div class="status-bar">
-            <div class="status-item">
-                <div class="status-indicator" id="lm-status"></div>
-                <span>LM Studio: <span id="lm-text">Connecting...</span></span>
-            </div>
-            <div class="status-item">
-                <div class="status-indicator" id="ws-status"></div>
-                <span>WebSocket: <span id="ws-text">Connecting...</span></span>
-            </div>
-            <div class="status-item">
-                <div class="status-indicator" id="news-status"></div>
-                <span>News: <span id="news-text">Loading...</span></span>
-            </div>
-        </div>
-        
-        <div class="main-container">
-            <div class="visualization-container" id="visualization-container">
-                <!-- 3D visualization will be rendered here -->
-            </div>
-            
-            <div class="sidebar">
-                <div class="news-panel">
-                    <div class="panel-title">📰 Latest News</div>
-                    <div id="news-list">
-                        <div class="news-item">Loading news articles...</div>
-                    </div>
-                </div>
-                
-                <div class="trending-panel">
-                    <div class="panel-title">🔥 Trending Topics</div>
-                    <div id="trending-list">
-                        <div class="trending-item">Loading trending topics...</div>
-                    </div>
-                </div>
-            </div>
-        </div>
-        
-        <script src="/static/js/simple-visualization.js"></script>
-        <script>
-            let newsVisualization;
-            let websocket;
-            
-            // Initialize 3D visualization
-            function initVisualization() {
-                try {
-                    // Simple visualization will auto-initialize
-                    console.log('3D visualization initialized');
-                } catch (error) {
-                    console.error('Failed to initialize 3D visualization:', error);
-                    document.getElementById('three-container').innerHTML = 
-                        '<div style="display: flex; align-items: center; justify-content: center; height: 100%; color: white;">3D Visualization Loading...</div>';
-                }
-            }
-            
-            // WebSocket connection
-            function connectWebSocket() {
-                const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-                const wsUrl = `${protocol}//${window.location.host}/ws`;
-                
-                websocket = new WebSocket(wsUrl);
-                
-                websocket.onopen = function(event) {
-                    console.log('WebSocket connected');
-                    updateStatus('ws', true, 'Connected');
-                };
-                
-                websocket.onmessage = function(event) {
-                    const message = JSON.parse(event.data);
-                    handleWebSocketMessage(message);
-                };
-                
-                websocket.onclose = function(event) {
-                    console.log('WebSocket disconnected');
-                    updateStatus('ws', false, 'Disconnected');
-                    // Reconnect after 5 seconds
-                    setTimeout(connectWebSocket, 5000);
-                };
-                
-                websocket.onerror = function(error) {
-                    console.error('WebSocket error:', error);
-                    updateStatus('ws', false, 'Error');
-                };
-            }
-            
-            function handleWebSocketMessage(message) {
-                switch (message.type) {
-                    case 'news_update':
-                    case 'initial_data':
-                        updateNewsDisplay(message.data);
-                        if (newsVisualization) {
-                            newsVisualization.updateNewsData(message.data);
-                        }
-                        updateStatus('news', true, `${message.count} articles`);
-                        break;
-                    
-                    case 'trending_update':
-                        updateTrendingDisplay(message.data);
-                        break;
-                    
-                    case 'system_status':
-                        updateSystemStatus(message.data);
-                        break;
-                }
-            }
-            
-            function updateNewsDisplay(articles) {
-                const newsList = document.getElementById('news-list');
-                newsList.innerHTML = articles.map(article => `
-                    <div class="news-item" onclick="showArticleDetail(${JSON.stringify(article).replace(/"/g, '&quot;')})">
-                        <div class="news-title">${article.title}</div>
-                        <div class="news-meta">
-                            <span>${article.category || 'General'}</span>
-                            <span>${article.source}</span>
-                        </div>
-                    </div>
-                `).join('');
-            }
-            
-            function updateTrendingDisplay(trending) {
-                const trendingList = document.getElementById('trending-list');
-                trendingList.innerHTML = trending.map(item => `
-                    <div class="trending-item">
-                        <span class="trending-topic">${item.topic}</span>
-                        <span class="trending-count">${item.mentions}</span>
-                    </div>
-                `).join('');
-            }
-            
-            function updateStatus(type, isOnline, text) {
-                const indicator = document.getElementById(`${type}-status`);
-                const textElement = document.getElementById(`${type}-text`);
-                
-                indicator.style.background = isOnline ? '#4CAF50' : '#f44336';
-                textElement.textContent = text;
-            }
-            
-            function updateSystemStatus(status) {
-                updateStatus('lm', status.lm_studio_online, status.lm_studio_online ? 'Online' : 'Offline');
-            }
-            
-            function showArticleDetail(article) {
-                if (newsVisualization) {
-                    newsVisualization.showArticleDetails(article);
-                }
-            }
-            
-            // Initialize everything
-            document.addEventListener('DOMContentLoaded', function() {
-                initVisualization();
-                connectWebSocket();
-                
-                // Check LM Studio status
-                fetch('/api/health')
-                    .then(response => response.json())
-                    .then(data => {
-                        updateStatus('lm', data.lm_studio_online, data.lm_studio_online ? 'Online' : 'Offline');
-                    })
-                    .catch(() => {
-                        updateStatus('lm', false, 'Error');
-                    });
-            });
-        </script>
-    </body>
-    </html>
+    return await response_cache.respond(request, render_home, media_type="text/html; charset=utf-8", key="/")
+
+async def render_home() -> str:
+    """Homepage with the initial data embedded; rebuilt once per data version
+
+    The page renders from the snapshot straight away and its WebSocket
+    then syncs from the snapshot's revision, so first paint takes one request.
     """
-    return html_content
+    news = await article_store.changes_since(0)
+    return static_assets.render_page({
+        'revision': news['revision'],
+        'news': news,
+        'trending': await article_store.latest_trending(),
+        'status': {
+            'lm_studio_online': lm_client.cached_health(),
+            'last_update': refresh_stats.get('completed_at')
+        }
+    })
+
+@app.get("/static/{path:path}")
+async def static_file(request: Request, path: str):
+    """Precompressed static assets; hashed names are cached as immutable"""
+    return static_assets.respond(request, path)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -454,146 +162,438 @@ async def websocket_endpoint(websocket: WebSocket):
     await websocket_manager.connect(websocket)
     try:
         while True:
-            # Keep connection alive
-            await websocket.receive_text()
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            
+            if isinstance(message, dict) and message.get('type') == 'sync':
+                # Client resumes from its last seen revision (0 for a fresh page)
+                try:
+                    revision = int(message.get('revision') or 0)
+                except (TypeError, ValueError):
+                    revision = 0
+                delta = await article_store.changes_since(revision)
+                await websocket_manager.send(websocket, news_delta_message(delta))
+                await websocket_manager.send(websocket, {
+                    'type': 'trending_update',
+                    'data': await article_store.latest_trending()
+                })
     except WebSocketDisconnect:
         websocket_manager.disconnect(websocket)
 
 @app.get("/api/news")
-async def get_news():
-    """Get all news articles"""
+async def get_news(
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+    source: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    keyword: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields, e.g. id,title,summary")
+):
+    """Get news articles, newest first, one page at a time"""
+    async def build():
+        try:
+            articles, next_cursor = await article_store.query_articles(
+                limit=limit,
+                cursor=cursor,
+                category=category,
+                source=source,
+                sentiment=sentiment,
+                keyword=keyword,
+                since=parse_datetime(since) if since else None,
+                until=parse_datetime(until) if until else None,
+                fields=[field.strip() for field in fields.split(",") if field.strip()] if fields else None
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return {
+            "status": "success",
+            "data": articles,
+            "count": len(articles),
+            "next_cursor": next_cursor
+        }
+    
+    return await response_cache.respond(request, build)
+
+@app.get("/api/search")
+async def search_news(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    prefix: bool = False
+):
+    """Full-text search over titles, summaries, content and keywords"""
+    results, has_more = await article_store.search(q, limit=limit, offset=offset, prefix=prefix)
     return {
         "status": "success",
-        "data": news_cache,
-        "total": len(news_cache)
+        "query": q,
+        "data": results,
+        "count": len(results),
+        "next_offset": offset + len(results) if has_more else None
     }
 
+@app.get("/api/articles/{article_id}")
+async def get_article_detail(request: Request, article_id: int):
+    """One article with its full content; list views leave bodies out"""
+    async def build():
+        article = await article_store.get_article(article_id)
+        if article is None:
+            raise HTTPException(status_code=404, detail="Article not found")
+        return {"status": "success", "data": article}
+    
+    return await response_cache.respond(request, build)
+
+@app.get("/api/articles/{article_id}/related")
+async def get_related_articles(article_id: int, limit: int = Query(5, ge=1, le=50)):
+    """Nearest articles by embedding similarity"""
+    if article_id not in embedding_index.rows_by_id:
+        if not await article_store.article_exists(article_id):
+            raise HTTPException(status_code=404, detail="Article not found")
+        return {"status": "success", "article_id": article_id, "data": [], "count": 0}
+    
+    # Ask for spares: neighbours pruned from the store are skipped
+    neighbours = await asyncio.to_thread(embedding_index.related, article_id, limit * 2)
+    scores = dict(neighbours)
+    related = await article_store.get_articles([neighbour_id for neighbour_id, _ in neighbours])
+    related = [{**article, 'similarity': round(scores[article['id']], 4)} for article in related][:limit]
+    return {"status": "success", "article_id": article_id, "data": related, "count": len(related)}
+
 @app.get("/api/trending")
-async def get_trending():
+async def get_trending(request: Request):
     """Get trending topics"""
-    return {
-        "status": "success",
-        "data": trending_cache
-    }
+    async def build():
+        return {
+            "status": "success",
+            "data": await article_store.latest_trending()
+        }
+    
+    return await response_cache.respond(request, build)
 
 @app.get("/api/health")
 async def health_check():
     """Enhanced health check with LM Studio status"""
-    lm_studio_online = False
-    
-    try:
-        async with LMStudioClient() as client:
-            lm_studio_online = await client.health_check()
-    except:
-        pass
-    
+    # Served from the background probe's cache; never calls LM Studio
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "version": "2.0.0",
-        "lm_studio_online": lm_studio_online,
+        "lm_studio_online": lm_client.cached_health(),
+        "lm_studio": lm_client.get_stats(),
         "websocket_connections": websocket_manager.get_connection_count(),
-        "cached_articles": len(news_cache)
+        "websocket": websocket_manager.get_stats(),
+        "cached_articles": await article_store.count(),
+        "feeds": feed_scheduler.get_stats(),
+        "worker": {
+            "id": leader.owner,
+            "leader": leader.is_leader,
+            "pubsub": bus.name
+        },
+        "last_refresh": refresh_stats,
+        "enrichment_cache": await enrichment_cache.get_stats(),
+        "enrichment_queue": await enrichment_queue.get_stats(),
+        "stories": story_index.get_stats(),
+        "trending": trending_engine.get_stats(),
+        "embeddings": {**embedding_index.get_stats(), **embedder.get_stats()},
+        "response_cache": response_cache.get_stats(),
+        "static_assets": static_assets.get_stats(),
+        "raw_archive": raw_archive.get_stats()
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this worker"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.post("/api/refresh")
-async def manual_refresh(background_tasks: BackgroundTasks):
+async def manual_refresh():
     """Manually trigger news refresh"""
-    background_tasks.add_task(fetch_and_process_news)
+    # Whichever worker holds leadership runs the refresh
+    await bus.publish(CONTROL_CHANNEL, json.dumps({"action": "refresh"}))
     return {"status": "success", "message": "News refresh initiated"}
 
+async def handle_control_message(data: str):
+    """Handle control messages published by any worker"""
+    message = json.loads(data)
+    if message.get("action") == "refresh" and leader.is_leader:
+        asyncio.create_task(fetch_and_process_news())
+    elif message.get("action") == "invalidate":
+        response_cache.invalidate()
+    elif message.get("action") == "embed" and leader.is_leader:
+        asyncio.create_task(embed_articles(message.get("ids") or []))
+
+async def embed_articles(article_ids: List[int]):
+    """Embed stored articles that were not enriched here (e.g. by a backfill)"""
+    try:
+        lm_available = await lm_client.health_check()
+        for offset in range(0, len(article_ids), ENRICHMENT_QUEUE_BATCH):
+            articles = await article_store.get_articles(article_ids[offset:offset + ENRICHMENT_QUEUE_BATCH],
+                                                        fields=('id', 'title', 'summary', 'content'))
+            vectors, kind = await embedder.embed([embedding_text(article) for article in articles], lm_available)
+            await asyncio.to_thread(embedding_index.add, [article['id'] for article in articles], vectors, kind)
+    except Exception as e:
+        logger.exception(f"Error embedding {len(article_ids)} articles: {e!r}")
+
+async def embed_missing_articles():
+    """Background task: embed articles stored while this app was not running"""
+    await leader.wait_for_leadership()
+    missing = await article_store.all_ids() - set(embedding_index.rows_by_id)
+    if missing:
+        logger.info(f"Embedding {len(missing)} articles without vectors")
+        await embed_articles(sorted(missing))
+
+async def publish_data_changed():
+    """Drop cached responses here and on every other worker"""
+    response_cache.invalidate()
+    await bus.publish(CONTROL_CHANNEL, json.dumps({"action": "invalidate"}))
+
 async def background_news_updater():
-    """Background task to update news every hour"""
+    """Background task: one full refresh, then per-source incremental updates"""
     while True:
+        await leader.wait_for_leadership()
         try:
             await fetch_and_process_news()
-            # Wait 1 hour (3600 seconds)
-            await asyncio.sleep(3600)
+            await feed_scheduler.run(lambda: leader.is_leader)
         except Exception as e:
-            print(f"Error in background updater: {e}")
+            logger.exception(f"Error in background updater: {e!r}")
             await asyncio.sleep(300)  # Wait 5 minutes on error
 
+async def enrichment_retry_worker():
+    """Background task: run queued jobs whose retry backoff has expired"""
+    while True:
+        await leader.wait_for_leadership()
+        try:
+            # Claims left by a worker that stopped, including a former leader
+            await enrichment_queue.requeue_expired()
+            if await enrichment_queue.next_due() == 0:
+                await process_queue()
+            delay = await enrichment_queue.next_due()
+        except Exception as e:
+            logger.exception(f"Error in enrichment retry worker: {e!r}")
+            delay = None
+        await asyncio.sleep(min(delay if delay is not None else 60, 60))
+
 async def fetch_and_process_news():
     """Enhanced news fetching with AI processing"""
-    global news_cache, trending_cache
-    
+    # One trace per refresh; every stage below is a span of it
+    with span('refresh'):
+        try:
+            logger.info("Fetching news from multiple sources...")
+            
+            # Fetch raw articles
+            stage_timings = {}
+            # Same pooled fetcher, validators and per-host limits as the scheduled checks
+            with span('fetch', stage_timings) as fields:
+                raw_articles = await feed_scheduler.fetch_all()
+                fields['articles'] = len(raw_articles)
+            
+            if raw_articles:
+                await archive_raw_articles(raw_articles)
+            elif await article_store.count() == 0:
+                logger.warning("No articles fetched, using sample data")
+                raw_articles = get_sample_articles()
+            else:
+                logger.info("No feed changes since the last refresh")
+                return
+            
+            await process_articles(raw_articles, stage_timings)
+            
+        except Exception as e:
+            logger.exception(f"Error in news processing: {e!r}")
+            # Use sample data as fallback
+            if await article_store.count() == 0:
+                await article_store.upsert_articles(get_sample_articles())
+                await publish_data_changed()
+                await broadcast_news_changes()
+
+async def archive_raw_articles(raw_articles: List[Dict]):
+    """Keep raw payloads so history can be replayed (backend/services/backfill.py)"""
     try:
-        print("🔄 Fetching news from multiple sources...")
-        
-        # Fetch raw articles
-        async with EnhancedNewsScraperService() as scraper:
-            raw_articles = await scraper.fetch_all_sources()
-            trending_topics = await scraper.get_trending_topics(raw_articles)
+        await asyncio.to_thread(raw_archive.append, raw_articles)
+    except Exception as e:
+        logger.warning(f"Raw archive write failed: {e!r}")
+
+async def process_new_feed_items(raw_articles: List[Dict]):
+    """Feed scheduler callback: publish newly found items right away"""
+    with span('feed_items', articles=len(raw_articles)):
+        try:
+            await archive_raw_articles(raw_articles)
+            await process_articles(raw_articles)
+        except Exception as e:
+            logger.exception(f"Error processing new feed items: {e!r}")
+
+class ArticleStreamPublisher:
+    """Publishes each article of a streamed enrichment as soon as it is usable
+
+    Articles are stored when their metadata is known (so they have an id and
+    show up in deltas), summary pieces follow, and the finished article is
+    stored and published again on completion. An article in ``failures``
+    holds fallback values, so its completion is left to the batch, which
+    retries it or stores it once out of attempts. The response cache is
+    invalidated once per batch, not per article.
+    """
+    
+    def __init__(self, started: float, stage_timings: Dict[str, float], failures: Dict[str, str]):
+        self.started = started
+        self.stage_timings = stage_timings
+        self.failures = failures
+        self.ids: Dict[str, int] = {}
+    
+    async def __call__(self, stage: str, article: Dict, data):
+        key = article_url(article)
+        if stage == 'summary':
+            if key in self.ids:
+                await websocket_manager.broadcast_article_stream('summary', id=self.ids[key], text=data)
+            return
+        if stage == 'complete' and key in self.failures:
+            return
         
-        if not raw_articles:
-            print("⚠️ No articles fetched, using sample data")
-            raw_articles = get_sample_articles()
+        stored = (await article_store.upsert_articles([data]))[0]
+        self.ids[key] = stored.id
+        await websocket_manager.broadcast_article_stream(stage, article=stored.to_dict())
+        self.stage_timings.setdefault('first_article', round(time.perf_counter() - self.started, 3))
+
+async def process_articles(raw_articles: List[Dict], stage_timings: Optional[Dict[str, float]] = None):
+    """Cluster raw articles into stories, queue them and work the queue"""
+    stage_timings = dict(stage_timings or {})
+    
+    # Group near-duplicates so each story is enriched once
+    with span('cluster', stage_timings) as fields:
+        raw_count = len(raw_articles)
+        stories, attachments = story_index.cluster(raw_articles)
+        attached = await article_store.attach_related(attachments)
+        await enrichment_queue.attach_related(attachments)
+        queued = await enrichment_queue.enqueue(stories)
+        fields.update(raw_articles=raw_count, stories=len(stories), queued=queued)
+    
+    await process_queue(stage_timings, stories={
+        'raw_articles': raw_count,
+        'new_stories': len(stories),
+        'queued': queued,
+        'existing_stories_updated': attached
+    })
+    if attached:
+        # Related coverage changes stored stories even when no batch runs
+        async with processing_lock:
+            await publish_data_changed()
+            await broadcast_news_changes()
+
+async def broadcast_news_changes():
+    """Send clients every article change since the last broadcast"""
+    global broadcast_revision
+    delta = await article_store.changes_since(broadcast_revision)
+    broadcast_revision = delta['revision']
+    if not delta_is_empty(delta):
+        await websocket_manager.broadcast_news_delta(delta)
+
+async def process_queue(stage_timings: Optional[Dict[str, float]] = None, stories: Optional[Dict] = None):
+    """Enrich and publish due jobs, highest priority first, until none are left"""
+    run = {'batches': 0, 'jobs': 0, 'articles_processed': 0, 'retried': 0}
+    # Batches from different sources take turns so they share the LM budget
+    async with processing_lock:
+        while True:
+            jobs = await enrichment_queue.claim(ENRICHMENT_QUEUE_BATCH)
+            if not jobs:
+                break
+            batch = await process_batch(jobs, dict(stage_timings or {}), stories)
+            for key, value in batch.items():
+                run[key] += value
+            refresh_stats['run'] = run
+
+async def process_batch(jobs: List[Dict], stage_timings: Dict[str, float],
+                        stories: Optional[Dict] = None) -> Dict[str, int]:
+    """Enrich, store and broadcast one batch of claimed jobs
+
+    Jobs are settled only once their results are stored; if anything fails
+    before that, or LM Studio is offline, they go back to the queue.
+    """
+    global refresh_stats
+    try:
+        raw_articles = [job['article'] for job in jobs]
+        # Only first sightings count towards trends
+        known = await article_store.existing_urls([article_url(article) for article in raw_articles])
         
         # Process with AI
-        processed_articles = []
-        async with LMStudioClient() as ai_client:
-            lm_available = await ai_client.health_check()
-            
-            for article in raw_articles[:20]:  # Limit to 20 articles
-                try:
-                    if lm_available:
-                        # AI processing
-                        category = await ai_client.categorize_article(article['title'], article['content'])
-                        summary = await ai_client.summarize_article(article['title'], article['content'])
-                        sentiment = await ai_client.analyze_sentiment(article['content'])
-                        keywords = await ai_client.extract_keywords(article['content'])
-                    else:
-                        # Fallback processing
-                        category = "Technology"
-                        summary = article['content'][:200] + "..."
-                        sentiment = "Neutral"
-                        keywords = []
-                    
-                    processed_article = {
-                        'id': len(processed_articles) + 1,
-                        'title': article['title'],
-                        'content': article['content'],
-                        'summary': summary,
-                        'category': category,
-                        'sentiment': sentiment,
-                        'keywords': keywords,
-                        'source': article['source'],
-                        'url': article.get('url', ''),
-                        'published': article.get('published', datetime.now().isoformat()),
-                        'processed_at': datetime.now().isoformat()
-                    }
-                    processed_articles.append(processed_article)
-                    
-                except Exception as e:
-                    print(f"Error processing article: {e}")
-                    continue
+        with span('enrich', stage_timings) as fields:
+            lm_available = await lm_client.health_check()
+            fields.update(lm_available=lm_available)
+            if not lm_available:
+                # Fallback values would be stored for good; wait for LM Studio instead
+                logger.warning(f"LM Studio offline; {len(jobs)} jobs wait {ENRICHMENT_QUEUE_RETRY_BASE:.0f}s")
+                await enrichment_queue.release(jobs, ENRICHMENT_QUEUE_RETRY_BASE)
+                return {'batches': 1, 'jobs': len(jobs), 'articles_processed': 0, 'retried': 0}
+            pipeline = EnrichmentPipeline(lm_client, analyzer=lm_client.analyzer, cache=enrichment_cache)
+            if ENRICHMENT_MODE == "stream":
+                pipeline.on_progress = ArticleStreamPublisher(time.perf_counter(), stage_timings,
+                                                              pipeline.failures)
+            processed_articles = await pipeline.enrich_all(raw_articles, lm_available)
+            # Failed jobs go back to the queue; ones out of attempts are published with fallback values
+            retried = enrichment_queue.retrying(jobs, pipeline.failures)
+            processed_articles = [article for article in processed_articles
+                                  if article_url(article) not in retried]
+            fields.update(articles=len(processed_articles), retried=len(retried))
         
-        # Update cache
-        news_cache = processed_articles
-        trending_cache = trending_topics
+        # Persist articles and trending topics
+        with span('store', stage_timings):
+            # Bodies stay in this batch only; the stored records leave them out
+            bodies = {article_url(article): article for article in processed_articles}
+            processed_articles = await article_store.upsert_articles(processed_articles)
+            trending_engine.update(article for article in processed_articles if article.url not in known)
+            trending_topics = trending_engine.top()
+            await article_store.save_trending(trending_topics)
+            pruned = await article_store.prune()
+        await publish_data_changed()
         
-        # Broadcast updates
-        await websocket_manager.broadcast_news_update(processed_articles)
+        # Embed for related-article search
+        with span('embed', stage_timings):
+            vectors, kind = await embedder.embed(
+                [embedding_text(bodies[article.url]) for article in processed_articles], lm_available
+            )
+            await asyncio.to_thread(embedding_index.add, [article.id for article in processed_articles],
+                                    vectors, kind)
+            if pruned:
+                await asyncio.to_thread(embedding_index.remove, pruned)
+        await enrichment_queue.settle(jobs, pipeline.failures)
+    except Exception:
+        await enrichment_queue.release(jobs, ENRICHMENT_QUEUE_RETRY_BASE)
+        raise
+    if pruned:
+        logger.info(f"Pruned {len(pruned)} articles past retention")
+    
+    # Broadcast updates
+    with span('broadcast', stage_timings):
+        await broadcast_news_changes()
         await websocket_manager.broadcast_trending_update(trending_topics)
         
-        # System status update
-        async with LMStudioClient() as client:
-            lm_online = await client.health_check()
-        
         await websocket_manager.broadcast_system_status({
-            'lm_studio_online': lm_online,
+            'lm_studio_online': lm_available,
             'articles_processed': len(processed_articles),
             'last_update': datetime.now().isoformat()
         })
-        
-        print(f"✅ Processed {len(processed_articles)} articles successfully")
-        
-    except Exception as e:
-        print(f"❌ Error in news processing: {e}")
-        # Use sample data as fallback
-        if not news_cache:
-            news_cache = get_sample_articles()
-            await websocket_manager.broadcast_news_update(news_cache)
+    
+    refresh_stats = {
+        'completed_at': datetime.now().isoformat(),
+        'trace_id': current_trace_id(),
+        'articles_processed': len(processed_articles),
+        'jobs': len(jobs),
+        'retried': len(retried),
+        'stories': stories or {},
+        'stage_timings': stage_timings,
+        'enrichment': pipeline.report()
+    }
+    
+    logger.bind(trace_id=current_trace_id(), **stage_timings).info(
+        f"Processed {len(processed_articles)} articles successfully "
+        f"(fetch {stage_timings.get('fetch', 0)}s, enrich {stage_timings['enrich']}s, "
+        f"broadcast {stage_timings['broadcast']}s)"
+    )
+    return {'batches': 1, 'jobs': len(jobs), 'articles_processed': len(processed_articles), 'retried': len(retried)}
 
 def get_sample_articles():
     """Sample articles for fallback"""
@@ -607,7 +607,7 @@ def get_sample_articles():
             'keywords': ['AI', 'Quantum', 'Computing', 'Breakthrough'],
             'source': 'Tech News',
             'url': '#',
-            'published': datetime.now().isoformat()
+            'published': datetime.now(timezone.utc).isoformat()
         },
         {
             'id': 2,
@@ -618,7 +618,7 @@ def get_sample_articles():
             'keywords': ['Machine Learning', 'Healthcare', 'AI', 'Diagnosis'],
             'source': 'Medical Journal',
             'url': '#',
-            'published': datetime.now().isoformat()
+            'published': datetime.now(timezone.utc).isoformat()
         },
         {
             'id': 3,
@@ -629,7 +629,7 @@ def get_sample_articles():
             'keywords': ['Autonomous', 'Vehicles', 'Self-driving', 'Transportation'],
             'source': 'Auto News',
             'url': '#',
-            'published': datetime.now().isoformat()
+            'published': datetime.now(timezone.utc).isoformat()
         }
     ]
 
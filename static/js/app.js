@@ -0,0 +1,225 @@
+let newsVisualization;
+let websocket;
+// Change-feed state survives reconnects so only missed changes are sent
+let feedRevision = 0;
+const articlesById = new Map();
+const MAX_DISPLAYED_ARTICLES = 50;
+
+// Initialize 3D visualization
+function initVisualization() {
+    try {
+        // Simple visualization will auto-initialize
+        console.log('3D visualization initialized');
+    } catch (error) {
+        console.error('Failed to initialize 3D visualization:', error);
+        document.getElementById('three-container').innerHTML = 
+            '<div style="display: flex; align-items: center; justify-content: center; height: 100%; color: white;">3D Visualization Loading...</div>';
+    }
+}
+
+// WebSocket connection
+function connectWebSocket() {
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const wsUrl = `${protocol}//${window.location.host}/ws`;
+
+    websocket = new WebSocket(wsUrl);
+
+    websocket.onopen = function(event) {
+        console.log('WebSocket connected');
+        updateStatus('ws', true, 'Connected');
+        requestSync();
+    };
+
+    websocket.onmessage = function(event) {
+        const message = JSON.parse(event.data);
+        handleWebSocketMessage(message);
+    };
+
+    websocket.onclose = function(event) {
+        console.log('WebSocket disconnected');
+        updateStatus('ws', false, 'Disconnected');
+        // Reconnect after 5 seconds
+        setTimeout(connectWebSocket, 5000);
+    };
+
+    websocket.onerror = function(error) {
+        console.error('WebSocket error:', error);
+        updateStatus('ws', false, 'Error');
+    };
+}
+
+function requestSync() {
+    websocket.send(JSON.stringify({type: 'sync', revision: feedRevision}));
+}
+
+function applyNewsDelta(delta) {
+    if (delta.revision <= feedRevision && !delta.reset) {
+        return;
+    }
+    if (delta.base_revision > feedRevision && !delta.reset) {
+        // Missed a delta; ask for everything since our revision
+        requestSync();
+        return;
+    }
+    if (delta.reset) {
+        articlesById.clear();
+    }
+    delta.added.concat(delta.updated).forEach(article => articlesById.set(article.id, article));
+    delta.removed.forEach(id => articlesById.delete(id));
+    feedRevision = delta.revision;
+    renderArticles();
+}
+
+function applyArticleStream(message) {
+    // Articles appear while they are enriched; the next delta confirms them
+    if (message.stage === 'summary') {
+        const article = articlesById.get(message.id);
+        if (article) {
+            article.summary = (article.summary || '') + message.text;
+            scheduleRender();
+        }
+        return;
+    }
+    articlesById.set(message.article.id, message.article);
+    renderArticles();
+}
+
+let renderScheduled = false;
+
+function scheduleRender() {
+    // Summary pieces arrive a few tokens at a time; redraw at most once per frame
+    if (renderScheduled) {
+        return;
+    }
+    renderScheduled = true;
+    requestAnimationFrame(() => {
+        renderScheduled = false;
+        renderArticles();
+    });
+}
+
+function renderArticles() {
+    const articles = Array.from(articlesById.values())
+        .sort((a, b) => (b.published || '').localeCompare(a.published || ''))
+        .slice(0, MAX_DISPLAYED_ARTICLES);
+    if (articlesById.size > articles.length) {
+        const kept = new Set(articles.map(article => article.id));
+        Array.from(articlesById.keys()).forEach(id => kept.has(id) || articlesById.delete(id));
+    }
+    showArticles(articles, articles.length);
+}
+
+function showArticles(articles, count) {
+    updateNewsDisplay(articles);
+    if (newsVisualization) {
+        newsVisualization.updateNewsData(articles);
+    }
+    updateStatus('news', true, `${count} articles`);
+}
+
+function handleWebSocketMessage(message) {
+    switch (message.type) {
+        case 'news_delta':
+            applyNewsDelta(message);
+            break;
+
+        case 'article_stream':
+            applyArticleStream(message);
+            break;
+
+        case 'news_update':
+        case 'initial_data':
+            showArticles(message.data, message.count);
+            break;
+
+        case 'trending_update':
+            updateTrendingDisplay(message.data);
+            break;
+
+        case 'system_status':
+            updateSystemStatus(message.data);
+            break;
+    }
+}
+
+function updateNewsDisplay(articles) {
+    const newsList = document.getElementById('news-list');
+    newsList.innerHTML = articles.map(article => `
+        <div class="news-item" onclick="showArticleDetail(${JSON.stringify(article).replace(/"/g, '&quot;')})">
+            <div class="news-title">${article.title}</div>
+            <div class="news-meta">
+                <span>${article.category || 'General'}</span>
+                <span>${article.source}</span>
+            </div>
+        </div>
+    `).join('');
+}
+
+function updateTrendingDisplay(trending) {
+    const trendingList = document.getElementById('trending-list');
+    trendingList.innerHTML = trending.map(item => `
+        <div class="trending-item">
+            <span class="trending-topic">${item.topic}</span>
+            <span class="trending-count">${item.mentions}</span>
+        </div>
+    `).join('');
+}
+
+function updateStatus(type, isOnline, text) {
+    const indicator = document.getElementById(`${type}-status`);
+    const textElement = document.getElementById(`${type}-text`);
+
+    indicator.style.background = isOnline ? '#4CAF50' : '#f44336';
+    textElement.textContent = text;
+}
+
+function updateSystemStatus(status) {
+    updateStatus('lm', status.lm_studio_online, status.lm_studio_online ? 'Online' : 'Offline');
+}
+
+function showArticleDetail(article) {
+    if (newsVisualization) {
+        newsVisualization.showArticleDetails(article);
+    }
+}
+
+// Snapshot embedded in the page by the server, or null
+function readInitialData() {
+    const element = document.getElementById('initial-data');
+    if (!element) {
+        return null;
+    }
+    try {
+        return JSON.parse(element.textContent);
+    } catch (error) {
+        console.error('Invalid initial data:', error);
+        return null;
+    }
+}
+
+function checkHealth() {
+    fetch('/api/health')
+        .then(response => response.json())
+        .then(data => {
+            updateStatus('lm', data.lm_studio_online, data.lm_studio_online ? 'Online' : 'Offline');
+        })
+        .catch(() => {
+            updateStatus('lm', false, 'Error');
+        });
+}
+
+// Initialize everything
+document.addEventListener('DOMContentLoaded', function() {
+    initVisualization();
+
+    // Render from the embedded snapshot; the WebSocket then only syncs newer changes
+    const initialData = readInitialData();
+    if (initialData) {
+        applyNewsDelta(initialData.news);
+        updateTrendingDisplay(initialData.trending);
+        updateSystemStatus(initialData.status);
+    } else {
+        checkHealth();
+    }
+    connectWebSocket();
+});
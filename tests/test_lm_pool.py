@@ -0,0 +1,135 @@
+"""An LMPool over several fake LM servers: breakers, routing policies and tier fallback"""
+
+import asyncio
+import random
+import time
+
+import aiohttp
+import pytest
+
+from backend.services.combined_analysis import CombinedAnalyzer
+from backend.services.lm_pool import CLOSED, HALF_OPEN, OPEN, LMBackend, LMPool, NoBackendAvailable
+from benchmarks.fake_servers import FakeLMServer
+
+
+async def start_servers(*failure_rates, latency=0.05):
+    return [
+        await FakeLMServer(latency=latency, tokens_per_second=10000, slots=16, failure_rate=rate).start()
+        for rate in failure_rates
+    ]
+
+
+async def stop_servers(servers):
+    for server in servers:
+        await server.stop()
+
+
+def article(number):
+    # Distinct prompts, so single-flight never merges two requests
+    return {'title': f"Story {number}", 'content': f"Body of story {number}. " * 10}
+
+
+def chat_calls(server):
+    return server.get_stats()['chat_calls']
+
+
+async def analyze(pool, numbers):
+    async with aiohttp.ClientSession() as session:
+        analyzer = CombinedAnalyzer(session=session, pool=pool)
+        return await asyncio.gather(*(analyzer.analyze_article(article(number)) for number in numbers),
+                                    return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_after_failures_and_half_opens_after_cooldown():
+    (server,) = servers = await start_servers(1.0)
+    backend = LMBackend(server.url, "fake-model", min_calls=3, cooldown=0.3, max_latency=0)
+    pool = LMPool([backend])
+    try:
+        results = await analyze(pool, range(3))
+        assert all(isinstance(result, aiohttp.ClientResponseError) for result in results)
+        assert backend.state == OPEN
+
+        # An open backend fails fast, without a request to the server
+        (result,) = await analyze(pool, [3])
+        assert isinstance(result, NoBackendAvailable)
+        assert chat_calls(server) == 3
+
+        # After the cooldown one trial goes through; its failure reopens the breaker
+        await asyncio.sleep(0.3)
+        assert backend.available(time.monotonic()) and backend.state == HALF_OPEN
+        (result,) = await analyze(pool, [4])
+        assert isinstance(result, aiohttp.ClientResponseError)
+        assert backend.state == OPEN and backend.trips == 2
+
+        # ...and its success closes it
+        server.failure_rate = 0.0
+        await asyncio.sleep(0.3)
+        (result,) = await analyze(pool, [5])
+        assert isinstance(result, dict)
+        assert backend.state == CLOSED
+    finally:
+        await stop_servers(servers)
+
+
+@pytest.mark.asyncio
+async def test_least_outstanding_routing_follows_weight_and_concurrency():
+    servers = await start_servers(0.0, 0.0, latency=0.2)
+    light = LMBackend(servers[0].url, "fake-model", weight=1, max_concurrency=None)
+    heavy = LMBackend(servers[1].url, "fake-model", weight=3, max_concurrency=None)
+    try:
+        await analyze(LMPool([light, heavy], routing="least_outstanding"), range(8))
+        assert [chat_calls(server) for server in servers] == [2, 6]
+
+        for server in servers:
+            server.reset()
+        capped = [LMBackend(server.url, "fake-model", max_concurrency=2) for server in servers]
+        pool = LMPool(capped, routing="least_outstanding")
+        results = await analyze(pool, range(8, 20))
+        assert all(isinstance(result, dict) for result in results)
+        assert [server.max_in_flight for server in servers] == [2, 2]
+        assert pool.waits > 0
+    finally:
+        await stop_servers(servers)
+
+
+@pytest.mark.asyncio
+async def test_weighted_routing_spreads_requests_by_weight():
+    servers = await start_servers(0.0, 0.0, latency=0.01)
+    backends = [
+        LMBackend(servers[0].url, "fake-model", weight=1, max_concurrency=None),
+        LMBackend(servers[1].url, "fake-model", weight=4, max_concurrency=None)
+    ]
+    random.seed(7)
+    try:
+        await analyze(LMPool(backends, routing="weighted"), range(200))
+        share = chat_calls(servers[1]) / 200
+        assert 0.7 < share < 0.9
+    finally:
+        await stop_servers(servers)
+
+
+@pytest.mark.asyncio
+async def test_tasks_fall_back_to_other_tiers_when_their_tier_is_open():
+    servers = await start_servers(1.0, 0.0)
+    small = LMBackend(servers[0].url, "small-model", tiers=["small"], min_calls=2, cooldown=60, max_latency=0)
+    large = LMBackend(servers[1].url, "large-model", tiers=["large"], min_calls=2, cooldown=60, max_latency=0)
+    pool = LMPool([small, large], task_tiers={'combined': "small"})
+    try:
+        results = await analyze(pool, range(2))
+        assert all(isinstance(result, aiohttp.ClientResponseError) for result in results)
+        assert small.state == OPEN and chat_calls(servers[1]) == 0
+
+        (result,) = await analyze(pool, [2])
+        assert isinstance(result, dict)
+        assert chat_calls(servers[1]) == 1 and pool.fallbacks == 1
+
+        # With every tier open there is nothing left to fall back to
+        servers[1].failure_rate = 1.0
+        await analyze(pool, range(3, 5))
+        assert large.state == OPEN
+        (result,) = await analyze(pool, [5])
+        assert isinstance(result, NoBackendAvailable)
+        assert pool.rejected == 1
+    finally:
+        await stop_servers(servers)
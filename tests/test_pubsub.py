@@ -0,0 +1,77 @@
+"""Two workers sharing a (fake) Redis: broadcasts reach both, leadership fails over"""
+
+import asyncio
+
+import fakeredis
+import pytest
+
+from backend.services.pubsub import LeaderElector, RedisPubSub
+
+CHANNEL = "ai-news:test"
+
+
+async def start_workers(server, count=2):
+    return [
+        await RedisPubSub(client=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)).start()
+        for _ in range(count)
+    ]
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.02)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_every_worker():
+    workers = await start_workers(fakeredis.FakeServer())
+    received = [[] for _ in workers]
+    for bus, inbox in zip(workers, received):
+        async def handler(data, inbox=inbox):
+            inbox.append(data)
+        await bus.subscribe(CHANNEL, handler)
+    try:
+        await workers[0].publish(CHANNEL, "hello")
+        await wait_for(lambda: all(received))
+        assert received == [["hello"], ["hello"]]
+    finally:
+        for bus in workers:
+            await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_leadership_fails_over_when_the_leader_dies():
+    workers = await start_workers(fakeredis.FakeServer())
+    electors = [await LeaderElector(bus, ttl=0.3, owner=f"worker-{number}").start()
+                for number, bus in enumerate(workers)]
+    try:
+        assert [elector.is_leader for elector in electors] == [True, False]
+
+        # A crashed leader neither renews nor releases; its lock expires after the TTL
+        electors[0]._task.cancel()
+        await wait_for(lambda: electors[1].is_leader)
+
+        # A renewal by the old leader must not take the lock back
+        assert not await workers[0].renew_lock(electors[0].key, electors[0].owner, 0.3)
+    finally:
+        for elector in electors[1:]:
+            await elector.stop()
+        for bus in workers:
+            await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_stopping_the_leader_hands_over_without_waiting_for_the_ttl():
+    workers = await start_workers(fakeredis.FakeServer())
+    electors = [await LeaderElector(bus, ttl=3, owner=f"worker-{number}").start()
+                for number, bus in enumerate(workers)]
+    try:
+        await electors[0].stop()
+        # The follower retries every ttl/3, well before the released lock would have expired
+        await wait_for(lambda: electors[1].is_leader, timeout=2.0)
+    finally:
+        await electors[1].stop()
+        for bus in workers:
+            await bus.stop()